@@ -16,9 +16,32 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    from .services.database_pool import build_engine_options, make_psycopg_green
+    make_psycopg_green()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **build_engine_options(
+            app.config.get('SQLALCHEMY_DATABASE_URI'),
+            pool_size=app.config['SQLALCHEMY_POOL_SIZE'],
+            max_overflow=app.config['SQLALCHEMY_MAX_OVERFLOW'],
+            pool_timeout=app.config['SQLALCHEMY_POOL_TIMEOUT'],
+            pool_pre_ping=app.config['SQLALCHEMY_POOL_PRE_PING'],
+            pool_recycle=app.config['SQLALCHEMY_POOL_RECYCLE'],
+            statement_timeout_ms=app.config['SQLALCHEMY_STATEMENT_TIMEOUT_MS']
+        ),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
     db.init_app(app)
-    migrate.init_app(app, db)
-    socketio.init_app(app, async_mode='eventlet', cors_allowed_origins="*")
+    # SQLite cannot alter most of a table in place, so generated migrations copy the table in batch mode
+    migrate.init_app(app, db, render_as_batch=True)
+
+    # With several worker processes, emits to a room are relayed through the message queue to the worker holding each client
+    from .services.socketio_queue import message_queue_options
+    socketio.init_app(
+        app,
+        async_mode='eventlet',
+        cors_allowed_origins="*",
+        **message_queue_options(app.config.get('SOCKETIO_MESSAGE_QUEUE'), app.config.get('SOCKETIO_CHANNEL', 'flask-socketio'))
+    )
     
     # TODO: Remove the localhost:5173 after development
     allowed_origins_str = app.config.get('ALLOWED_ORIGINS', 'http://localhost:5173')
@@ -27,13 +50,64 @@ def create_app(config_name='default'):
     print(f"Configuring CORS for origins: {allowed_origins_list}")
     cors.init_app(app, resources={r"/api/*": {"origins": allowed_origins_list}}, supports_credentials=True)
     
-    from .routes import chat_routes, auth_routes, job_sections_routes, linkedin_post_routes
+    from .services.rate_limiter import rate_limiter, limit_api_request
+    rate_limiter.configure(
+        enabled=app.config['RATE_LIMIT_ENABLED'],
+        backend=app.config['RATE_LIMIT_BACKEND'],
+        storage_url=app.config['RATE_LIMIT_STORAGE_URL'],
+        limits={
+            'llm': {
+                'user': (app.config['RATE_LIMIT_LLM_USER_BURST'], app.config['RATE_LIMIT_LLM_USER_PER_MINUTE']),
+                'global': (app.config['RATE_LIMIT_LLM_GLOBAL_BURST'], app.config['RATE_LIMIT_LLM_GLOBAL_PER_MINUTE'])
+            },
+            'api': {
+                'user': (app.config['RATE_LIMIT_API_USER_BURST'], app.config['RATE_LIMIT_API_USER_PER_MINUTE']),
+                'global': (app.config['RATE_LIMIT_API_GLOBAL_BURST'], app.config['RATE_LIMIT_API_GLOBAL_PER_MINUTE'])
+            }
+        }
+    )
+    app.before_request(limit_api_request)
+
+    from .routes import chat_routes, auth_routes, job_sections_routes, linkedin_post_routes, metrics_routes, task_routes
     from . import websockets 
 
     app.register_blueprint(chat_routes.chat_bp, url_prefix='/api/chat')
     app.register_blueprint(auth_routes.auth_bp, url_prefix='/api/auth')
     app.register_blueprint(job_sections_routes.job_sections_bp, url_prefix='/api/job-sections')
     app.register_blueprint(linkedin_post_routes.linkedin_post_bp, url_prefix='/api/linkedin-post')
+    app.register_blueprint(task_routes.task_bp, url_prefix='/api/tasks')
+    if app.config.get('METRICS_ENABLED', True):
+        app.register_blueprint(metrics_routes.metrics_bp)
+
+    from .agent import llm_interface
+    if llm_interface.API_KEY or llm_interface.LLM_BACKEND == 'fake':
+        llm_interface.configure_gemini_client()
+
+    from .services.history_cache import conversation_history_cache
+    conversation_history_cache.configure(
+        max_conversations=app.config['HISTORY_CACHE_MAX_CONVERSATIONS'],
+        ttl_seconds=app.config['HISTORY_CACHE_TTL_SECONDS'],
+        max_messages=max(app.config['HISTORY_CACHE_MAX_MESSAGES'], app.config['HISTORY_WINDOW_MESSAGES'] + app.config['HISTORY_SUMMARY_BATCH_MESSAGES'] + 1)
+    )
+
+    from .services.task_queue import task_queue
+    task_queue.configure(
+        app,
+        concurrency=app.config['TASK_QUEUE_CONCURRENCY'],
+        max_pending=app.config['TASK_QUEUE_MAX_PENDING'],
+        max_pending_per_user=app.config['TASK_QUEUE_MAX_PENDING_PER_USER'],
+        backend=app.config['TASK_QUEUE_BACKEND'],
+        heartbeat_seconds=app.config['TASK_QUEUE_HEARTBEAT_SECONDS']
+    )
+
+    from .services.response_cache import general_response_cache
+    general_response_cache.configure(
+        enabled=app.config['RESPONSE_CACHE_ENABLED'],
+        max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+        ttl_seconds=app.config['RESPONSE_CACHE_TTL_SECONDS'],
+        similarity_threshold=app.config['RESPONSE_CACHE_SIMILARITY_THRESHOLD'],
+        embeddings_enabled=app.config['RESPONSE_CACHE_EMBEDDINGS_ENABLED']
+    )
     
     return app
 
@@ -0,0 +1,201 @@
+# magnecruit_backend\app\agent\fake_llm.py
+
+import os
+import re
+import time
+import random
+import hashlib
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import protos
+from google.generativeai.types.generation_types import GenerateContentResponse
+
+# Local stand-in for the Gemini models, selected with LLM_BACKEND=fake, for load testing without an API key
+FAKE_LLM_SETTINGS = {
+    "latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", 300)),
+    "chunk_latency_ms": float(os.getenv("FAKE_LLM_CHUNK_LATENCY_MS", 40)),
+    "response_words": int(os.getenv("FAKE_LLM_RESPONSE_WORDS", 60)),
+    "chunk_words": int(os.getenv("FAKE_LLM_CHUNK_WORDS", 8)),
+    "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", 0)),
+    "slow_rate": float(os.getenv("FAKE_LLM_SLOW_RATE", 0)),
+    "slow_latency_ms": float(os.getenv("FAKE_LLM_SLOW_LATENCY_MS", 5000)),
+    "block_rate": float(os.getenv("FAKE_LLM_BLOCK_RATE", 0)),
+    "function_call_rate": float(os.getenv("FAKE_LLM_FUNCTION_CALL_RATE", 0)),
+}
+
+# User messages that make the fake model call generate_job_sections when the tool is available
+FUNCTION_CALL_TRIGGER_WORDS = ('generate', 'create', 'save', 'update workspace')
+
+# User messages that make the fake model call modify_job_sections for two sections and update_job_sections in the same response
+EDIT_FUNCTION_CALL_TRIGGER_WORDS = ('modify', 'change')
+
+FAKE_JOB_SECTIONS_ARGS = {
+    "target_role": "Senior Software Engineer",
+    "target_role_description": "Hybrid role in Austin, TX. 5+ years of experience. $150k - $180k.",
+    "company_context": "Magnecruit builds AI tools that help recruiters hire faster.",
+    "responsibilities": ["Design and build backend services", "Mentor junior engineers", "Own features end to end"],
+    "required_qualifications": ["5+ years of Python experience", "Experience with SQL databases"],
+    "preferred_qualifications": ["Experience with LLM applications"],
+    "benefits": ["Health insurance", "Flexible hours", "Learning budget"],
+}
+
+FAKE_JOB_BENEFITS_UPDATE_ARGS = {
+    "job_benefits": ["Health insurance", "Flexible hours", "Learning budget", "Four weeks of paid time off"],
+}
+
+FAKE_WORDS = ("recruiting", "candidate", "role", "team", "interview", "experience", "skills", "company", "offer", "process")
+
+# Update the fake model behaviour at runtime, for example from the benchmark command line
+def configure_fake_llm(**settings):
+    '''
+    Overrides the given fake LLM settings
+    '''
+    unknown_settings = set(settings) - set(FAKE_LLM_SETTINGS)
+    if unknown_settings:
+        raise ValueError(f"Unknown fake LLM settings: {', '.join(sorted(unknown_settings))}")
+    FAKE_LLM_SETTINGS.update(settings)
+
+# Fake embedding of the text as a hashed bag of words, so texts sharing most of their words are close
+def fake_embed_content(text: str, dimensions: int = 256) -> list[float]:
+    '''
+    Returns a deterministic embedding vector for the text after the configured latency
+    '''
+    time.sleep(FAKE_LLM_SETTINGS["latency_ms"] / 1000 / 10)
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode('utf-8')).hexdigest(), 16) % dimensions] += 1.0
+    return vector
+
+def _text_response(text: str, prompt_tokens: int) -> protos.GenerateContentResponse:
+    return protos.GenerateContentResponse(
+        candidates=[protos.Candidate(content=protos.Content(role='model', parts=[protos.Part(text=text)]), finish_reason=1)],
+        usage_metadata=protos.GenerateContentResponse.UsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=max(1, len(text) // 4),
+            total_token_count=prompt_tokens + max(1, len(text) // 4)
+        )
+    )
+
+def _function_call_response(name: str, args: dict, prompt_tokens: int) -> protos.GenerateContentResponse:
+    return _function_calls_response([(name, args)], prompt_tokens)
+
+def _function_calls_response(calls: list, prompt_tokens: int) -> protos.GenerateContentResponse:
+    parts = [protos.Part(function_call=protos.FunctionCall(name=name, args=args)) for name, args in calls]
+    candidates_tokens = sum(len(str(args)) for _, args in calls) // 4
+    return protos.GenerateContentResponse(
+        candidates=[protos.Candidate(content=protos.Content(role='model', parts=parts), finish_reason=1)],
+        usage_metadata=protos.GenerateContentResponse.UsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=candidates_tokens,
+            total_token_count=prompt_tokens + candidates_tokens
+        )
+    )
+
+def _blocked_response(prompt_tokens: int) -> protos.GenerateContentResponse:
+    return protos.GenerateContentResponse(
+        prompt_feedback=protos.GenerateContentResponse.PromptFeedback(
+            block_reason=protos.GenerateContentResponse.PromptFeedback.BlockReason.SAFETY
+        ),
+        usage_metadata=protos.GenerateContentResponse.UsageMetadata(prompt_token_count=prompt_tokens, total_token_count=prompt_tokens)
+    )
+
+def _contents_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    texts = []
+    for item in contents if isinstance(contents, list) else [contents]:
+        if isinstance(item, str):
+            texts.append(item)
+            continue
+        parts = item.get('parts', []) if isinstance(item, dict) else getattr(item, 'parts', [])
+        for part in parts:
+            texts.append(part if isinstance(part, str) else getattr(part, 'text', '') or '')
+    return "\n".join(texts)
+
+def _last_user_text(contents) -> str:
+    if isinstance(contents, list) and contents:
+        text = _contents_text([contents[-1]])
+    else:
+        text = _contents_text(contents)
+    # The job sections turn wraps the user's message in BUILD_JOB_SECTIONS_PROMPT
+    if "User Message:" in text:
+        text = text.split("User Message:", 1)[1].split("Your Task:", 1)[0]
+    return text
+
+# Fake model with the same interface as google.generativeai.GenerativeModel
+class FakeGenerativeModel:
+    '''
+    Returns canned text, streamed text, job sections function calls, blocked prompts or transient errors
+    after the configured latency, without any network access
+    '''
+    def __init__(self, model_name: str, tools=None, generation_config=None, system_instruction: str | None = None):
+        self.model_name = model_name
+        self.tools = tools
+        self.generation_config = generation_config
+        self.system_instruction = system_instruction
+        self._tool_names = set()
+        for tool in tools or []:
+            declarations = getattr(tool, 'function_declarations', None) or (tool.get('function_declarations', []) if isinstance(tool, dict) else [])
+            for declaration in declarations:
+                self._tool_names.add(declaration['name'] if isinstance(declaration, dict) else declaration.name)
+
+    def _build_response(self, contents) -> protos.GenerateContentResponse:
+        settings = FAKE_LLM_SETTINGS
+        prompt_tokens = max(1, len(_contents_text(contents)) // 4)
+        if random.random() < settings["error_rate"]:
+            raise google_exceptions.ServiceUnavailable("Fake LLM transient error")
+        if random.random() < settings["block_rate"]:
+            return _blocked_response(prompt_tokens)
+
+        last_user_text = _last_user_text(contents).lower()
+        wants_edit_function_calls = any(word in last_user_text for word in EDIT_FUNCTION_CALL_TRIGGER_WORDS)
+        if {"modify_job_sections", "update_job_sections"} <= self._tool_names and wants_edit_function_calls:
+            return _function_calls_response([
+                ("modify_job_sections", {"target_section_heading": "Responsibilities", "modification_instruction": last_user_text.strip()}),
+                ("modify_job_sections", {"target_section_heading": "Required Qualifications", "modification_instruction": last_user_text.strip()}),
+                ("update_job_sections", FAKE_JOB_BENEFITS_UPDATE_ARGS)
+            ], prompt_tokens)
+        wants_function_call = any(word in last_user_text for word in FUNCTION_CALL_TRIGGER_WORDS) or random.random() < settings["function_call_rate"]
+        if "generate_job_sections" in self._tool_names and wants_function_call:
+            return _function_call_response("generate_job_sections", FAKE_JOB_SECTIONS_ARGS, prompt_tokens)
+
+        # Roughly one token per word, so the output cap of the routed task profile shortens the reply like a real model would
+        max_output_tokens = (self.generation_config or {}).get('max_output_tokens') or settings["response_words"]
+        text = " ".join(random.choice(FAKE_WORDS) for _ in range(min(settings["response_words"], max_output_tokens)))
+        return _text_response(text.capitalize() + ".", prompt_tokens)
+
+    def _stream_chunks(self, response: protos.GenerateContentResponse):
+        settings = FAKE_LLM_SETTINGS
+        if not response.candidates or response.candidates[0].content.parts[0].function_call.name:
+            yield response
+            return
+        words = response.candidates[0].content.parts[0].text.split(' ')
+        chunk_words = max(1, settings["chunk_words"])
+        for start in range(0, len(words), chunk_words):
+            if start:
+                time.sleep(settings["chunk_latency_ms"] / 1000)
+            chunk_text = " ".join(words[start:start + chunk_words]) + (" " if start + chunk_words < len(words) else "")
+            chunk = _text_response(chunk_text, response.usage_metadata.prompt_token_count)
+            yield chunk
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        # A share of the calls is slow, to reproduce the latency tail that hedged requests and deadlines deal with
+        slow = random.random() < FAKE_LLM_SETTINGS["slow_rate"]
+        time.sleep(FAKE_LLM_SETTINGS["slow_latency_ms" if slow else "latency_ms"] / 1000)
+        response = self._build_response(contents)
+        if stream:
+            return GenerateContentResponse.from_iterator(self._stream_chunks(response))
+        return GenerateContentResponse.from_response(response)
+
+    def start_chat(self, history: list | None = None):
+        return FakeChatSession(self, history or [])
+
+# Fake chat session with the same interface as google.generativeai.ChatSession
+class FakeChatSession:
+    def __init__(self, model: FakeGenerativeModel, history: list):
+        self.model = model
+        self.history = list(history)
+
+    def send_message(self, content, **kwargs):
+        self.history.append({"role": "user", "parts": [content]})
+        response = self.model.generate_content(self.history, **kwargs)
+        return response
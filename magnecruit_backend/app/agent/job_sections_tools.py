@@ -52,7 +52,7 @@ generate_job_sections_declaration = {
 # Modify a specific section of the job description sections based on user instruction
 modify_job_sections_declared = {
     "name": "modify_job_sections",
-    "description": "Modifies a specific section (e.g., Responsibilities, Qualifications) of the *currently existing* job description sections based on user instruction. Use only AFTER a section exists.",
+    "description": "Modifies a specific section (e.g., Responsibilities, Qualifications) of the *currently existing* job description sections based on user instruction. Use only AFTER a section exists. Prefer this over regenerating the whole job description when only one section changes, and call it once per section to change.",
     "parameters": {
         "type": "object",
         "properties": {
@@ -72,7 +72,7 @@ modify_job_sections_declared = {
 # Update a specific section of the job description sections based on user instruction
 update_job_sections_declaration = {
     "name": "update_job_sections",
-    "description": "Updates specific details of a job sections based on the user conversation. Only call this when new information for the sections is identified.",
+    "description": "Updates specific details of a job sections based on the user conversation, leaving the other fields and sections as they are. Only call this when new information for the sections is identified.",
     "parameters": {
         "type": "OBJECT",
         "properties": {
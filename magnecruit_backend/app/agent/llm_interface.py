@@ -1,14 +1,79 @@
 # magnecruit_backend\app\agent\llm_interface.py
 
 import os
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import google.generativeai as genai
-from google.generativeai.types import GenerationConfigDict, Tool
+from google.generativeai.types import GenerationConfigDict, Tool, BlockedPromptException, GenerateContentResponse
+from .fake_llm import FakeGenerativeModel, fake_embed_content
+from .llm_resilience import (
+    LLM_ATTEMPT_TIMEOUT_SECONDS,
+    LLM_CALL_DEADLINE_SECONDS,
+    LLMUnavailableError,
+    LLMDeadlineExceededError,
+    call_with_resilience
+)
+from ..services.metrics import metrics_registry, time_stage, STAGE_DURATION_BUCKETS
 
 API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
+
+# 'gemini' for the Google Gemini API or 'fake' for the local stand-in in fake_llm, used for load testing
+LLM_BACKEND = os.getenv("LLM_BACKEND", 'gemini')
+if not API_KEY and LLM_BACKEND != 'fake':
     print("Error: GEMINI_API_KEY environment variable not set.")
 
 MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", 'gemini-1.5-flash-latest')
+MODEL_REGISTRY_MAX_SIZE = int(os.getenv("GEMINI_MODEL_REGISTRY_MAX_SIZE", 32))
+FAST_MODEL_NAME = os.getenv("GEMINI_FAST_MODEL_NAME", MODEL_NAME)
+EMBEDDING_MODEL_NAME = os.getenv("GEMINI_EMBEDDING_MODEL_NAME", 'models/text-embedding-004')
+EMBEDDING_DIMENSIONS = int(os.getenv("GEMINI_EMBEDDING_DIMENSIONS", 256))
+
+# Model and generation config overrides of each task type, so short tasks can go to a faster model with a small output cap.
+# LLM_TASK_PROFILES takes a JSON object that overrides them per task, e.g. {"confirmation": {"model_name": "gemini-1.5-flash-8b"}}
+TASK_MODEL_PROFILES = {
+    'general_chat': {'model_name': MODEL_NAME, 'max_output_tokens': 2048},
+    'job_sections': {'model_name': MODEL_NAME, 'max_output_tokens': 4096},
+    'section_rewrite': {'model_name': FAST_MODEL_NAME, 'max_output_tokens': 1024},
+    'confirmation': {'model_name': FAST_MODEL_NAME, 'max_output_tokens': 64, 'temperature': 0.5},
+    'linkedin_post': {'model_name': MODEL_NAME, 'max_output_tokens': 1024},
+    'summary': {'model_name': FAST_MODEL_NAME, 'max_output_tokens': 512, 'temperature': 0.2},
+}
+for _task, _profile_overrides in json.loads(os.getenv("LLM_TASK_PROFILES") or '{}').items():
+    TASK_MODEL_PROFILES[_task] = {**TASK_MODEL_PROFILES.get(_task, {'model_name': MODEL_NAME}), **_profile_overrides}
+
+# Blocking LLM calls run in a bounded pool of native threads so they do not stall the eventlet hub
+LLM_EXECUTION_MODE = os.getenv("LLM_EXECUTION_MODE", 'tpool')
+LLM_THREAD_POOL_SIZE = int(os.getenv("LLM_THREAD_POOL_SIZE", 20))
+LLM_MAX_QUEUED_CALLS = int(os.getenv("LLM_MAX_QUEUED_CALLS", 50))
+LLM_MAX_CALLS_PER_USER = int(os.getenv("LLM_MAX_CALLS_PER_USER", 2))
+
+try:
+    from eventlet import tpool
+    tpool.set_num_threads(LLM_THREAD_POOL_SIZE)
+except ImportError:
+    tpool = None
+
+# Process-wide registry of the configured models, keyed by (model name, tools, system instruction, generation config)
+_model_registry: OrderedDict = OrderedDict()
+_model_registry_lock = threading.Lock()
+_client_configured = False
+
+# Admitted LLM work, used for the queue-depth limit and the per-user concurrency caps
+_llm_admission_lock = threading.Lock()
+_llm_calls_in_flight = 0
+_llm_calls_in_flight_by_user: dict = {}
+
+class LLMBackpressureError(Exception):
+    '''
+    Raised when an LLM call is rejected because the worker pool queue or the user's concurrency cap is full
+    '''
+    def __init__(self, message: str, scope: str):
+        super().__init__(message)
+        self.scope = scope
 
 # Get the generation config parameters for the LLM
 def get_generation_config_params() -> GenerationConfigDict:
@@ -22,51 +87,319 @@ def get_generation_config_params() -> GenerationConfigDict:
         max_output_tokens=4096,
     )
 
-# Get the Gemini model with the specified parameters
-def get_gemini_model(model_name: str = MODEL_NAME,
-                     tools: list[Tool | dict] | None = None,
-                     system_instruction: str | None = None):
+# Estimate the number of tokens in the text, roughly four characters per token for the Gemini models
+def estimate_tokens(text: str | None) -> int:
+    '''
+    Returns a cheap local estimate of the token count of the text, without calling the API
+    '''
+    return (len(text) + 3) // 4 if text else 0
+
+# Configure the Gemini client once per process so the underlying transport is reused across requests
+def configure_gemini_client(force: bool = False):
     '''
-    Returns the Gemini model with the specified config parameters
+    Configures the Gemini client with the API key, unless it is already configured and force is not set
     '''
+    global _client_configured
+    if LLM_BACKEND == 'fake':
+        return
     if not API_KEY:
         raise ValueError("AI service is not configured. GEMINI_API_KEY missing.")
-    
-    genai.configure(api_key=API_KEY)
+
+    with _model_registry_lock:
+        if force or not _client_configured:
+            genai.configure(api_key=API_KEY)
+            _client_configured = True
+
+# Build a stable registry key for the tools passed to the model
+def _tools_registry_key(tools: list[Tool | dict] | None) -> str | None:
+    '''
+    Returns a hash of the tool declarations, or None when no tools are given
+    '''
+    if not tools:
+        return None
+    digest = hashlib.sha256()
+    for tool in tools:
+        if hasattr(tool, 'to_proto'):
+            tool_proto = tool.to_proto()
+            digest.update(type(tool_proto).serialize(tool_proto))
+        else:
+            digest.update(json.dumps(tool, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+# Get the Gemini model with the specified parameters, reusing the registered model if it was already built
+def get_gemini_model(model_name: str = MODEL_NAME,
+                     tools: list[Tool | dict] | None = None,
+                     system_instruction: str | None = None,
+                     generation_config: GenerationConfigDict | None = None,
+                     task: str | None = None):
+    '''
+    Returns the Gemini model with the specified config parameters from the process-wide model registry.
+    The task, if any, labels the metrics of the calls made with the model
+    '''
+    configure_gemini_client()
+    generation_config = generation_config or get_generation_config_params()
+    registry_key = (model_name, _tools_registry_key(tools), system_instruction, json.dumps(generation_config, sort_keys=True), task)
+
+    with _model_registry_lock:
+        model = _model_registry.get(registry_key)
+        if model is not None:
+            _model_registry.move_to_end(registry_key)
+            return model
+
     try:
         model_args = {
             "model_name": model_name,
             "tools": tools,
-            "generation_config": get_generation_config_params()
+            "generation_config": generation_config
         }
         if system_instruction:
             model_args["system_instruction"] = system_instruction
 
-        model = genai.GenerativeModel(**model_args)
-        return model
+        if LLM_BACKEND == 'fake':
+            model = FakeGenerativeModel(**model_args)
+        else:
+            model = genai.GenerativeModel(**model_args)
+        model.routed_task = task
     except Exception as e:
         print(f"Error initializing Google Generative AI model: {e}")
         raise
 
+    with _model_registry_lock:
+        model = _model_registry.setdefault(registry_key, model)
+        _model_registry.move_to_end(registry_key)
+        while len(_model_registry) > MODEL_REGISTRY_MAX_SIZE:
+            _model_registry.popitem(last=False)
+    return model
+
+# Get the model and generation config profile of a task type
+def get_task_profile(task: str) -> dict:
+    '''
+    Returns the model name and generation config of the task, the default model and generation config for unknown tasks
+    '''
+    profile_overrides = dict(TASK_MODEL_PROFILES.get(task) or {})
+    model_name = profile_overrides.pop('model_name', MODEL_NAME)
+    return {'model_name': model_name, 'generation_config': {**get_generation_config_params(), **profile_overrides}}
+
+# Get the model routed to the task type from the model registry
+def get_model_for_task(task: str, tools: list[Tool | dict] | None = None, system_instruction: str | None = None):
+    '''
+    Returns the Gemini model of the task's profile and records the routing decision
+    '''
+    task_profile = get_task_profile(task)
+    metrics_registry.inc('llm_routing_decisions_total', task=task, model=task_profile['model_name'])
+    return get_gemini_model(
+        model_name=task_profile['model_name'], tools=tools, system_instruction=system_instruction,
+        generation_config=task_profile['generation_config'], task=task
+    )
+
+# Invalidate the model registry, for example after rotating the API key or changing the model configuration
+def invalidate_model_registry(reconfigure_client: bool = False):
+    '''
+    Clears all the registered models and optionally forces the Gemini client to be configured again on next use
+    '''
+    global _client_configured
+    with _model_registry_lock:
+        _model_registry.clear()
+        if reconfigure_client:
+            _client_configured = False
+
+# Admit a unit of LLM work for the user, rejecting it when the pool queue or the user's cap is full
+@contextmanager
+def llm_admission(user_id: int | None = None):
+    '''
+    Context manager that holds an LLM slot for the user and raises LLMBackpressureError when none is available
+    '''
+    global _llm_calls_in_flight
+    with _llm_admission_lock:
+        if _llm_calls_in_flight >= LLM_THREAD_POOL_SIZE + LLM_MAX_QUEUED_CALLS:
+            metrics_registry.inc('llm_rejected_calls_total', scope='global')
+            raise LLMBackpressureError("The AI service is busy right now. Please try again in a moment.", scope='global')
+        if user_id is not None and _llm_calls_in_flight_by_user.get(user_id, 0) >= LLM_MAX_CALLS_PER_USER:
+            metrics_registry.inc('llm_rejected_calls_total', scope='user')
+            raise LLMBackpressureError("Please wait for your previous requests to finish before sending another one.", scope='user')
+        _llm_calls_in_flight += 1
+        if user_id is not None:
+            _llm_calls_in_flight_by_user[user_id] = _llm_calls_in_flight_by_user.get(user_id, 0) + 1
+    try:
+        yield
+    finally:
+        with _llm_admission_lock:
+            _llm_calls_in_flight -= 1
+            if user_id is not None:
+                remaining_user_calls = _llm_calls_in_flight_by_user.get(user_id, 1) - 1
+                if remaining_user_calls > 0:
+                    _llm_calls_in_flight_by_user[user_id] = remaining_user_calls
+                else:
+                    _llm_calls_in_flight_by_user.pop(user_id, None)
+
+# Report the admitted LLM work on /metrics
+def _admission_metrics() -> list:
+    with _llm_admission_lock:
+        return [('llm_calls_in_flight', {}, _llm_calls_in_flight)]
+
+metrics_registry.describe('llm_calls_in_flight', 'gauge', 'LLM calls admitted and not yet finished, running or queued for the thread pool.')
+metrics_registry.describe('llm_rejected_calls_total', 'counter', 'LLM calls rejected by the admission control, by scope.')
+metrics_registry.register_collector(_admission_metrics)
+
+# Run a blocking LLM client call in the native thread pool, or inline when the pool is disabled
+def run_in_llm_pool(fn, *args, **kwargs):
+    '''
+    Returns the result of fn(*args, **kwargs) executed off the eventlet hub
+    '''
+    if LLM_EXECUTION_MODE == 'tpool' and tpool is not None:
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+# Generate content from the gemini model without blocking the other green threads
+def generate_content(model, contents, **kwargs):
+    '''
+    Returns the response of model.generate_content executed in the LLM thread pool, retried on transient errors and hedged
+    when enabled. Raises LLMUnavailableError while the model's circuit is open and LLMDeadlineExceededError past the deadline
+    '''
+    streamed = bool(kwargs.get('stream'))
+    if LLM_BACKEND != 'fake':
+        kwargs.setdefault('request_options', {'timeout': LLM_CALL_DEADLINE_SECONDS if streamed else LLM_ATTEMPT_TIMEOUT_SECONDS})
+    with _llm_call_metrics(model):
+        response = call_with_resilience(
+            lambda: run_in_llm_pool(model.generate_content, contents, **kwargs),
+            _model_name(model), _model_task(model), streamed=streamed
+        )
+    if not streamed:
+        _record_llm_response(response)
+    return response
+
+# Embed the text with the embedding model without blocking the other green threads
+def embed_text(text: str) -> list[float]:
+    '''
+    Returns the embedding vector of the text
+    '''
+    configure_gemini_client()
+    metrics_registry.inc('llm_requests_total', model=EMBEDDING_MODEL_NAME)
+
+    def embed():
+        if LLM_BACKEND == 'fake':
+            return run_in_llm_pool(fake_embed_content, text, EMBEDDING_DIMENSIONS)
+        result = run_in_llm_pool(
+            genai.embed_content, model=EMBEDDING_MODEL_NAME, content=text, output_dimensionality=EMBEDDING_DIMENSIONS,
+            request_options={'timeout': LLM_ATTEMPT_TIMEOUT_SECONDS}
+        )
+        return result['embedding']
+
+    try:
+        with time_stage('embedding'):
+            return call_with_resilience(embed, EMBEDDING_MODEL_NAME, 'embedding')
+    except Exception as e:
+        metrics_registry.inc('llm_errors_total', error=type(e).__name__)
+        raise
+
+def _model_name(model) -> str:
+    return getattr(model, 'model_name', MODEL_NAME)
+
+def _model_task(model) -> str:
+    return getattr(model, 'routed_task', None) or 'unrouted'
+
+# Count and time an LLM call, recording the error type when it raises
+@contextmanager
+def _llm_call_metrics(model):
+    model_name = _model_name(model)
+    task = _model_task(model)
+    metrics_registry.inc('llm_requests_total', model=model_name)
+    started = time.perf_counter()
+    try:
+        with time_stage('llm_call'):
+            yield
+    except Exception as e:
+        metrics_registry.inc('llm_errors_total', error=type(e).__name__)
+        raise
+    finally:
+        metrics_registry.observe('llm_call_seconds', time.perf_counter() - started, task=task, model=model_name)
+
+# Record the token usage and the block reason reported on a completed LLM response
+def _record_llm_response(response):
+    usage_metadata = getattr(response, 'usage_metadata', None)
+    if usage_metadata:
+        metrics_registry.inc('llm_tokens_total', usage_metadata.prompt_token_count, direction='in')
+        metrics_registry.inc('llm_tokens_total', usage_metadata.candidates_token_count, direction='out')
+    prompt_feedback = getattr(response, 'prompt_feedback', None)
+    if prompt_feedback and prompt_feedback.block_reason:
+        metrics_registry.inc('llm_blocked_prompts_total', reason=prompt_feedback.block_reason.name)
+
 # Get the chat response from the gemini model
 def get_gemini_chat_response(user_message_content: str, 
                              conversation_history: list = None, 
                              tools: list[Tool | dict] | None = None, 
-                             system_instruction: str | None = None):
+                             system_instruction: str | None = None,
+                             task: str | None = None):
     '''
-    Returns the chat response from the gemini model
+    Returns the chat response from the gemini model, the model routed to the task when it is given
     '''
-    if not API_KEY:
+    if not API_KEY and LLM_BACKEND != 'fake':
         return {"error": "AI service is not configured. Please check the API key."}
 
     try:
-        model = get_gemini_model(tools=tools, system_instruction=system_instruction)
-        chat_session = model.start_chat(history=conversation_history or [])
-        response = chat_session.send_message(user_message_content)
+        if task:
+            model = get_model_for_task(task, tools=tools, system_instruction=system_instruction)
+        else:
+            model = get_gemini_model(tools=tools, system_instruction=system_instruction)
+        # Each attempt sends the message on a fresh chat session, so a failed attempt leaves no trace in the history of the next
+        def send_message():
+            chat_session = model.start_chat(history=conversation_history or [])
+            if LLM_BACKEND == 'fake':
+                return run_in_llm_pool(chat_session.send_message, user_message_content)
+            return run_in_llm_pool(chat_session.send_message, user_message_content, request_options={'timeout': LLM_ATTEMPT_TIMEOUT_SECONDS})
+
+        with _llm_call_metrics(model):
+            response = call_with_resilience(send_message, _model_name(model), _model_task(model))
+        _record_llm_response(response)
         return response
+    except (LLMUnavailableError, LLMDeadlineExceededError) as e:
+        print(f"Google Gemini API call failed: {e}")
+        return {"error": str(e)}
     except ValueError as ve:
         print(f"Configuration error calling Google Gemini API: {ve}")
         return {"error": str(ve)}
     except Exception as e:
         print(f"Error calling Google Gemini API: {e}")
-        return {"error": f"Sorry, I encountered an error calling the AI: {e}"}
\ No newline at end of file
+        return {"error": f"Sorry, I encountered an error calling the AI: {e}"}
+
+# Stream the content from the gemini model and forward each text chunk as it arrives
+def generate_content_streamed(model, contents, on_text_chunk):
+    '''
+    Returns the fully resolved response after forwarding every text chunk of the stream to on_text_chunk.
+    A failed stream is retried on transient errors only until its first chunk was forwarded, since the client already shows it
+    '''
+    chunks_forwarded = False
+    request_kwargs = {} if LLM_BACKEND == 'fake' else {'request_options': {'timeout': LLM_CALL_DEADLINE_SECONDS}}
+
+    def stream():
+        nonlocal chunks_forwarded
+        response = run_in_llm_pool(model.generate_content, contents, stream=True, **request_kwargs)
+        chunk_iterator = iter(response)
+        while True:
+            try:
+                chunk = run_in_llm_pool(next, chunk_iterator, None)
+            except BlockedPromptException:
+                # A blocked stream never completes, so hand back a resolved response that carries the block reason for the caller
+                return GenerateContentResponse.from_response(
+                    genai.protos.GenerateContentResponse(prompt_feedback=response.prompt_feedback, usage_metadata=response.usage_metadata)
+                )
+            if chunk is None:
+                response.resolve()
+                return response
+            if not chunk.candidates:
+                continue
+            for part in chunk.candidates[0].content.parts:
+                text_chunk = getattr(part, 'text', None)
+                if text_chunk:
+                    chunks_forwarded = True
+                    on_text_chunk(text_chunk)
+
+    with _llm_call_metrics(model):
+        response = call_with_resilience(
+            stream, _model_name(model), _model_task(model), streamed=True, retry_allowed=lambda: not chunks_forwarded
+        )
+    _record_llm_response(response)
+    return response
+
+metrics_registry.describe('llm_routing_decisions_total', 'counter', 'Models picked for LLM tasks by the task router, by task and model.')
+metrics_registry.describe('llm_call_seconds', 'histogram', 'Duration of LLM calls, by task and model.', buckets=STAGE_DURATION_BUCKETS)
@@ -0,0 +1,281 @@
+# magnecruit_backend\app\agent\llm_resilience.py
+
+import os
+import time
+import random
+import threading
+from collections import deque
+import eventlet
+import eventlet.queue
+from google.api_core import exceptions as google_exceptions
+from ..services.metrics import metrics_registry, nearest_rank_percentile
+
+# Deadline of a whole LLM call including its retries, and the timeout of each non-streamed attempt
+LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", 45))
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", 20))
+
+# Retries of transient errors, after a full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", 0.5))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", 4))
+
+# Hedged requests, a second attempt sent when the first is slower than the task's recent latency percentile
+LLM_HEDGE_ENABLED = (os.getenv("LLM_HEDGE_ENABLED") or 'false').lower() == 'true'
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", 0.5))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", 200))
+
+# Circuit breaker of each model, opened after consecutive calls failed even after their retries, and probed again after the reset time
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
+class LLMUnavailableError(Exception):
+    '''
+    Raised without calling the model while the circuit breaker of the model is open
+    '''
+    def __init__(self, message: str = "The AI service is temporarily unavailable. Please try again in a moment."):
+        super().__init__(message)
+
+class LLMDeadlineExceededError(Exception):
+    '''
+    Raised when an LLM call, including its retries, does not complete before its deadline
+    '''
+    def __init__(self, message: str = "The AI service took too long to respond. Please try again."):
+        super().__init__(message)
+
+# Timeout of a single attempt, retried while the deadline of the call allows it
+class _AttemptTimeoutError(TimeoutError):
+    pass
+
+# Errors worth retrying: server errors, rate limits, timeouts and dropped connections
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    ConnectionError,
+    TimeoutError,
+)
+
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, RETRYABLE_EXCEPTIONS)
+
+# Circuit breaker that fails fast while the upstream model keeps failing
+class CircuitBreaker:
+    '''
+    Closed: calls go through. Open: calls raise LLMUnavailableError until reset_seconds have passed.
+    Half open: a single probe call goes through, closing the breaker on success and opening it again on failure
+    '''
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def _transition(self, state: str):
+        if self._state != state:
+            self._state = state
+            metrics_registry.inc('llm_circuit_transitions_total', model=self.name, state=state)
+
+    def before_call(self):
+        '''
+        Raises LLMUnavailableError when the call must not reach the model
+        '''
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    metrics_registry.inc('llm_circuit_rejected_calls_total', model=self.name)
+                    raise LLMUnavailableError()
+                self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    metrics_registry.inc('llm_circuit_rejected_calls_total', model=self.name)
+                    raise LLMUnavailableError()
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._transition(self.CLOSED)
+
+    def abandon_call(self):
+        '''
+        Releases the probe of a call that ended without an outcome, for example when its green thread was killed
+        '''
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+_circuit_breakers: dict = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    '''
+    Returns the circuit breaker of the model, created on first use
+    '''
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(model_name)
+        if breaker is None:
+            breaker = _circuit_breakers[model_name] = CircuitBreaker(model_name, LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+        return breaker
+
+def reset_circuit_breakers():
+    '''
+    Forgets every circuit breaker and its state
+    '''
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
+
+# Recent durations of the successful non-streamed attempts of each task, from which the hedging delay is derived
+_attempt_latencies: dict = {}
+_attempt_latencies_lock = threading.Lock()
+
+def _record_attempt_latency(task: str, seconds: float):
+    with _attempt_latencies_lock:
+        _attempt_latencies.setdefault(task, deque(maxlen=LLM_LATENCY_WINDOW)).append(seconds)
+
+def hedge_delay(task: str) -> float | None:
+    '''
+    Returns the time to wait for the first attempt before sending a hedged one, None until enough attempts were observed
+    '''
+    with _attempt_latencies_lock:
+        latencies = list(_attempt_latencies.get(task) or ())
+    if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return max(LLM_HEDGE_MIN_DELAY_SECONDS, nearest_rank_percentile(latencies, LLM_HEDGE_PERCENTILE))
+
+# Run a single attempt, recording its duration for the hedging delay unless it is streamed, since a stream's duration
+# grows with its reply and would push the percentile of the task's non-streamed calls past the point of hedging them
+def _run_attempt(fn, timeout: float | None, task: str, record_latency: bool = True):
+    started = time.perf_counter()
+    timeout_error = _AttemptTimeoutError(f"LLM attempt exceeded {timeout:.1f}s") if timeout is not None else None
+    with eventlet.Timeout(timeout, timeout_error):
+        result = fn()
+    if record_latency:
+        _record_attempt_latency(task, time.perf_counter() - started)
+    return result
+
+# Run the attempt and, when it is slower than the task's latency percentile, a second one, returning the first success
+def _run_hedged_attempt(fn, timeout: float, task: str, delay: float):
+    results = eventlet.queue.LightQueue()
+
+    def run(hedged: bool):
+        try:
+            results.put((hedged, None, _run_attempt(fn, timeout, task)))
+        except BaseException as e:
+            results.put((hedged, e, None))
+
+    attempts = [eventlet.spawn(run, False)]
+    try:
+        try:
+            outcomes = [results.get(timeout=delay)]
+        except eventlet.queue.Empty:
+            metrics_registry.inc('llm_hedged_requests_total', task=task, outcome='sent')
+            attempts.append(eventlet.spawn(run, True))
+            outcomes = [results.get()]
+        while outcomes[-1][1] is not None and len(outcomes) < len(attempts):
+            outcomes.append(results.get())
+        hedged, error, result = next((outcome for outcome in outcomes if outcome[1] is None), outcomes[-1])
+        if error is not None:
+            raise error
+        if hedged:
+            metrics_registry.inc('llm_hedged_requests_total', task=task, outcome='won')
+        return result
+    finally:
+        # The losing attempt keeps its native thread until the client returns, only its green thread is released
+        for attempt in attempts:
+            attempt.kill()
+
+# Call the model through the circuit breaker, with a deadline, jittered retries of transient errors and optional hedging
+def call_with_resilience(fn, model_name: str, task: str, streamed: bool = False, retry_allowed=None, deadline_seconds: float | None = None):
+    '''
+    Returns fn() once it succeeds. fn must be safe to call again and, unless streamed, concurrently.
+    Streamed calls are not hedged, their attempts are only bounded by the deadline of the call, and they are only retried
+    while retry_allowed() holds (for example before the first chunk reached the client).
+    Raises LLMUnavailableError while the model's circuit is open, LLMDeadlineExceededError when the deadline passes,
+    or the error of the last attempt
+    '''
+    breaker = get_circuit_breaker(model_name)
+    breaker.before_call()
+    deadline = time.monotonic() + (deadline_seconds or LLM_CALL_DEADLINE_SECONDS)
+    attempt = 0
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics_registry.inc('llm_deadline_exceeded_total', task=task)
+                raise LLMDeadlineExceededError()
+            try:
+                if streamed:
+                    result = _run_attempt(fn, remaining, task, record_latency=False)
+                else:
+                    attempt_timeout = min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS)
+                    delay = hedge_delay(task) if LLM_HEDGE_ENABLED else None
+                    if delay is not None and delay < attempt_timeout:
+                        result = _run_hedged_attempt(fn, attempt_timeout, task, delay)
+                    else:
+                        result = _run_attempt(fn, attempt_timeout, task)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_DELAY_SECONDS, LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+                can_retry = attempt < LLM_MAX_RETRIES and (retry_allowed is None or retry_allowed())
+                if not can_retry or time.monotonic() + backoff >= deadline:
+                    if isinstance(e, _AttemptTimeoutError):
+                        metrics_registry.inc('llm_deadline_exceeded_total', task=task)
+                        raise LLMDeadlineExceededError() from e
+                    raise
+                metrics_registry.inc('llm_retries_total', task=task, error=type(e).__name__)
+                eventlet.sleep(backoff)
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+    except (LLMDeadlineExceededError, *RETRYABLE_EXCEPTIONS):
+        # The call failed with the model down or too slow, after its retries
+        breaker.record_failure()
+        raise
+    except Exception:
+        # The model answered, so it is up even though the request failed
+        breaker.record_success()
+        raise
+    except BaseException:
+        breaker.abandon_call()
+        raise
+
+# Report the state of every circuit breaker on /metrics
+def _circuit_breaker_metrics() -> list:
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return [('llm_circuit_state', {'model': breaker.name}, CircuitBreaker.STATE_VALUES[breaker.state]) for breaker in breakers]
+
+metrics_registry.describe('llm_circuit_state', 'gauge', 'State of the circuit breaker of each model: 0 closed, 1 half open, 2 open.')
+metrics_registry.describe('llm_circuit_transitions_total', 'counter', 'Circuit breaker state changes, by model and new state.')
+metrics_registry.describe('llm_circuit_rejected_calls_total', 'counter', 'LLM calls failed fast by an open circuit breaker, by model.')
+metrics_registry.describe('llm_retries_total', 'counter', 'Retried LLM attempts, by task and error type.')
+metrics_registry.describe('llm_hedged_requests_total', 'counter', 'Hedged LLM attempts sent and won, by task.')
+metrics_registry.describe('llm_deadline_exceeded_total', 'counter', 'LLM calls that failed their deadline, by task.')
+metrics_registry.register_collector(_circuit_breaker_metrics)
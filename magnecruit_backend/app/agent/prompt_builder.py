@@ -0,0 +1,161 @@
+# magnecruit_backend\app\agent\prompt_builder.py
+
+import re
+import json
+from . import llm_interface
+from .prompts import (
+    BUILD_JOB_SECTIONS_PROMPT,
+    CONVERSATION_SUMMARY_CONTEXT_TEMPLATE,
+    JOB_SECTIONS_HISTORY_OMITTED_NOTE,
+    MODIFY_JOB_SECTION_PROMPT
+)
+from ..services.metrics import metrics_registry
+
+# Upper bounds of the prompt size histogram buckets, in estimated tokens
+PROMPT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Lines shorter than this are too generic to tell if the job state covers a message
+COVERED_LINE_MIN_CHARS = 20
+
+_SUMMARY_CONTEXT_PREFIX = CONVERSATION_SUMMARY_CONTEXT_TEMPLATE.split('{summary}')[0]
+
+class PromptBudgetExceededError(ValueError):
+    '''
+    Raised when the prompt of a turn does not fit in the token ceiling even without any conversation history
+    '''
+
+# Strip the indentation of a multi-line prompt template, which costs tokens on every turn without changing its meaning
+def compact_template(template: str) -> str:
+    '''
+    Returns the template with leading whitespace removed from every line
+    '''
+    return re.sub(r"\n[ \t]+", "\n", template).strip()
+
+_COMPACT_BUILD_JOB_SECTIONS_PROMPT = compact_template(BUILD_JOB_SECTIONS_PROMPT)
+_COMPACT_MODIFY_JOB_SECTION_PROMPT = compact_template(MODIFY_JOB_SECTION_PROMPT)
+
+# Serialize the job and its sections as compact JSON for the prompt
+def serialize_job_state(job) -> str:
+    '''
+    Returns the job state as JSON without indentation or empty fields, or "null" when there is no job
+    '''
+    if job is None:
+        return "null"
+    job_state = {
+        "jobrole": job.jobrole,
+        "description": job.description,
+        "sections": [
+            {"section_number": section.section_number, "heading": section.heading, "body": section.body}
+            for section in sorted(job.sections, key=lambda s: s.section_number)
+        ]
+    }
+    job_state = {key: value for key, value in job_state.items() if value}
+    return json.dumps(job_state, separators=(',', ':'), ensure_ascii=False)
+
+def _normalize_text(text: str) -> str:
+    text = re.sub(r"^[\s\-\*•\d\.\)]+", "", text.lower())
+    return " ".join(text.split())
+
+def _is_summary_item(item: dict) -> bool:
+    parts = item.get('parts') or []
+    return item.get('role') == 'user' and bool(parts) and isinstance(parts[0], str) and parts[0].startswith(_SUMMARY_CONTEXT_PREFIX)
+
+# Check if every substantial line of a history message already appears in the job state
+def _is_covered_by_job_state(item: dict, normalized_job_state: str) -> bool:
+    lines = [
+        _normalize_text(line)
+        for part in item.get('parts') or [] if isinstance(part, str)
+        for line in part.splitlines()
+    ]
+    substantial_lines = [line for line in lines if len(line) >= COVERED_LINE_MIN_CHARS]
+    return bool(substantial_lines) and all(line in normalized_job_state for line in substantial_lines)
+
+def _count_tokens(items: list) -> int:
+    return sum(
+        llm_interface.estimate_tokens(part)
+        for item in items for part in item.get('parts') or [] if isinstance(part, str)
+    )
+
+# Build the contents of a job-sections turn within the token ceiling
+def build_job_sections_contents(job, message_content: str, conversation_history: list, system_instruction: str | None,
+                                token_ceiling: int, history_messages_with_job: int) -> tuple[list, dict]:
+    '''
+    Returns the contents for the LLM call, the conversation history followed by the user turn with the compact job state,
+    and the estimated token counts of the prompt.
+    Once a job exists, history messages whose content the job state already holds are dropped and only the newest
+    history_messages_with_job messages are kept, along with the rolling summary. The oldest history is then dropped until
+    the prompt fits in token_ceiling, PromptBudgetExceededError is raised when it does not fit even without history
+    '''
+    job_state_json = serialize_job_state(job)
+    user_turn_content = _COMPACT_BUILD_JOB_SECTIONS_PROMPT.format(current_job_state_json=job_state_json, user_message=message_content)
+
+    history = [
+        {"role": item['role'], "parts": item['parts']}
+        for item in conversation_history if item.get('role') and item.get('parts')
+    ]
+    summary_items = history[:2] if history and _is_summary_item(history[0]) else []
+    message_items = history[len(summary_items):]
+    history_message_count = len(message_items)
+
+    dropped_counts = {'covered': 0, 'window': 0, 'budget': 0}
+    if job is not None and job_state_json != "null":
+        normalized_job_state = _normalize_text(job_state_json.replace('\\n', '\n'))
+        kept_items = [item for item in message_items if not _is_covered_by_job_state(item, normalized_job_state)]
+        dropped_counts['covered'] = len(message_items) - len(kept_items)
+        message_items = kept_items[-history_messages_with_job:] if history_messages_with_job > 0 else []
+        dropped_counts['window'] = len(kept_items) - len(message_items)
+
+    fixed_tokens = llm_interface.estimate_tokens(system_instruction) + llm_interface.estimate_tokens(user_turn_content)
+    if history_message_count:
+        fixed_tokens += llm_interface.estimate_tokens(JOB_SECTIONS_HISTORY_OMITTED_NOTE)
+    if fixed_tokens > token_ceiling:
+        metrics_registry.inc('prompt_budget_exceeded_total', turn='job_sections')
+        raise PromptBudgetExceededError(
+            f"The job-sections prompt needs about {fixed_tokens} tokens, over the ceiling of {token_ceiling}, before any history."
+        )
+
+    history_budget_count = len(message_items)
+    while message_items and fixed_tokens + _count_tokens(summary_items + message_items) > token_ceiling:
+        message_items.pop(0)
+    if summary_items and fixed_tokens + _count_tokens(summary_items + message_items) > token_ceiling:
+        summary_items = []
+    # The contents must start with a user turn
+    while message_items and not summary_items and message_items[0]['role'] != 'user':
+        message_items.pop(0)
+    dropped_counts['budget'] = history_budget_count - len(message_items)
+
+    if len(message_items) < history_message_count:
+        user_turn_content = f"{JOB_SECTIONS_HISTORY_OMITTED_NOTE}\n\n{user_turn_content}"
+    contents = [*summary_items, *message_items, {"role": "user", "parts": [user_turn_content]}]
+
+    prompt_stats = {
+        'system': llm_interface.estimate_tokens(system_instruction),
+        'job_state': llm_interface.estimate_tokens(job_state_json),
+        'history': _count_tokens(summary_items + message_items),
+        'message': llm_interface.estimate_tokens(message_content),
+        'history_messages_kept': len(message_items),
+        'history_messages_dropped': dropped_counts
+    }
+    prompt_stats['total'] = prompt_stats['system'] + _count_tokens(contents)
+    for part in ('system', 'job_state', 'history', 'message', 'total'):
+        metrics_registry.observe('prompt_tokens', prompt_stats[part], turn='job_sections', part=part)
+    for reason, count in dropped_counts.items():
+        if count:
+            metrics_registry.inc('prompt_history_messages_dropped_total', count, turn='job_sections', reason=reason)
+    return contents, prompt_stats
+
+# Build the prompt that rewrites a single section, from the job header and that section only
+def build_section_rewrite_prompt(job_snapshot: dict, section: dict, modification_instruction: str) -> str:
+    '''
+    Returns the section rewrite prompt. Its size depends on the section and not on the rest of the job or the conversation
+    '''
+    job_header = " - ".join(value for value in (job_snapshot.get('jobrole'), job_snapshot.get('description')) if value) or "Untitled role"
+    prompt = _COMPACT_MODIFY_JOB_SECTION_PROMPT.format(
+        job_header=job_header, heading=section['heading'], body=section['body'] or "", modification_instruction=modification_instruction
+    )
+    metrics_registry.observe('prompt_tokens', llm_interface.estimate_tokens(prompt), turn='section_rewrite', part='total')
+    return prompt
+
+metrics_registry.describe('prompt_tokens', 'histogram', 'Estimated prompt tokens of an LLM turn, by turn and prompt part.', buckets=PROMPT_TOKEN_BUCKETS)
+metrics_registry.describe('prompt_history_messages_dropped_total', 'counter', 'History messages left out of a prompt, by turn and reason.')
+metrics_registry.describe('prompt_budget_exceeded_total', 'counter', 'Turns rejected because their prompt exceeded the token ceiling.')
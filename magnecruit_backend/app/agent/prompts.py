@@ -11,6 +11,23 @@ GENERAL_CHAT_PROMPT = """You are Magnec AI, a helpful and versatile recruitment
                         Keep your responses concise and professional.
                         """
 
+# Prompt to fold the older turns of a conversation into its rolling summary
+CONVERSATION_SUMMARY_PROMPT = """You maintain a running summary of a recruitment conversation between a user and Magnec AI.
+                              Update the existing summary with the new messages below. Keep every concrete detail the user provided 
+                              (job role, company, responsibilities, qualifications, benefits, location, salary, preferences and decisions) 
+                              and drop small talk. Write at most 200 words. ONLY output the updated summary.
+
+                              Existing Summary:
+                              {existing_summary}
+
+                              New Messages:
+                              {new_messages}
+                              """
+
+# Context turn that carries the rolling summary at the start of the windowed conversation history
+CONVERSATION_SUMMARY_CONTEXT_TEMPLATE = "Summary of our earlier conversation:\n{summary}"
+CONVERSATION_SUMMARY_ACKNOWLEDGEMENT = "Understood, I'll keep that context in mind."
+
 # Prompt to generate job sections and trigger generate_job_sections function for the user when focused on the Job Sections Writer workspace view
 BUILD_JOB_SECTIONS_PROMPT = """Current State of Job Descriptions including Job Role Title, a short description of the job and its corresponding sections
                               including about the company, responsibilites, required qualifications, preferred qualifications, benefits or additional 
@@ -38,20 +55,44 @@ BUILD_JOB_SECTIONS_PROMPT = """Current State of Job Descriptions including Job R
                               Function to Call When Ready: `generate_job_sections`
                            """
 
+# Note prepended to the job sections turn when older conversation history was left out of the prompt
+JOB_SECTIONS_HISTORY_OMITTED_NOTE = "Note: Earlier messages of the conversation are omitted, the current state of the job below already reflects them."
+
 # Prompt to generate job sections for the user when focused on the Job Sections Writer workspace view
-SYSTEM_PROMPT_JOB_SECTIONS = """You are Magnec AI, focused on creating job descriptions via the `generate_job_sections` function.
+SYSTEM_PROMPT_JOB_SECTIONS = """You are Magnec AI, focused on creating and editing job descriptions via the `generate_job_sections`, 
+                              `update_job_sections` and `modify_job_sections` functions.
                               Your main goal is to collect necessary details (role, company context, responsibilities, qualifications, benefits) through 
                               conversation and then execute the function call.
                               Engage naturally, asking for details if missing.
                               **CRITICAL: When the user indicates they want to proceed (e.g., 'generate', 'yes include everything', 'save this', 
                               'update workspace' and similar things), you MUST synthesize the required information from the ENTIRE conversation history provided.** Do not 
                               re-ask for information you already received in previous turns.
-                              Parse the history to gather arguments for `generate_job_sections` and call it.
+                              Parse the history to gather arguments for `generate_job_sections` and call it to create the job description.
+                              Once the job description exists, prefer `modify_job_sections` to change a single section and `update_job_sections` to 
+                              replace a few fields, instead of generating the whole job description again. Call `modify_job_sections` once per section 
+                              to change, in the same reply when the user asks for several changes at once.
                               If essential information (like target_role) is still missing even after reviewing history, ask ONLY for the missing pieces.
-                              Only call the function or ask clarifying questions.
-                              Function: `generate_job_sections`.
+                              Only call the functions or ask clarifying questions.
+                              Functions: `generate_job_sections`, `update_job_sections`, `modify_job_sections`.
                             """
 
+# Prompt to rewrite a single job section for modify_job_sections, without the conversation history or the other sections
+MODIFY_JOB_SECTION_PROMPT = """Rewrite one section of the job description below as instructed.
+                              ONLY output the new body of the section, without its heading.
+
+                              Job:
+                              {job_header}
+
+                              Section Heading:
+                              {heading}
+
+                              Current Body:
+                              {body}
+
+                              Instruction:
+                              {modification_instruction}
+                              """
+
 # Prompt to generate a confirmation message for the user when focused on the Job Sections Writer workspace view
 CONFIRMATION_PROMPT_TEMPLATE = """The job description and its related contents was just successfully updated based on the function call you initiated.
                                 Please provide a very brief, natural language confirmation message for the user (for example, 'Okay, I've updated the job sections as requested.', 
@@ -59,6 +100,23 @@ CONFIRMATION_PROMPT_TEMPLATE = """The job description and its related contents w
                                 Keep it short and conversational. ONLY output the confirmation message.
                                 """
 
+# Readable names of the generate_job_sections arguments, used to build the local confirmation messages
+CONFIRMATION_FIELD_LABELS = {
+    'target_role': 'job title',
+    'target_role_description': 'role summary',
+    'company_context': 'About the Company section',
+    'responsibilities': 'Responsibilities',
+    'required_qualifications': 'Required Qualifications',
+    'preferred_qualifications': 'Preferred Qualifications',
+    'benefits': 'Benefits and Offers',
+    'additional_information': 'Additional Information',
+}
+
+# Local confirmation messages for the job sections update, used instead of an extra LLM call
+CONFIRMATION_FULL_UPDATE_TEMPLATE = "Done! I've drafted the job description for {job_role} in the workspace. Let me know if you'd like to change anything."
+CONFIRMATION_PARTIAL_UPDATE_TEMPLATE = "Got it, I've updated the {updated_fields} in the workspace."
+CONFIRMATION_FALLBACK_MESSAGE = "OK, job description and its sections updated."
+
 # Prompt to generate a LinkedIn job post for the user when focused on the LinkedIn Post Creator workspace view
 SYSTEM_PROMPT_LINKEDIN_POST = """
 You are MagnecAI, a helpful assistant specialized in crafting engaging LinkedIn job posts.
@@ -18,9 +18,15 @@ class Users(db.Model):
 
 class Conversations(db.Model):
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # Sidebar history: filter by user_id, newest first
+        db.Index('ix_conversations_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     title = db.Column(db.String(255), nullable=True)
+    summary = db.Column(db.Text, nullable=True)
+    summarized_until_message_id = db.Column(db.Integer, nullable=True)
     messages = db.relationship('Messages', backref='conversations', lazy=True, cascade="all, delete-orphan")
     jobs = db.relationship('Jobs', backref='conversations', uselist=False, lazy=True, cascade="all, delete-orphan")
     created_at = db.Column(db.DateTime, default=datetime)
@@ -30,6 +36,10 @@ class Conversations(db.Model):
 
 class Messages(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Conversation history: filter by conversation_id, ordered by timestamp
+        db.Index('ix_messages_conversation_id_timestamp_id', 'conversation_id', 'timestamp', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
     sender = db.Column(db.String(10), nullable=False) 
@@ -43,10 +53,12 @@ class Jobs(db.Model):
     __tablename__ = 'jobs'
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), unique=True, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     jobrole = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     sections = db.relationship('JobSections', backref='jobs', lazy=True, cascade="all, delete-orphan", order_by="JobSections.section_number")
+    linkedin_posts = db.relationship('LinkedInPostCache', backref='jobs', lazy=True, cascade="all, delete-orphan")
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     def __repr__(self):
@@ -54,6 +66,10 @@ class Jobs(db.Model):
 
 class JobSections(db.Model):
     __tablename__ = 'job_sections'
+    __table_args__ = (
+        # Job sections: filter by job_id, ordered by section_number
+        db.Index('ix_job_sections_job_id_section_number', 'job_id', 'section_number'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
     section_number = db.Column(db.Integer, nullable=False)
@@ -61,4 +77,48 @@ class JobSections(db.Model):
     body = db.Column(db.Text, nullable=False)
 
     def __repr__(self):
-        return f'<JobSections {self.section_number} for Jobs {self.job_id}>'
\ No newline at end of file
+        return f'<JobSections {self.section_number} for Jobs {self.job_id}>'
+
+class LinkedInPostCache(db.Model):
+    __tablename__ = 'linkedin_post_cache'
+    __table_args__ = (
+        # Cache lookup: one post per prompt of each job
+        db.UniqueConstraint('job_id', 'prompt_hash', name='uq_linkedin_post_cache_job_id_prompt_hash'),
+        # LRU eviction: oldest last_used_at first
+        db.Index('ix_linkedin_post_cache_last_used_at', 'last_used_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_hash = db.Column(db.String(64), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
+    job_version = db.Column(db.Integer, nullable=False)
+    post_content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    last_used_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f'<LinkedInPostCache {self.prompt_hash[:12]} for Jobs {self.job_id}>'
+
+class Tasks(db.Model):
+    __tablename__ = 'tasks'
+    __table_args__ = (
+        # Task polling and listing: filter by user_id, newest first
+        db.Index('ix_tasks_user_id_created_at', 'user_id', 'created_at'),
+    )
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    progress_message = db.Column(db.String(255), nullable=True)
+    params = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # The worker running the task refreshes heartbeat_at, an unfinished task with an old heartbeat was lost with its worker
+    worker_id = db.Column(db.String(36), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Tasks {self.id} {self.kind} {self.status}>'
@@ -2,22 +2,38 @@
 
 from .. import db
 from ..models import Conversations
-from flask import Blueprint, jsonify, session
+from ..services.pagination import encode_cursor, decode_cursor, resolve_page_size
+from flask import Blueprint, jsonify, session, request, current_app
 
 chat_bp = Blueprint('chat_bp', __name__, url_prefix='/api/chat')
 
-# Route to get all conversations for the user
+# Route to get a page of conversations for the user
 @chat_bp.route('/conversations', methods=['GET'])
 def get_conversations():
     '''
-    Returns all the conversations for the user to display in the sidebar history
+    Returns a page of the user's conversations, newest first, to display in the sidebar history along with the cursor of the next page
     '''
     user_id = session.get('user_id') 
     if not user_id:
          return jsonify({"error": "Authentication required to fetch conversations"}), 401
     
+    page_size = resolve_page_size(
+        request.args.get('limit'),
+        current_app.config.get('CONVERSATIONS_PAGE_SIZE', 50),
+        current_app.config.get('MAX_PAGE_SIZE', 200)
+    )
+    cursor = request.args.get('cursor')
     try:
-        conversations = db.session.query(Conversations).filter_by(user_id=user_id).order_by(Conversations.created_at.desc()).all()
+        conversations_query = db.session.query(Conversations).filter(Conversations.user_id == user_id)
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            conversations_query = conversations_query.filter(
+                db.tuple_(Conversations.created_at, Conversations.id) < (cursor_created_at, cursor_id)
+            )
+        conversations = conversations_query.order_by(Conversations.created_at.desc(), Conversations.id.desc()).limit(page_size + 1).all()
+
+        has_more = len(conversations) > page_size
+        conversations = conversations[:page_size]
         conversation_data = []
         for conv in conversations:
             title = conv.title or f"Chat {conv.id}" 
@@ -25,8 +41,11 @@ def get_conversations():
                 'id': conv.id,
                 'title': title,
                 'created_at': conv.created_at.isoformat()
-            })            
-        return jsonify(conversation_data), 200
+            })
+        next_cursor = encode_cursor(conversations[-1].created_at, conversations[-1].id) if has_more else None
+        return jsonify({"conversations": conversation_data, "next_cursor": next_cursor}), 200
     
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         return jsonify({"error": "Failed to fetch conversations"}), 500
\ No newline at end of file
@@ -4,6 +4,7 @@ from datetime import datetime
 from ..models import Jobs, JobSections, db, Conversations
 from flask import Blueprint, request, jsonify
 from .. import socketio
+from ..services import job_sections_service
 
 job_sections_bp = Blueprint('job_sections_bp', __name__)
 
@@ -25,6 +26,7 @@ def get_job(conversation_id):
             "user_id": jobs.user_id,
             "jobrole": jobs.jobrole or "",
             "description": jobs.description or "",
+            "version": jobs.version,
             "created_at": jobs.created_at.isoformat() if jobs.created_at else None,
             "sections": [
                 {
@@ -74,38 +76,42 @@ def save_job():
             )
             db.session.add(job)
         
+        job_fields_changed = job.jobrole != data['jobrole'] or job.description != data.get('description', '')
         job.jobrole = data['jobrole']
         job.description = data.get('description', '')
         
-        db.session.commit()
-        
+        section_changes = None
         if 'sections' in data and isinstance(data['sections'], list):
-            if job_id:
-                JobSections.query.filter_by(job_id=job.id).delete()
-            
-            for job_section_data in data['sections']:
-                job_section = JobSections(
-                    job_id=job.id,
-                    section_number=job_section_data.get('section_number', 0),
-                    heading=job_section_data.get('heading', ''),
-                    body=job_section_data.get('body', '')
-                )
-                db.session.add(job_section)
+            desired_sections = [
+                {
+                    'section_number': job_section_data.get('section_number', 0),
+                    'heading': job_section_data.get('heading', ''),
+                    'body': job_section_data.get('body', '')
+                }
+                for job_section_data in data['sections'] if isinstance(job_section_data, dict)
+            ]
+            section_changes = job_sections_service.upsert_job_sections(job, desired_sections)
+
+        if job_id and (job_fields_changed or (section_changes and any(section_changes.values()))):
+            job.version = (job.version or 1) + 1
         
+        # Update conversation title in the same transaction as the job and its sections
+        conversation = Conversations.query.get(conversation_id) if conversation_id and job.jobrole else None
+        if conversation:
+            conversation.title = job.jobrole
+
         db.session.commit()
-        
-        # Update conversation title
-        if conversation_id and job.jobrole:
-            conversation = Conversations.query.get(conversation_id)
-            if conversation:
-                conversation.title = job.jobrole
-                db.session.commit()
-                socketio.emit('chat_title_updated_event', 
-                              {'conversation_id': conversation_id, 'new_title': job.jobrole}, 
-                              room=f'user_{job.user_id}') 
+
+        # Notify the user's clients only once the title is committed
+        if conversation:
+            socketio.emit('chat_title_updated_event', 
+                          {'conversation_id': conversation_id, 'new_title': job.jobrole}, 
+                          to=f'user_{job.user_id}')
         return jsonify({
             "id": job.id,
-            "message": "Job saved successfully"
+            "message": "Job saved successfully",
+            "section_changes": section_changes,
+            "version": job.version
         }), 201    
     except Exception as e:
         db.session.rollback()
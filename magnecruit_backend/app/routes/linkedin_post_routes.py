@@ -1,7 +1,12 @@
 # magnecruit_backend/app/routes/linkedin_post_routes.py
 
-from flask import Blueprint, request, jsonify
+import json
+from contextlib import ExitStack
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 from ..services import linkedin_post_service
+from ..services.task_queue import task_queue, TaskQueueFullError
+from ..services.rate_limiter import rate_limiter, RateLimitExceededError, current_user_key, rate_limited_response
+from ..agent import llm_interface
 
 linkedin_post_bp = Blueprint('linkedin_post_bp', __name__)
 
@@ -17,6 +22,7 @@ def generate_post():
     job_description_summary = data.get('job_description_summary')
     tone = data.get('tone', 'professional')
     length = data.get('length', 'medium')
+    regenerate = bool(data.get('regenerate', False))
 
     if not conversation_id:
         return jsonify({"error": "conversation_id is required"}), 400
@@ -24,13 +30,37 @@ def generate_post():
         return jsonify({"error": "company_name is required"}), 400
 
     try:
-        post_content, error = linkedin_post_service.generate_linkedin_post_from_conversation(
-            conversation_id=conversation_id,
-            company_name_input=company_name,
-            job_description_summary_input=job_description_summary or "",
-            tone=tone,
-            length=length
-        )
+        rate_limiter.check('llm', current_user_key())
+    except RateLimitExceededError as rate_limit_error:
+        return rate_limited_response(rate_limit_error)
+
+    if data.get('async'):
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({"error": "Authentication required to queue a LinkedIn post"}), 401
+        try:
+            task = task_queue.submit(user_id, 'linkedin_post', {
+                'conversation_id': conversation_id,
+                'company_name_input': company_name,
+                'job_description_summary_input': job_description_summary or "",
+                'tone': tone,
+                'length': length,
+                'regenerate': regenerate
+            })
+        except TaskQueueFullError as queue_full_error:
+            return jsonify({"error": str(queue_full_error)}), 429 if queue_full_error.scope == 'user' else 503
+        return jsonify({"task": task}), 202
+
+    try:
+        with llm_interface.llm_admission(session.get('user_id')):
+            post_content, error = linkedin_post_service.generate_linkedin_post_from_conversation(
+                conversation_id=conversation_id,
+                company_name_input=company_name,
+                job_description_summary_input=job_description_summary or "",
+                tone=tone,
+                length=length,
+                regenerate=regenerate
+            )
 
         if error:
             if "No job details found" in error or "Job title is missing" in error:
@@ -41,6 +71,90 @@ def generate_post():
         
         return jsonify({"linkedin_post": post_content}), 200
 
+    except llm_interface.LLMBackpressureError as backpressure_error:
+        return jsonify({"error": str(backpressure_error)}), 429 if backpressure_error.scope == 'user' else 503
+
     except Exception as e:
         print(f"Error in /generate LinkedIn post route: {str(e)}")
-        return jsonify({"error": f"An unexpected error occurred in the API route: {str(e)}"}), 500 
\ No newline at end of file
+        return jsonify({"error": f"An unexpected error occurred in the API route: {str(e)}"}), 500 
+
+# Route to generate LinkedIn posts for many conversations and tone/length variants, streamed as newline-delimited JSON
+@linkedin_post_bp.route('/generate-batch', methods=['POST'])
+def generate_posts_batch():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Authentication required to generate a batch of LinkedIn posts"}), 401
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    items = data.get('items')
+    company_name = data.get('company_name')
+    job_description_summary = data.get('job_description_summary')
+    regenerate = bool(data.get('regenerate', False))
+    max_items = current_app.config.get('LINKEDIN_BATCH_MAX_ITEMS', 100)
+    max_parallelism = current_app.config.get('LINKEDIN_BATCH_PARALLELISM', 5)
+
+    if not items or not isinstance(items, list):
+        return jsonify({"error": "items must be a non-empty list of {conversation_id, tone, length}"}), 400
+    if len(items) > max_items:
+        return jsonify({"error": f"A batch can have at most {max_items} items"}), 400
+    if not company_name:
+        return jsonify({"error": "company_name is required"}), 400
+
+    specs = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('conversation_id'):
+            return jsonify({"error": "Every item requires a conversation_id"}), 400
+        specs.append({
+            'conversation_id': item['conversation_id'],
+            'tone': item.get('tone', 'professional'),
+            'length': item.get('length', 'medium')
+        })
+
+    try:
+        parallelism = max(1, min(int(data.get('parallelism') or max_parallelism), max_parallelism))
+    except (TypeError, ValueError):
+        return jsonify({"error": "parallelism must be an integer"}), 400
+
+    # Every item of the batch is an LLM call, so the batch costs one token per item
+    try:
+        rate_limiter.check('llm', current_user_key(), cost=len(specs))
+    except RateLimitExceededError as rate_limit_error:
+        return rate_limited_response(rate_limit_error)
+
+    # The batch holds one of the user's LLM slots while it streams, each item also takes a slot of the global pool
+    admission = ExitStack()
+    try:
+        admission.enter_context(llm_interface.llm_admission(user_id))
+    except llm_interface.LLMBackpressureError as backpressure_error:
+        return jsonify({"error": str(backpressure_error)}), 429 if backpressure_error.scope == 'user' else 503
+
+    def stream_results():
+        succeeded, failed = 0, 0
+        try:
+            for result in linkedin_post_service.generate_linkedin_posts_batch(
+                specs,
+                company_name_input=company_name,
+                job_description_summary_input=job_description_summary or "",
+                user_id=user_id,
+                parallelism=parallelism,
+                regenerate=regenerate
+            ):
+                if 'error' in result:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            print(f"Error in /generate-batch LinkedIn post route: {str(e)}")
+            yield json.dumps({"error": f"An unexpected error occurred in the API route: {str(e)}"}) + "\n"
+        finally:
+            admission.close()
+        yield json.dumps({"done": True, "succeeded": succeeded, "failed": failed}) + "\n"
+
+    # Closing a generator that never started skips its finally, so the slot is also released when the response is closed
+    response = Response(stream_with_context(stream_results()), mimetype='application/x-ndjson')
+    response.call_on_close(admission.close)
+    return response
@@ -0,0 +1,11 @@
+# magnecruit_backend/app/routes/metrics_routes.py
+
+from flask import Blueprint, Response
+from ..services.metrics import metrics_registry
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+# Route to expose the application metrics to a Prometheus scraper
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,26 @@
+# magnecruit_backend/app/routes/task_routes.py
+
+from flask import Blueprint, jsonify, session
+from ..services.task_queue import task_queue
+
+task_bp = Blueprint('task_bp', __name__)
+
+# Route to poll the status and result of a queued task of the user
+@task_bp.route('/<task_id>', methods=['GET'])
+def get_task(task_id):
+    '''
+    Returns the task with its status, progress and, once finished, its result or error
+    '''
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Authentication required to fetch tasks"}), 401
+
+    try:
+        task = task_queue.get(task_id, user_id=user_id)
+    except Exception as e:
+        print(f"Error fetching task {task_id}: {e}")
+        return jsonify({"error": "Failed to fetch task"}), 500
+
+    if not task:
+        return jsonify({"error": "Task not found"}), 404
+    return jsonify({"task": task}), 200
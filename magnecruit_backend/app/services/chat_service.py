@@ -2,33 +2,187 @@
 
 from .. import db
 import traceback
+from flask import current_app
+from functools import partial
+from typing import Callable
 from datetime import datetime, timezone
 from . import job_sections_service
+from .history_cache import conversation_history_cache
+from .metrics import time_stage
+from .response_cache import general_response_cache, normalize_prompt, context_hash
+from .pagination import encode_cursor, decode_cursor
 from ..agent import llm_interface
 from ..models import Conversations, Messages
-from ..agent.prompts import GENERAL_CHAT_PROMPT
+from ..agent.prompts import (
+    GENERAL_CHAT_PROMPT,
+    CONVERSATION_SUMMARY_PROMPT,
+    CONVERSATION_SUMMARY_CONTEXT_TEMPLATE,
+    CONVERSATION_SUMMARY_ACKNOWLEDGEMENT
+)
 
-# Fetch and format the conversation history and return a list of messages in the format required by the frontend
+# Serialize a message in the format required by the frontend
+def serialize_message(msg: Messages) -> dict:
+    '''
+    Returns the message as a dictionary for the client payloads and the history cache
+    '''
+    return {
+        'id': msg.id,
+        'sender': msg.sender,
+        'content': msg.content,
+        'timestamp': msg.timestamp.isoformat(),
+        'conversation_id': msg.conversation_id
+    }
+
+# Get the cached messages of the conversation, checked against the newest persisted message when other workers can write to it
+def _get_current_cached_messages(conversation_id: int, db_session) -> list | None:
+    '''
+    Returns the cached messages, or None on a miss. With a message queue configured the app runs several workers, each with its own
+    history cache, so an entry is dropped when another worker persisted newer messages of the conversation
+    '''
+    cached_messages = conversation_history_cache.get(conversation_id)
+    if cached_messages is None or not current_app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+        return cached_messages
+    latest_message_id = db_session.query(Messages.id).filter(Messages.conversation_id == conversation_id).order_by(Messages.timestamp.desc(), Messages.id.desc()).limit(1).scalar()
+    if latest_message_id != (cached_messages[-1]['id'] if cached_messages else None):
+        conversation_history_cache.invalidate(conversation_id)
+        return None
+    return cached_messages
+
+# Get a page of the messages of the conversation, from the history cache when it holds enough of the conversation
+def get_conversation_messages(conversation_id: int, page_size: int, before_cursor: str | None = None) -> tuple[list, str | None]:
+    '''
+    Returns the newest page_size messages of the conversation in chronological order, or the page older than before_cursor,
+    along with the cursor to load the messages older than the page (None when there are no older messages)
+    '''
+    if not before_cursor:
+        cached_messages = _get_current_cached_messages(conversation_id, db.session)
+        if cached_messages is not None and (len(cached_messages) > page_size or conversation_history_cache.is_complete(conversation_id)):
+            page = cached_messages[-page_size:]
+            has_more = len(cached_messages) > page_size
+            next_cursor = encode_cursor(page[0]['timestamp'], page[0]['id']) if has_more else None
+            return page, next_cursor
+
+    messages_query = db.session.query(Messages).filter(Messages.conversation_id == conversation_id)
+    if before_cursor:
+        cursor_timestamp, cursor_id = decode_cursor(before_cursor)
+        messages_query = messages_query.filter(db.tuple_(Messages.timestamp, Messages.id) < (cursor_timestamp, cursor_id))
+    messages = messages_query.order_by(Messages.timestamp.desc(), Messages.id.desc()).limit(page_size + 1).all()
+
+    has_more = len(messages) > page_size
+    page = [serialize_message(msg) for msg in reversed(messages[:page_size])]
+    if not before_cursor:
+        conversation_history_cache.set(conversation_id, page, complete=not has_more)
+    next_cursor = encode_cursor(page[0]['timestamp'], page[0]['id']) if has_more else None
+    return page, next_cursor
+
+# Fetch and format the windowed conversation history and return a list of messages in the format required by the LLM
 def fetch_and_format_history(conversation_id, db_session):
     '''
-    Returns a list of messages in the format required by LLM for the general chat prompt
+    Returns the rolling summary of the conversation followed by the most recent messages that fit in the history token budget,
+    in the format required by LLM for the chat prompts. The summary is only refreshed once a batch of messages left the window,
+    so the window is extended by that batch to keep the messages that are not summarized yet
     '''
-    messages = db_session.query(Messages).filter_by(conversation_id=conversation_id).order_by(Messages.timestamp).all()
+    token_budget = current_app.config.get('HISTORY_TOKEN_BUDGET', 6000)
+    window_size = current_app.config.get('HISTORY_WINDOW_MESSAGES', 20) + current_app.config.get('HISTORY_SUMMARY_BATCH_MESSAGES', 6)
+
+    conversation = db_session.get(Conversations, conversation_id)
+    summarized_until_message_id = conversation.summarized_until_message_id if conversation else None
+
+    cached_messages = _get_current_cached_messages(conversation_id, db_session)
+    if cached_messages is not None:
+        recent_messages = [
+            msg for msg in cached_messages
+            if not summarized_until_message_id or msg['id'] > summarized_until_message_id
+        ][-window_size:]
+    else:
+        messages_query = db_session.query(Messages).filter(Messages.conversation_id == conversation_id)
+        if summarized_until_message_id:
+            messages_query = messages_query.filter(Messages.id > summarized_until_message_id)
+        recent_messages = [
+            serialize_message(msg)
+            for msg in reversed(messages_query.order_by(Messages.timestamp.desc(), Messages.id.desc()).limit(window_size).all())
+        ]
+        conversation_history_cache.set(conversation_id, recent_messages, complete=False)
+
     history = []
-    for msg in messages:
-        if msg.sender == 'user':
-            history.append({'role': 'user', 'parts': [msg.content]})
-        elif msg.sender == 'ai':
-             history.append({'role': 'model', 'parts': [msg.content]})
+    if conversation and conversation.summary:
+        summary_context = CONVERSATION_SUMMARY_CONTEXT_TEMPLATE.format(summary=conversation.summary)
+        history.append({'role': 'user', 'parts': [summary_context]})
+        history.append({'role': 'model', 'parts': [CONVERSATION_SUMMARY_ACKNOWLEDGEMENT]})
+        token_budget -= llm_interface.estimate_tokens(summary_context)
+
+    windowed_history = []
+    for msg in reversed(recent_messages):
+        token_budget -= llm_interface.estimate_tokens(msg['content'])
+        if token_budget < 0:
+            break
+        if msg['sender'] == 'user':
+            windowed_history.append({'role': 'user', 'parts': [msg['content']]})
+        elif msg['sender'] == 'ai':
+             windowed_history.append({'role': 'model', 'parts': [msg['content']]})
+    history.extend(reversed(windowed_history))
     return history
 
+# Fold the messages that fell out of the history window into the rolling summary of the conversation
+def refresh_conversation_summary(conversation_id: int) -> bool:
+    '''
+    Returns True if the rolling summary was updated. Summaries are updated in batches so most turns do not make a summary call
+    '''
+    window_size = current_app.config.get('HISTORY_WINDOW_MESSAGES', 20)
+    batch_size = current_app.config.get('HISTORY_SUMMARY_BATCH_MESSAGES', 6)
+    try:
+        conversation = db.session.get(Conversations, conversation_id)
+        if not conversation:
+            return False
+
+        unsummarized_query = db.session.query(Messages).filter(Messages.conversation_id == conversation_id)
+        if conversation.summarized_until_message_id:
+            unsummarized_query = unsummarized_query.filter(Messages.id > conversation.summarized_until_message_id)
+        overflow_count = unsummarized_query.count() - window_size
+        if overflow_count < batch_size:
+            return False
+
+        overflow_messages = unsummarized_query.order_by(Messages.timestamp, Messages.id).limit(overflow_count).all()
+        new_messages = "\n".join(
+            f"{'User' if msg.sender == 'user' else 'Magnec AI'}: {msg.content}" for msg in overflow_messages
+        )
+        summary_prompt = CONVERSATION_SUMMARY_PROMPT.format(
+            existing_summary=conversation.summary or "None yet.",
+            new_messages=new_messages
+        )
+        model = llm_interface.get_model_for_task('summary')
+        summary_response = llm_interface.generate_content(model, summary_prompt)
+        updated_summary = summary_response.text.strip()
+        if not updated_summary:
+            return False
+
+        conversation.summary = updated_summary
+        conversation.summarized_until_message_id = overflow_messages[-1].id
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"(ChatService) Error refreshing summary for conversation {conversation_id}: {e}")
+        return False
+
 # Get the general AI message response
-def _get_general_ai_response(user_message_content: str, conversation_history: list) -> tuple[str | None, str | None]:
+def _get_general_ai_response(user_message_content: str, conversation_history: list, on_text_chunk: Callable[[str], None] | None = None) -> tuple[str | None, str | None]:
     '''
-    Returns the text response from the LLM and the error message, if any
+    Returns the text response from the LLM and the error message, if any. Streams the text chunks to on_text_chunk when it is given
     '''
     try:
-        model = llm_interface.get_gemini_model(system_instruction=GENERAL_CHAT_PROMPT)
+        model = llm_interface.get_model_for_task('general_chat', system_instruction=GENERAL_CHAT_PROMPT)
+
+        # Standalone questions do not depend on the conversation, so their replies can be shared across conversations
+        cache_lookup = None
+        if general_response_cache.enabled and not conversation_history:
+            with time_stage('response_cache_lookup'):
+                cached_response, cache_lookup = _lookup_general_response_cache(user_message_content)
+            if cached_response:
+                if on_text_chunk:
+                    on_text_chunk(cached_response)
+                return cached_response, None
+
         formatted_history = []
         for item in conversation_history:
             role = item.get('role')
@@ -41,7 +195,10 @@ def _get_general_ai_response(user_message_content: str, conversation_history: li
             {"role": "user", "parts": [user_message_content]}
         ]
 
-        llm_response = model.generate_content(full_content)
+        if on_text_chunk:
+            llm_response = llm_interface.generate_content_streamed(model, full_content, on_text_chunk)
+        else:
+            llm_response = llm_interface.generate_content(model, full_content)
         text_response = None
         error_message = None
         try:
@@ -53,17 +210,52 @@ def _get_general_ai_response(user_message_content: str, conversation_history: li
             else:
                 error_message = "Sorry, I received an unusual response from the AI and couldn't extract the text."
 
+        if cache_lookup and text_response and not error_message:
+            context_key, normalized_prompt, embedding = cache_lookup
+            general_response_cache.set(context_key, normalized_prompt, text_response, embedding=embedding)
         return text_response, error_message
 
+    except (llm_interface.LLMUnavailableError, llm_interface.LLMDeadlineExceededError) as e:
+        print(f"(ChatService) LLM call failed in _get_general_ai_response: {e}")
+        return None, str(e)
     except Exception as e:
         print(f"(ChatService) Critical error in _get_general_ai_response: {e}")
         traceback.print_exc()
         return None, "Sorry, an internal error occurred while getting a general AI response."
 
+# Look up the reply to a standalone general chat question in the response cache, by exact prompt then by embedding similarity
+def _lookup_general_response_cache(user_message_content: str) -> tuple[str | None, tuple]:
+    '''
+    Returns the cached reply or None, and the (context key, normalized prompt, embedding) to store the reply under on a miss
+    '''
+    context_key = context_hash(llm_interface.get_task_profile('general_chat')['model_name'], GENERAL_CHAT_PROMPT)
+    normalized_prompt = normalize_prompt(user_message_content)
+    cached_response = general_response_cache.get(context_key, normalized_prompt)
+    if cached_response is not None:
+        return cached_response, (context_key, normalized_prompt, None)
+
+    embedding = None
+    if general_response_cache.embeddings_enabled:
+        try:
+            embedding = llm_interface.embed_text(normalized_prompt)
+            cached_response = general_response_cache.get_similar(context_key, embedding)
+            if cached_response is not None:
+                return cached_response, (context_key, normalized_prompt, embedding)
+        except Exception as e:
+            print(f"(ChatService) Error embedding the prompt for the response cache: {e}")
+
+    general_response_cache.record_miss()
+    return None, (context_key, normalized_prompt, embedding)
+
 # Process the incoming message from the frontend client and return the response data based on the active view
-def process_incoming_message(user_id: int, current_conversation_id: int | None, message_content: str, active_view: str | None) -> dict:
+def process_incoming_message(user_id: int, current_conversation_id: int | None, message_content: str, active_view: str | None,
+                             on_ai_text_chunk: Callable[[int, str], None] | None = None, client_job_version: int | None = None,
+                             on_job_section_chunk: Callable[[int, dict, str], None] | None = None) -> dict:
     '''
-    Returns the reponse_data to the client based on the active view
+    Returns the reponse_data to the client based on the active view. When on_ai_text_chunk is given, the AI reply is streamed to it 
+    as (conversation_id, text_chunk) while it is generated and the complete reply is still saved once at the end. 
+    Likewise a job section rewritten for modify_job_sections is streamed to on_job_section_chunk as (conversation_id, section, text_chunk).
+    Job updates are sent as a delta when client_job_version matches the version they were applied to, otherwise as a full snapshot
     '''
     conversation_id = current_conversation_id
     new_conversation_data = None
@@ -74,12 +266,14 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
     ai_message_content_to_send = None
     error_message_for_client = None
     updated_field_keys = None
+    job_changes = None
 
     try:
         if not conversation_id:
-            new_conversation = Conversations(user_id=user_id, created_at=datetime.now(timezone.utc))
-            db.session.add(new_conversation)
-            db.session.flush()
+            with time_stage('conversation_create'):
+                new_conversation = Conversations(user_id=user_id, created_at=datetime.now(timezone.utc))
+                db.session.add(new_conversation)
+                db.session.flush()
             conversation_id = new_conversation.id
             new_conversation_data = {
                 'conversationId': conversation_id,
@@ -94,14 +288,17 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
             content=message_content,
             timestamp=datetime.now(timezone.utc)
         )
-        db.session.add(user_message_db)
-        db.session.flush()
 
-        conversation_history = fetch_and_format_history(conversation_id, db.session)
+        # The user message is only added to the session with the AI reply, so both are inserted in the flush before the commit
+        with time_stage('history_fetch'):
+            conversation_history = fetch_and_format_history(conversation_id, db.session)
+        on_text_chunk = partial(on_ai_text_chunk, conversation_id) if on_ai_text_chunk else None
+        on_section_chunk = partial(on_job_section_chunk, conversation_id) if on_job_section_chunk else None
 
         if active_view == 'job-sections':
-            text_for_chat, updated_job_sections_object, service_error, updated_field_keys = job_sections_service.process_chat_for_job_sections(
-                user_id, conversation_id, message_content, conversation_history
+            text_for_chat, updated_job_sections_object, service_error, updated_field_keys, job_changes = job_sections_service.process_chat_for_job_sections(
+                user_id, conversation_id, message_content, conversation_history,
+                on_text_chunk=on_text_chunk, on_section_chunk=on_section_chunk
             )
             error_message_for_client = service_error
             
@@ -114,7 +311,7 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
         # TODO: Add other active view handlers here to process the incoming message for other views
         else:
             general_text_response, general_error = _get_general_ai_response(
-                message_content, conversation_history
+                message_content, conversation_history, on_text_chunk=on_text_chunk
             )
             error_message_for_client = general_error
             if general_text_response:
@@ -122,7 +319,7 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
                 ai_message_content_to_send = general_text_response
             updated_job_sections_object = None
 
-        # Save the AI Message to the database if there was no error and there is content to save
+        # Save the user message along with the AI Message if there was no error and there is content to save
         ai_message_db = None
         if ai_message_content_to_save and not error_message_for_client:
             ai_message_db = Messages(
@@ -131,9 +328,15 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
                 content=ai_message_content_to_save,
                 timestamp=datetime.now(timezone.utc)
             )
-            db.session.add(ai_message_db)
+        with time_stage('message_save'):
+            db.session.add(user_message_db)
+            if ai_message_db is not None:
+                db.session.add(ai_message_db)
             db.session.flush()
-            
+        persisted_messages_data = [serialize_message(user_message_db)]
+
+        if ai_message_db is not None:
+            persisted_messages_data.append(serialize_message(ai_message_db))
             if ai_message_content_to_send:
                 new_ai_message_data = {
                     'id': ai_message_db.id,
@@ -147,29 +350,15 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
         else:
              print(f"(ChatService) Not saving AI message due to client error: {error_message_for_client}")
 
-        db.session.commit()
-
-        # Format the updated job sections object to the updated job sections data, if it exists
+        # Format the updated job to the job_updated payload while its flushed state is still loaded
         if updated_job_sections_object:
-            db.session.refresh(updated_job_sections_object)
-            sorted_sections = sorted(updated_job_sections_object.sections, key=lambda s: s.section_number)
-            updated_job_sections_data = {
-                'id': updated_job_sections_object.id,
-                'conversation_id': updated_job_sections_object.conversation_id,
-                'user_id': updated_job_sections_object.user_id,
-                'jobrole': updated_job_sections_object.jobrole,
-                'description': updated_job_sections_object.description,
-                'created_at': updated_job_sections_object.created_at.isoformat() if updated_job_sections_object.created_at else None,
-                'sections': [
-                    {
-                        'id': section.id,
-                        'section_number': section.section_number,
-                        'heading': section.heading,
-                        'body': section.body
-                    }
-                    for section in sorted_sections
-                ]
-            }
+            updated_job_sections_data = job_sections_service.build_job_update_payload(
+                updated_job_sections_object, job_changes, client_job_version
+            )
+
+        with time_stage('commit'):
+            db.session.commit()
+        conversation_history_cache.append(conversation_id, persisted_messages_data, new_conversation=new_conversation_data is not None)
 
         # Return the response data to the client if there was no error
         if error_message_for_client:
@@ -190,6 +379,8 @@ def process_incoming_message(user_id: int, current_conversation_id: int | None,
 
     except Exception as e:
         db.session.rollback()
+        if conversation_id:
+            conversation_history_cache.invalidate(conversation_id)
         print(f"(ChatService) Critical error in process_incoming_message: {e}")
         traceback.print_exc()
         return {
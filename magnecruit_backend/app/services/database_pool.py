@@ -0,0 +1,98 @@
+# magnecruit_backend\app\services\database_pool.py
+
+import time
+import weakref
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from .metrics import metrics_registry
+
+# Upper bounds in seconds of the checkout wait histogram buckets, from an idle connection to a saturated pool timing out
+POOL_CHECKOUT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every instrumented pool of the process, reported by the pool metrics collector
+_pools = weakref.WeakSet()
+
+# Queue pool that records how long each checkout waited for a connection
+class InstrumentedQueuePool(QueuePool):
+    '''
+    QueuePool that observes the checkout duration, including the wait for a free connection and the pre-ping,
+    and counts the checkouts that timed out because the pool and its overflow were exhausted
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics_registry.inc('db_pool_timeouts_total')
+            raise
+        finally:
+            metrics_registry.observe('db_pool_checkout_seconds', time.perf_counter() - started)
+
+# Build the SQLAlchemy engine options for the database from the pool settings of the config
+def build_engine_options(database_uri: str | None, pool_size: int, max_overflow: int, pool_timeout: int,
+                         pool_pre_ping: bool, pool_recycle: int, statement_timeout_ms: int) -> dict:
+    '''
+    Returns the engine options for the instrumented queue pool. In-memory SQLite databases keep their single connection pool,
+    and the statement timeout only applies to PostgreSQL, where it is set on every connection
+    '''
+    if not database_uri:
+        return {}
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    engine_options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_pre_ping': pool_pre_ping,
+        'pool_recycle': pool_recycle
+    }
+    if url.get_backend_name() == 'postgresql' and statement_timeout_ms:
+        engine_options['connect_args'] = {'options': f"-c statement_timeout={statement_timeout_ms}"}
+    return engine_options
+
+# Make psycopg2 yield to other green threads while it waits on the database, when the process is monkey patched by eventlet
+def make_psycopg_green():
+    '''
+    Returns True if psycopg2 was patched. psycopg2 is a C extension that eventlet cannot patch, so without psycogreen
+    every query blocks the whole worker, whatever the pool size
+    '''
+    try:
+        import eventlet.patcher
+        from psycogreen.eventlet import patch_psycopg
+    except ImportError:
+        return False
+    if not eventlet.patcher.is_monkey_patched('socket'):
+        return False
+    patch_psycopg()
+    return True
+
+# Report the connections in use and the pool saturation on /metrics
+def _database_pool_metrics() -> list:
+    checked_out = size = overflow = capacity = 0
+    for pool in list(_pools):
+        checked_out += pool.checkedout()
+        size += pool.size()
+        overflow += max(pool.overflow(), 0)
+        capacity += pool.size() + max(pool._max_overflow, 0)
+    return [
+        ('db_pool_checked_out', {}, checked_out),
+        ('db_pool_size', {}, size),
+        ('db_pool_overflow', {}, overflow),
+        ('db_pool_saturation', {}, checked_out / capacity if capacity else 0.0)
+    ]
+
+metrics_registry.describe('db_pool_checkout_seconds', 'histogram', 'Time to check out a database connection, including the wait for a free one.', buckets=POOL_CHECKOUT_BUCKETS)
+metrics_registry.describe('db_pool_timeouts_total', 'counter', 'Database connection checkouts that timed out on an exhausted pool.')
+metrics_registry.describe('db_pool_checked_out', 'gauge', 'Database connections currently checked out of the pool.')
+metrics_registry.describe('db_pool_size', 'gauge', 'Database connections kept open by the pool.')
+metrics_registry.describe('db_pool_overflow', 'gauge', 'Database connections opened beyond the pool size.')
+metrics_registry.describe('db_pool_saturation', 'gauge', 'Share of the pool and its overflow checked out.')
+metrics_registry.register_collector(_database_pool_metrics)
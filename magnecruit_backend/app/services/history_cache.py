@@ -0,0 +1,137 @@
+# magnecruit_backend\app\services\history_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+from .metrics import metrics_registry
+
+# Bounded LRU cache of the serialized messages of each conversation, kept up to date write-through by the chat service
+class ConversationHistoryCache:
+    '''
+    Caches the most recent messages of each conversation with size and TTL based eviction.
+    An entry is complete when it holds every message of the conversation, otherwise it only holds the newest ones
+    '''
+    def __init__(self, max_conversations: int = 1000, ttl_seconds: float = 300, max_messages: int = 200):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Update the cache limits from the application config
+    def configure(self, max_conversations: int, ttl_seconds: float, max_messages: int):
+        '''
+        Applies the new limits and clears the cache
+        '''
+        with self._lock:
+            self.max_conversations = max_conversations
+            self.ttl_seconds = ttl_seconds
+            self.max_messages = max_messages
+            self._entries.clear()
+
+    # Get the cached messages of the conversation, if they are still fresh
+    def get(self, conversation_id: int, require_complete: bool = False) -> list | None:
+        '''
+        Returns a copy of the cached messages in chronological order, or None on a miss
+        '''
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and time.monotonic() - entry['cached_at'] > self.ttl_seconds:
+                del self._entries[conversation_id]
+                self.evictions += 1
+                entry = None
+            if entry is None or (require_complete and not entry['complete']):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return list(entry['messages'])
+
+    # Check if the cached entry of the conversation holds every message of the conversation
+    def is_complete(self, conversation_id: int) -> bool:
+        '''
+        Returns True if the conversation is cached with all of its messages
+        '''
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            return entry is not None and entry['complete']
+
+    # Store the messages of the conversation loaded from the database
+    def set(self, conversation_id: int, messages: list, complete: bool):
+        '''
+        Caches the newest max_messages of the given messages for the conversation
+        '''
+        with self._lock:
+            if len(messages) > self.max_messages:
+                messages = messages[-self.max_messages:]
+                complete = False
+            self._entries[conversation_id] = {'messages': list(messages), 'complete': complete, 'cached_at': time.monotonic()}
+            self._entries.move_to_end(conversation_id)
+            self._evict_overflow()
+
+    # Write-through of newly persisted messages of the conversation
+    def append(self, conversation_id: int, new_messages: list, new_conversation: bool = False):
+        '''
+        Appends the messages to the cached entry. A new conversation gets a complete entry, other conversations are only updated if cached
+        '''
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                if not new_conversation:
+                    return
+                entry = {'messages': [], 'complete': True, 'cached_at': time.monotonic()}
+                self._entries[conversation_id] = entry
+            entry['messages'].extend(new_messages)
+            if len(entry['messages']) > self.max_messages:
+                entry['messages'] = entry['messages'][-self.max_messages:]
+                entry['complete'] = False
+            self._entries.move_to_end(conversation_id)
+            self._evict_overflow()
+
+    # Drop the cached messages of the conversation
+    def invalidate(self, conversation_id: int):
+        '''
+        Removes the conversation from the cache, if present
+        '''
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    # Get the cache counters used to size the cache
+    def stats(self) -> dict:
+        '''
+        Returns the hit, miss and eviction counters along with the current size of the cache
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_conversations': self.max_conversations
+            }
+
+    def _evict_overflow(self):
+        while len(self._entries) > self.max_conversations:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+conversation_history_cache = ConversationHistoryCache()
+
+# Report the cache counters on /metrics
+def _history_cache_metrics() -> list:
+    stats = conversation_history_cache.stats()
+    return [
+        ('history_cache_hits_total', {}, stats['hits']),
+        ('history_cache_misses_total', {}, stats['misses']),
+        ('history_cache_evictions_total', {}, stats['evictions']),
+        ('history_cache_size', {}, stats['size'])
+    ]
+
+metrics_registry.describe('history_cache_hits_total', 'counter', 'Conversation history cache hits.')
+metrics_registry.describe('history_cache_misses_total', 'counter', 'Conversation history cache misses.')
+metrics_registry.describe('history_cache_evictions_total', 'counter', 'Conversations evicted from the history cache by size or TTL.')
+metrics_registry.describe('history_cache_size', 'gauge', 'Conversations currently held in the history cache.')
+metrics_registry.register_collector(_history_cache_metrics)
@@ -1,19 +1,27 @@
 # magnecruit_backend\app\services\job_sections_service.py
 
-import json
 import traceback
+import eventlet
+from functools import partial
+import google.generativeai as genai
+from flask import current_app
 from .. import db 
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional
 from google.protobuf.struct_pb2 import Struct
 from google.protobuf.json_format import MessageToDict
 from ..models import Jobs, JobSections
 from ..agent import llm_interface
+from .metrics import time_stage, record_turn_detail
 from ..agent.prompts import (
     SYSTEM_PROMPT_JOB_SECTIONS,
-    BUILD_JOB_SECTIONS_PROMPT,
-    CONFIRMATION_PROMPT_TEMPLATE
+    CONFIRMATION_PROMPT_TEMPLATE,
+    CONFIRMATION_FIELD_LABELS,
+    CONFIRMATION_FULL_UPDATE_TEMPLATE,
+    CONFIRMATION_PARTIAL_UPDATE_TEMPLATE,
+    CONFIRMATION_FALLBACK_MESSAGE
 )
 from ..agent.job_sections_tools import JOB_SECTIONS_TOOLS
+from ..agent.prompt_builder import build_job_sections_contents, build_section_rewrite_prompt, PromptBudgetExceededError
 
 # Get the job data for the conversation from the database Jobs table
 def get_job_data_for_conversation(conversation_id: int) -> Optional[Jobs]:
@@ -26,184 +34,553 @@ def get_job_data_for_conversation(conversation_id: int) -> Optional[Jobs]:
         print(f"(JobSectionsService) Error fetching job data for convo {conversation_id}: {e}")
         return None
 
-# Save the job sections data from the function call args
-def _save_job_sections_data(user_id: int, conversation_id: int, function_args: dict) -> Tuple[Optional[Jobs], List[str]]:
+# Get the jobs of many conversations of the user with their sections in a single query
+def get_jobs_for_conversations(conversation_ids, user_id: int) -> dict:
     '''
-    Returns the job data and the updated fields keys from the given function call args
+    Returns a dictionary of conversation id to job, for the conversations that have a job and belong to the user
     '''
-    updated_fields_keys = list(function_args.keys())
-    job_data = None
     try:
-        job_data = get_job_data_for_conversation(conversation_id)
+        jobs_query = db.session.query(Jobs).options(db.joinedload(Jobs.sections)).filter(
+            Jobs.conversation_id.in_(list(conversation_ids)),
+            Jobs.user_id == user_id
+        )
+        return {job.conversation_id: job for job in jobs_query.all()}
+    except Exception as e:
+        print(f"(JobSectionsService) Error fetching job data for convos {conversation_ids}: {e}")
+        return {}
+
+# Diff the desired sections against the job's current sections and apply only the changes in a single unit of work
+def upsert_job_sections(job: Jobs, desired_sections: list) -> dict:
+    '''
+    Returns the section changes as {'added_section_ids', 'updated_section_ids', 'removed_section_ids'}.
+    Desired sections are matched to the existing ones by heading first and then by section number, 
+    matched sections are updated only if they changed, unmatched ones are inserted and the remaining existing ones are deleted.
+    Inserts are sent as one executemany, the changes are flushed but not committed
+    '''
+    existing_sections = list(job.sections)
+    unmatched_sections = {section.id: section for section in existing_sections}
+    existing_by_heading = {}
+    for section in existing_sections:
+        existing_by_heading.setdefault((section.heading or '').strip().lower(), section)
+
+    matched_pairs = []
+    unmatched_desired = []
+    for section_data in desired_sections:
+        existing_section = existing_by_heading.get((section_data.get('heading') or '').strip().lower())
+        if existing_section is not None and existing_section.id in unmatched_sections:
+            matched_pairs.append((existing_section, section_data))
+            del unmatched_sections[existing_section.id]
+        else:
+            unmatched_desired.append(section_data)
+
+    new_section_rows = []
+    existing_by_number = {section.section_number: section for section in unmatched_sections.values()}
+    for section_data in unmatched_desired:
+        existing_section = existing_by_number.pop(section_data.get('section_number'), None)
+        if existing_section is not None:
+            matched_pairs.append((existing_section, section_data))
+            del unmatched_sections[existing_section.id]
+        else:
+            new_section_rows.append({
+                'section_number': section_data.get('section_number', 0),
+                'heading': section_data.get('heading', ''),
+                'body': section_data.get('body', '')
+            })
+
+    updated_sections = []
+    for existing_section, section_data in matched_pairs:
+        section_changed = False
+        for field in ('section_number', 'heading', 'body'):
+            if field in section_data and getattr(existing_section, field) != section_data[field]:
+                setattr(existing_section, field, section_data[field])
+                section_changed = True
+        if section_changed:
+            updated_sections.append(existing_section)
+
+    removed_section_ids = list(unmatched_sections.keys())
+    for removed_section in unmatched_sections.values():
+        job.sections.remove(removed_section)
+
+    added_section_ids = []
+    if updated_sections or removed_section_ids or new_section_rows:
+        db.session.flush()
+    if new_section_rows:
+        # One round trip for all the new sections, the ORM flush would send one INSERT ... RETURNING per section where the
+        # database cannot return the generated ids in order
+        db.session.execute(db.insert(JobSections), [{**row, 'job_id': job.id} for row in new_section_rows])
+        # Ids of deleted sections can be reused by the inserted ones, SQLite hands out max(id) + 1
+        known_section_ids = {section.id for section in existing_sections} - set(removed_section_ids)
+        db.session.expire(job, ['sections'])
+        added_section_ids = sorted(section.id for section in job.sections if section.id not in known_section_ids)
+
+    return {
+        'added_section_ids': added_section_ids,
+        'updated_section_ids': [section.id for section in updated_sections],
+        'removed_section_ids': removed_section_ids
+    }
+
+# Serialize a job section for the client payloads
+def serialize_job_section(section: JobSections) -> dict:
+    '''
+    Returns the job section as a dictionary
+    '''
+    return {
+        'id': section.id,
+        'section_number': section.section_number,
+        'heading': section.heading,
+        'body': section.body
+    }
+
+# Serialize the full job with all its sections as a snapshot for the job_updated event
+def serialize_job_snapshot(job: Jobs) -> dict:
+    '''
+    Returns the full job document, marked as a snapshot, with its sections sorted by section number
+    '''
+    return {
+        'type': 'snapshot',
+        'id': job.id,
+        'conversation_id': job.conversation_id,
+        'user_id': job.user_id,
+        'version': job.version,
+        'jobrole': job.jobrole,
+        'description': job.description,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'sections': [serialize_job_section(section) for section in sorted(job.sections, key=lambda s: s.section_number)]
+    }
+
+# Serialize only the changed fields and sections of the job as a delta for the job_updated event
+def serialize_job_delta(job: Jobs, job_changes: dict) -> dict:
+    '''
+    Returns the delta that turns version base_version of the job into its current version
+    '''
+    changed_section_ids = set(job_changes['added_section_ids']) | set(job_changes['updated_section_ids'])
+    return {
+        'type': 'delta',
+        'id': job.id,
+        'conversation_id': job.conversation_id,
+        'base_version': job_changes['base_version'],
+        'version': job.version,
+        'changed_fields': {field: getattr(job, field) for field in job_changes['changed_fields']},
+        'upserted_sections': [
+            serialize_job_section(section)
+            for section in sorted(job.sections, key=lambda s: s.section_number) if section.id in changed_section_ids
+        ],
+        'removed_section_ids': job_changes['removed_section_ids']
+    }
+
+# Build the job_updated payload, a delta when the client holds the version the changes were applied to and a full snapshot otherwise
+def build_job_update_payload(job: Jobs, job_changes: Optional[dict], client_job_version: Optional[int]) -> dict:
+    '''
+    Returns the delta or snapshot payload for the job_updated event
+    '''
+    if job_changes and client_job_version is not None and client_job_version == job_changes['base_version']:
+        return serialize_job_delta(job, job_changes)
+    return serialize_job_snapshot(job)
+
+# Arguments of generate_job_sections that become job sections, in section order, with the heading of their section
+JOB_SECTION_ARGS = (
+    ('company_context', "About the Company"),
+    ('responsibilities', "Responsibilities"),
+    ('required_qualifications', "Required Qualifications"),
+    ('preferred_qualifications', "Preferred Qualifications"),
+    ('benefits', "Benefits and Offers"),
+    ('additional_information', "Additional Information"),
+)
+
+# Arguments of generate_job_sections that are fields of the job itself
+JOB_FIELD_ARGS = {'target_role': 'jobrole', 'target_role_description': 'description'}
+
+# Arguments of update_job_sections renamed to their generate_job_sections equivalents
+UPDATE_JOB_SECTIONS_ARG_NAMES = {
+    'job_title': 'target_role',
+    'job_description': 'target_role_description',
+    'about_company': 'company_context',
+    'candidate_responsibilities': 'responsibilities',
+    'candidate_qualifications': 'required_qualifications',
+    'job_benefits': 'benefits',
+}
+
+class JobSectionsToolError(Exception):
+    '''
+    Raised when a job sections function call cannot be applied, with a message for the client
+    '''
+
+def _normalize_heading(heading: Optional[str]) -> str:
+    return (heading or '').strip().lower()
+
+def _format_section_body(value) -> str:
+    if isinstance(value, list):
+        return "\n".join(f"- {item}" for item in value)
+    return value or ""
+
+# Parse the arguments of a function call of the model response into plain Python values
+def _parse_function_call_args(function_call) -> dict:
+    '''
+    Returns the arguments as a dictionary, raises ValueError when they are not a mapping
+    '''
+    if not (isinstance(function_call.args, (Struct, dict)) or hasattr(function_call.args, 'items')):
+        raise ValueError(f"Unexpected argument format for {function_call.name}")
+    try:
+        args_dict = MessageToDict(function_call.args)
+    except AttributeError:
+        args_dict = dict(function_call.args.items() if hasattr(function_call.args, 'items') else function_call.args)
+    # Repeated values of proto-plus messages are RepeatedComposite sequences rather than lists
+    return {key: value if isinstance(value, (str, dict)) or not hasattr(value, '__iter__') else list(value) for key, value in args_dict.items()}
+
+# Copy the job into plain data that the tool handlers can read from other green threads without touching the session
+def _snapshot_job(job: Optional[Jobs]) -> dict:
+    '''
+    Returns the job fields and its sections in section order
+    '''
+    if job is None:
+        return {'jobrole': None, 'description': None, 'sections': []}
+    return {
+        'jobrole': job.jobrole,
+        'description': job.description,
+        'sections': [
+            {'section_number': section.section_number, 'heading': section.heading, 'body': section.body}
+            for section in sorted(job.sections, key=lambda s: s.section_number)
+        ]
+    }
+
+# Turn generate_job_sections style arguments into a job change
+def _job_change_from_generate_args(function_args: dict, replace_sections: bool) -> dict:
+    '''
+    Returns the job change with the given job fields and the sections of the given section arguments.
+    With replace_sections the sections become the complete list of sections, otherwise they are merged into the existing ones
+    '''
+    fields = {field: function_args[arg] for arg, field in JOB_FIELD_ARGS.items() if arg in function_args}
+    sections = None
+    if any(arg in function_args for arg, _ in JOB_SECTION_ARGS):
+        sections = [
+            {'section_number': section_number, 'heading': heading, 'body': _format_section_body(function_args[arg])}
+            for section_number, (arg, heading) in enumerate(
+                ((arg, heading) for arg, heading in JOB_SECTION_ARGS if arg in function_args), start=1
+            )
+        ]
+    return {'fields': fields, 'sections': sections, 'replace_sections': replace_sections, 'updated_field_keys': list(function_args.keys())}
+
+# Handler of generate_job_sections, which writes the whole job description
+def _prepare_generate_job_sections(function_args: dict, job_snapshot: dict, on_section_chunk=None) -> dict:
+    return _job_change_from_generate_args(function_args, replace_sections=True)
+
+# Handler of update_job_sections, which changes only the given fields and sections
+def _prepare_update_job_sections(function_args: dict, job_snapshot: dict, on_section_chunk=None) -> dict:
+    renamed_args = {UPDATE_JOB_SECTIONS_ARG_NAMES[key]: value for key, value in function_args.items() if key in UPDATE_JOB_SECTIONS_ARG_NAMES}
+    return _job_change_from_generate_args(renamed_args, replace_sections=False)
+
+# Handler of modify_job_sections, which rewrites the body of a single existing section from that section alone
+def _prepare_modify_job_sections(function_args: dict, job_snapshot: dict, on_section_chunk=None) -> dict:
+    target_heading = function_args.get('target_section_heading')
+    section = next((s for s in job_snapshot['sections'] if _normalize_heading(s['heading']) == _normalize_heading(target_heading)), None)
+    if section is None:
+        raise JobSectionsToolError(f"There is no '{target_heading}' section in the job description to modify.")
+    new_body = _rewrite_job_section(job_snapshot, section, function_args.get('modification_instruction') or '', on_section_chunk)
+    updated_field_key = next((arg for arg, heading in JOB_SECTION_ARGS if _normalize_heading(heading) == _normalize_heading(section['heading'])), section['heading'])
+    return {
+        'fields': {},
+        'sections': [{'section_number': section['section_number'], 'heading': section['heading'], 'body': new_body}],
+        'replace_sections': False,
+        'updated_field_keys': [updated_field_key]
+    }
+
+# Rewrite a section with a prompt holding only the job header, the section and the instruction, streaming the new body when asked
+def _rewrite_job_section(job_snapshot: dict, section: dict, modification_instruction: str, on_section_chunk=None) -> str:
+    '''
+    Returns the rewritten section body, raises JobSectionsToolError when the model does not return one.
+    Text chunks are forwarded to on_section_chunk as (section, text_chunk) while they are generated
+    '''
+    model = llm_interface.get_model_for_task('section_rewrite')
+    prompt = build_section_rewrite_prompt(job_snapshot, section, modification_instruction)
+    if on_section_chunk:
+        response = llm_interface.generate_content_streamed(model, prompt, partial(on_section_chunk, section))
+    else:
+        response = llm_interface.generate_content(model, prompt)
+    try:
+        new_body = response.text.strip()
+    except ValueError:
+        new_body = None
+    if not new_body:
+        raise JobSectionsToolError(f"Failed to rewrite the {section['heading']} section.")
+    return new_body
+
+# Handlers of the functions declared in JOB_SECTIONS_TOOLS, called as handler(function_args, job_snapshot, on_section_chunk) and returning a job change
+JOB_SECTIONS_TOOL_HANDLERS = {
+    'generate_job_sections': _prepare_generate_job_sections,
+    'update_job_sections': _prepare_update_job_sections,
+    'modify_job_sections': _prepare_modify_job_sections,
+}
+
+# Run the handlers of the function calls, concurrently when the model made several calls in its response
+def _prepare_job_changes(function_calls: list, job_snapshot: dict, on_section_chunk=None) -> list:
+    '''
+    Returns the outcome of each (function_name, function_args) call in call order: its job change, or the JobSectionsToolError
+    it raised. A failed call does not stop the other calls of the turn
+    '''
+    if len(function_calls) == 1:
+        function_name, function_args = function_calls[0]
+        try:
+            return [JOB_SECTIONS_TOOL_HANDLERS[function_name](function_args, job_snapshot, on_section_chunk)]
+        except JobSectionsToolError as e:
+            return [e]
+
+    app = current_app._get_current_object()
+
+    # Handlers that call the LLM run on their own green thread, with their own application context
+    def run_handler(function_call):
+        function_name, function_args = function_call
+        with app.app_context():
+            try:
+                return JOB_SECTIONS_TOOL_HANDLERS[function_name](function_args, job_snapshot, on_section_chunk)
+            except JobSectionsToolError as e:
+                return e
+
+    pool = eventlet.GreenPool(len(function_calls))
+    return list(pool.imap(run_handler, function_calls))
+
+# Merge the job changes of a turn, in call order, into the desired job fields and sections
+def _merge_job_changes(job_snapshot: dict, job_changes: list) -> Tuple[dict, Optional[list], List[str]]:
+    '''
+    Returns the desired job fields, the desired complete list of sections (None when the sections are left as they are)
+    and the updated field keys of all the calls
+    '''
+    desired_fields = {}
+    desired_sections = None
+    updated_field_keys = []
+    for job_change in job_changes:
+        desired_fields.update(job_change['fields'])
+        updated_field_keys.extend(key for key in job_change['updated_field_keys'] if key not in updated_field_keys)
+        if job_change['sections'] is None:
+            continue
+        if job_change['replace_sections']:
+            desired_sections = [dict(section) for section in job_change['sections']]
+            continue
+        if desired_sections is None:
+            desired_sections = [dict(section) for section in job_snapshot['sections']]
+        for changed_section in job_change['sections']:
+            section = next((s for s in desired_sections if _normalize_heading(s['heading']) == _normalize_heading(changed_section['heading'])), None)
+            if section is not None:
+                section['body'] = changed_section['body']
+            else:
+                next_section_number = max((s['section_number'] for s in desired_sections), default=0) + 1
+                desired_sections.append({**changed_section, 'section_number': next_section_number})
+    return desired_fields, desired_sections, updated_field_keys
+
+# Save the job changes of all the function calls of a turn in the session, as one version of the job
+def _save_job_changes(user_id: int, conversation_id: int, job_data: Optional[Jobs], job_snapshot: dict, job_changes: list) -> Tuple[Optional[Jobs], List[str], Optional[dict]]:
+    '''
+    Returns the job data, the updated fields keys and the job changes (changed fields, section changes and versions) from the merged
+    job changes. Nothing is committed, the caller commits the whole turn
+    '''
+    desired_fields, desired_sections, updated_fields_keys = _merge_job_changes(job_snapshot, job_changes)
+    try:
         if not job_data:
-            job_data = Jobs(user_id=user_id, conversation_id=conversation_id)
+            job_data = Jobs(user_id=user_id, conversation_id=conversation_id, version=0)
             db.session.add(job_data)
-            db.session.flush()
-
-        if 'target_role' in function_args:
-            job_data.jobrole = function_args['target_role']
-        if 'target_role_description' in function_args:
-            job_data.description = function_args['target_role_description']
-
-        job_sections_related_args = {'company_context', 'responsibilities', 'required_qualifications', 'preferred_qualifications', 'benefits', 'additional_information'}
-        if any(key in function_args for key in job_sections_related_args):
-            JobSections.query.filter_by(job_id=job_data.id).delete()
-            db.session.flush()
-
-            new_job_sections_data = []
-            job_sections_counter = 1
-            company_context = function_args.get('company_context', None)
-            responsibilities = function_args.get('responsibilities', None)
-            required_qualifications = function_args.get('required_qualifications', None)
-            preferred_qualifications = function_args.get('preferred_qualifications', None)
-            benefits = function_args.get('benefits', None)
-            additional_information = function_args.get('additional_information', None)
-
-            if company_context is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "About the Company", "body": company_context or ""})
-                job_sections_counter += 1
-            if responsibilities is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "Responsibilities", "body": "\n".join([f"- {r}" for r in responsibilities]) if responsibilities else ""})
-                job_sections_counter += 1
-            if required_qualifications is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "Required Qualifications", "body": "\n".join([f"- {q}" for q in required_qualifications]) if required_qualifications else ""})
-                job_sections_counter += 1
-            if preferred_qualifications is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "Preferred Qualifications", "body": "\n".join([f"- {q}" for q in preferred_qualifications]) if preferred_qualifications else ""})
-                job_sections_counter += 1
-            if benefits is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "Benefits and Offers", "body": "\n".join([f"- {b}" for b in benefits]) if benefits else ""})
-                job_sections_counter += 1
-            if additional_information is not None:
-                new_job_sections_data.append({"section_number": job_sections_counter, "heading": "Additional Information", "body": additional_information or ""})
-                job_sections_counter += 1
-
-            job_sections_added = []
-            for section_data in new_job_sections_data:
-                if isinstance(section_data, dict) and 'heading' in section_data and 'body' in section_data and 'section_number' in section_data:
-                    new_job_section = JobSections(
-                        job_id=job_data.id,
-                        section_number=section_data['section_number'],
-                        heading=section_data['heading'],
-                        body=section_data['body']
-                    )
-                    db.session.add(new_job_section)
-                    job_sections_added.append(new_job_section)
-
-            if job_sections_added:
-                db.session.flush()
-
-        return job_data, updated_fields_keys
+        base_version = job_data.version
+
+        changed_fields = []
+        for field, value in desired_fields.items():
+            if getattr(job_data, field) != value:
+                setattr(job_data, field, value)
+                changed_fields.append(field)
+
+        section_changes = {'added_section_ids': [], 'updated_section_ids': [], 'removed_section_ids': []}
+        if desired_sections is not None:
+            section_changes = upsert_job_sections(job_data, desired_sections)
+
+        if changed_fields or any(section_changes.values()):
+            job_data.version = base_version + 1
+        job_changes = {**section_changes, 'changed_fields': changed_fields, 'base_version': base_version}
+
+        return job_data, updated_fields_keys, job_changes
 
     except Exception as e:
         print(f"(JobSectionsService) Error saving Job data from function call: {e}")
         traceback.print_exc()
         db.session.rollback()
-        return job_data, []
+        return job_data, [], None
+
+# Build a confirmation message for the job sections update from the local templates
+def _build_template_confirmation_message(updated_field_keys: List[str], job_role: Optional[str], function_names: Optional[List[str]] = None) -> str:
+    '''
+    Returns a confirmation message describing the updated fields without calling the LLM. Only a turn that called
+    generate_job_sections drafted the whole job, the other tools are confirmed with the list of the sections they changed
+    '''
+    if 'generate_job_sections' in (function_names or []) and job_role:
+        return CONFIRMATION_FULL_UPDATE_TEMPLATE.format(job_role=job_role)
+
+    # Sections modified under a heading of their own have no label, they are named by their heading
+    updated_labels = [label for key, label in CONFIRMATION_FIELD_LABELS.items() if key in updated_field_keys]
+    updated_labels.extend(f"{key} section" for key in updated_field_keys if key not in CONFIRMATION_FIELD_LABELS)
+    if not updated_labels:
+        return CONFIRMATION_FALLBACK_MESSAGE
+
+    if len(updated_labels) == 1:
+        updated_fields = updated_labels[0]
+    else:
+        updated_fields = f"{', '.join(updated_labels[:-1])} and {updated_labels[-1]}"
+    return CONFIRMATION_PARTIAL_UPDATE_TEMPLATE.format(updated_fields=updated_fields)
 
 # Get a brief confirmation message from the LLM for the job sections update 
-def _get_confirmation_message() -> str:
+def _get_llm_confirmation_message() -> str:
     '''
-    Returns a confirmation message from the LLM for the job sections update
+    Returns a confirmation message from a separate LLM call for the job sections update
     '''
     try:
-        model = llm_interface.get_gemini_model()
-        response = model.generate_content(CONFIRMATION_PROMPT_TEMPLATE)
+        model = llm_interface.get_model_for_task('confirmation')
+        response = llm_interface.generate_content(model, CONFIRMATION_PROMPT_TEMPLATE)
 
         if not response or not hasattr(response, 'text'):
-             return "OK, job description and its sections updated."
+             return CONFIRMATION_FALLBACK_MESSAGE
 
         return response.text.strip()
     except Exception as e:
         print(f"(JobSectionsService) Exception getting confirmation message: {e}")
-        return "OK, job description and its sections updated."
+        return CONFIRMATION_FALLBACK_MESSAGE
+
+# Get the confirmation message from the model as its follow-up to the function responses of the same turn
+def _get_function_response_confirmation_message(turn_contents: list, function_call_content, function_names: List[str], updated_field_keys: List[str],
+                                                 function_errors: Optional[List[Optional[str]]] = None) -> Optional[str]:
+    '''
+    Returns the model's reply to the function responses, one per function call, or None if the model did not reply with text.
+    The reply comes from the confirmation model, declared with the same tools as the job sections model that made the calls
+    '''
+    try:
+        model = llm_interface.get_model_for_task('confirmation', tools=JOB_SECTIONS_TOOLS, system_instruction=SYSTEM_PROMPT_JOB_SECTIONS)
+        function_response_parts = [
+            genai.protos.Part(function_response=genai.protos.FunctionResponse(
+                name=function_name,
+                response={"result": "error", "error": function_error} if function_error else {"result": "success", "updated_fields": updated_field_keys}
+            ))
+            for function_name, function_error in zip(function_names, function_errors or [None] * len(function_names))
+        ]
+        response = llm_interface.generate_content(model, [
+            *turn_contents,
+            function_call_content,
+            {"role": "user", "parts": function_response_parts}
+        ])
+        return response.text.strip() or None
+    except Exception as e:
+        print(f"(JobSectionsService) Exception getting function response confirmation message: {e}")
+        return None
+
+# Get the confirmation message for the job sections update using the strategy configured for the deployment
+def _get_confirmation_message(updated_field_keys: List[str], job_role: Optional[str], turn_contents: Optional[list] = None,
+                              function_call_content=None, function_names: Optional[List[str]] = None,
+                              function_errors: Optional[List[Optional[str]]] = None) -> str:
+    '''
+    Returns the confirmation message for the job sections update based on JOB_SECTIONS_CONFIRMATION_MODE.
+    function_errors holds the error of each function call that failed and None for the applied calls, the errors are
+    added to the confirmation unless the model already replied to them
+    '''
+    function_names = function_names or []
+    function_errors = function_errors or [None] * len(function_names)
+    confirmation_mode = current_app.config.get('JOB_SECTIONS_CONFIRMATION_MODE', 'template')
+    if confirmation_mode == 'function_response' and function_call_content is not None:
+        confirmation_message = _get_function_response_confirmation_message(
+            turn_contents or [], function_call_content, function_names, updated_field_keys, function_errors
+        )
+        if confirmation_message:
+            return confirmation_message
+    if confirmation_mode == 'llm':
+        confirmation_message = _get_llm_confirmation_message()
+    else:
+        applied_function_names = [function_name for function_name, function_error in zip(function_names, function_errors) if not function_error]
+        confirmation_message = _build_template_confirmation_message(updated_field_keys, job_role, applied_function_names)
+    return " ".join([confirmation_message, *(function_error for function_error in function_errors if function_error)])
 
 # Process the incoming message from the frontend client and return the response data based on the active view
 def process_chat_for_job_sections(user_id: int,
                                   conversation_id: int,
                                   message_content: str,
-                                  conversation_history: list) -> tuple[Optional[str], Optional[JobSections], Optional[str], Optional[List[str]]]:
+                                  conversation_history: list,
+                                  on_text_chunk: Optional[Callable[[str], None]] = None,
+                                  on_section_chunk: Optional[Callable[[dict, str], None]] = None) -> tuple[Optional[str], Optional[JobSections], Optional[str], Optional[List[str]], Optional[dict]]:
     '''
-    Returns a Tuple of (text_response_for_chat, updated_job, error_for_client, updated_field_keys)
+    Returns a Tuple of (text_response_for_chat, updated_job, error_for_client, updated_field_keys, job_changes). 
+    Text parts of the response are streamed to on_text_chunk when it is given, function calls are handled once the stream completes.
+    Sections rewritten for modify_job_sections are streamed to on_section_chunk as (section, text_chunk) when it is given
     '''
-    text_response_for_chat = None
+    text_for_chat = None
     updated_job = None
     error_message_for_client = None
     updated_field_keys = None
+    job_changes = None
 
     try:
-        job_data = get_job_data_for_conversation(conversation_id)
-        current_job_state_json = "null"
-        if job_data:
-            current_job_state_dict = {
-                "jobrole": job_data.jobrole,
-                "description": job_data.description,
-                "sections": sorted([
-                    {"section_number": s.section_number, "heading": s.heading, "body": s.body}
-                    for s in job_data.sections
-                ], key=lambda x: x['section_number'])
-            }
-            try:
-                current_job_state_dict = json.dumps(current_job_state_dict, indent=2)
-            except Exception as json_err:
-                print(f"(JobSectionsService) Error formatting current state as JSON for context: {json_err}")
-                current_job_state_dict = "{\"error\": \"Could not format current state\"}"
-
-        user_turn_content = BUILD_JOB_SECTIONS_PROMPT.format(
-            current_job_state_json=current_job_state_json,
-            user_message=message_content
-        )
-
-        formatted_history = []
-        for item in conversation_history:
-            role = item.get('role')
-            parts = item.get('parts')
-            if role and parts:
-                formatted_history.append({"role": role, "parts": parts})
+        with time_stage('job_load'):
+            job_data = get_job_data_for_conversation(conversation_id)
 
-        model = llm_interface.get_gemini_model(tools=JOB_SECTIONS_TOOLS, system_instruction=SYSTEM_PROMPT_JOB_SECTIONS)
+        try:
+            full_content, prompt_stats = build_job_sections_contents(
+                job_data, message_content, conversation_history, SYSTEM_PROMPT_JOB_SECTIONS,
+                token_ceiling=current_app.config.get('JOB_SECTIONS_PROMPT_TOKEN_CEILING', 12000),
+                history_messages_with_job=current_app.config.get('JOB_SECTIONS_HISTORY_MESSAGES_WITH_JOB', 6)
+            )
+        except PromptBudgetExceededError as budget_err:
+            print(f"(JobSectionsService) {budget_err}")
+            return None, None, "This job description is too long to update in a single message. Please shorten some of its sections.", None, None
+        record_turn_detail('prompt_tokens', prompt_stats)
 
-        full_content = [
-            *formatted_history,
-            {"role": "user", "parts": [user_turn_content]}
-        ]
+        model = llm_interface.get_model_for_task('job_sections', tools=JOB_SECTIONS_TOOLS, system_instruction=SYSTEM_PROMPT_JOB_SECTIONS)
 
-        llm_response = model.generate_content(contents=full_content)
+        if on_text_chunk:
+            llm_response = llm_interface.generate_content_streamed(model, full_content, on_text_chunk)
+        else:
+            llm_response = llm_interface.generate_content(model, full_content)
 
-        function_call_detected = False
+        function_calls = []
         if llm_response.candidates and llm_response.candidates[0].content.parts:
             for part in llm_response.candidates[0].content.parts:
-                if part.function_call:
-                    fc = part.function_call
-                    if fc.name == "generate_job_sections":
-                        function_call_detected = True
-                        args_dict = {}
-                        try:
-                            if isinstance(fc.args, (Struct, dict)) or hasattr(fc.args, 'items'):
-                                try:
-                                     args_dict = MessageToDict(fc.args)
-                                except AttributeError:
-                                     args_dict = dict(fc.args.items() if hasattr(fc.args, 'items') else fc.args)
-                            else:
-                                error_message_for_client = "AI tried to update the job, but the argument format was unexpected."
-                                break
-
-                            for key, value in args_dict.items():
-                                if isinstance(value, list):
-                                     args_dict[key] = list(value)
-                        except Exception as parse_err:
-                             print(f"(JobSectionsService) Error parsing function call arguments: {parse_err}")
-                             error_message_for_client = "AI tried to update the job description and its sections, but parsing arguments failed."
-                             break
-
-                        if not error_message_for_client:
-                            updated_job, updated_field_keys = _save_job_sections_data(user_id, conversation_id, args_dict)
-
-                            if updated_job:
-                                text_for_chat = _get_confirmation_message()
-                            else:
-                                updated_field_keys = list(args_dict.keys())
-                                error_message_for_client = "Failed to save the updated job data due to an internal error after function call."
+                if not (part.function_call and part.function_call.name):
+                    continue
+                if part.function_call.name not in JOB_SECTIONS_TOOL_HANDLERS:
+                    print(f"(JobSectionsService) Ignoring call to undeclared function {part.function_call.name}")
+                    continue
+                function_calls.append(part.function_call)
+        function_call_detected = bool(function_calls)
+
+        if function_calls:
+            parsed_function_calls = []
+            try:
+                with time_stage('function_call_parse'):
+                    for fc in function_calls:
+                        parsed_function_calls.append((fc.name, _parse_function_call_args(fc)))
+            except Exception as parse_err:
+                print(f"(JobSectionsService) Error parsing function call arguments: {parse_err}")
+                error_message_for_client = "AI tried to update the job description and its sections, but parsing arguments failed."
+
+            if parsed_function_calls and not error_message_for_client:
+                job_snapshot = _snapshot_job(job_data)
+                with time_stage('tool_execution'):
+                    function_outcomes = _prepare_job_changes(parsed_function_calls, job_snapshot, on_section_chunk)
+                # The calls that succeeded are still applied, the errors of the others are added to the confirmation
+                prepared_job_changes = [outcome for outcome in function_outcomes if not isinstance(outcome, JobSectionsToolError)]
+                function_errors = [str(outcome) if isinstance(outcome, JobSectionsToolError) else None for outcome in function_outcomes]
+                for function_error in filter(None, function_errors):
+                    print(f"(JobSectionsService) {function_error}")
+                if not prepared_job_changes:
+                    error_message_for_client = " ".join(filter(None, function_errors))
+
+                if not error_message_for_client:
+                    with time_stage('section_save'):
+                        updated_job, updated_field_keys, job_changes = _save_job_changes(
+                            user_id, conversation_id, job_data, job_snapshot, prepared_job_changes
+                        )
+
+                    if updated_job and job_changes is not None:
+                        with time_stage('confirmation'):
+                            text_for_chat = _get_confirmation_message(
+                                updated_field_keys, updated_job.jobrole, turn_contents=full_content,
+                                function_call_content=llm_response.candidates[0].content,
+                                function_names=[function_name for function_name, _ in parsed_function_calls],
+                                function_errors=function_errors
+                            )
+                    else:
+                        updated_job = None
+                        updated_field_keys = [key for job_change in prepared_job_changes for key in job_change['updated_field_keys']]
+                        error_message_for_client = "Failed to save the updated job data due to an internal error after function call."
 
         if not function_call_detected and not updated_job:
             try:
@@ -213,9 +590,12 @@ def process_chat_for_job_sections(user_id: int,
                      error_message_for_client = f"The request was blocked by the AI for safety reasons: {llm_response.prompt_feedback.block_reason.name}"
                 else:
                      error_message_for_client = "Sorry, I couldn't process that request properly."
-        return text_for_chat, updated_job, error_message_for_client, updated_field_keys
+        return text_for_chat, updated_job, error_message_for_client, updated_field_keys, job_changes
 
+    except (llm_interface.LLMUnavailableError, llm_interface.LLMDeadlineExceededError) as e:
+        print(f"(JobSectionsService) LLM call failed in process_chat_for_job_sections: {e}")
+        return None, None, str(e), None, None
     except Exception as e:
         print(f"(JobSectionsService) Critical error in process_chat_for_job_sections (Function Calling Mode): {e}")
         traceback.print_exc()
-        return None, None, "Sorry, an internal error occurred while processing the job request.", None 
\ No newline at end of file
+        return None, None, "Sorry, an internal error occurred while processing the job request.", None, None 
\ No newline at end of file
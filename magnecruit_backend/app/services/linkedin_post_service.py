@@ -1,82 +1,286 @@
 import traceback
-from ..models import Jobs   
+import eventlet
+import eventlet.queue
+from typing import Iterator
+from datetime import datetime
+from flask import current_app
+from .. import db
+from ..models import Jobs, LinkedInPostCache
 from ..services import job_sections_service
+from .response_cache import context_hash
+from .metrics import metrics_registry
+from .task_queue import task_queue, TaskFailedError
 from ..agent import llm_interface
 from ..agent.prompts import SYSTEM_PROMPT_LINKEDIN_POST, USER_PROMPT_LINKEDIN_POST_TEMPLATE
 
+metrics_registry.describe('linkedin_post_cache_lookups_total', 'counter', 'LinkedIn post cache lookups, by outcome.')
+
+# Get the cached post for the prompt, if it was generated for the current version of the job
+def _get_cached_post(prompt_hash: str, job_id: int, job_version: int) -> str | None:
+    '''
+    Returns the cached post content and marks it as recently used, or None on a miss
+    '''
+    try:
+        cached_post = db.session.query(LinkedInPostCache).filter_by(job_id=job_id, prompt_hash=prompt_hash, job_version=job_version).first()
+        if cached_post is None:
+            metrics_registry.inc('linkedin_post_cache_lookups_total', outcome='miss')
+            return None
+        cached_post.last_used_at = datetime.now()
+        db.session.commit()
+        metrics_registry.inc('linkedin_post_cache_lookups_total', outcome='hit')
+        return cached_post.post_content
+    except Exception as e:
+        db.session.rollback()
+        print(f"(LinkedInPostService) Error reading the LinkedIn post cache: {e}")
+        return None
+
+# Get the cached posts of many prompts in one query, for the batch generation
+def _get_cached_posts(keys: list[tuple[int, str, int]]) -> dict:
+    '''
+    Returns a dictionary of (job_id, prompt_hash, job_version) to the cached post content, for the keys that hit
+    '''
+    if not keys:
+        return {}
+    try:
+        job_ids = {job_id for job_id, _, _ in keys}
+        cached_posts = db.session.query(LinkedInPostCache).filter(
+            LinkedInPostCache.job_id.in_(job_ids),
+            LinkedInPostCache.prompt_hash.in_({prompt_hash for _, prompt_hash, _ in keys})
+        ).all()
+        wanted_keys = set(keys)
+        hits = {}
+        for cached_post in cached_posts:
+            key = (cached_post.job_id, cached_post.prompt_hash, cached_post.job_version)
+            if key in wanted_keys:
+                cached_post.last_used_at = datetime.now()
+                hits[key] = cached_post.post_content
+        db.session.commit()
+        metrics_registry.inc('linkedin_post_cache_lookups_total', len(hits), outcome='hit')
+        metrics_registry.inc('linkedin_post_cache_lookups_total', len(wanted_keys) - len(hits), outcome='miss')
+        return hits
+    except Exception as e:
+        db.session.rollback()
+        print(f"(LinkedInPostService) Error reading the LinkedIn post cache: {e}")
+        return {}
+
+# Cache the generated post, dropping the posts of older job versions and the least recently used posts over the limit
+def _store_cached_post(prompt_hash: str, job_id: int, job_version: int, post_content: str):
+    '''
+    Upserts the post for the prompt hash. Failures are logged and do not fail the generation
+    '''
+    max_entries = current_app.config.get('LINKEDIN_POST_CACHE_MAX_ENTRIES', 1000)
+    try:
+        db.session.query(LinkedInPostCache).filter(
+            LinkedInPostCache.job_id == job_id, LinkedInPostCache.job_version != job_version
+        ).delete(synchronize_session=False)
+
+        cached_post = db.session.query(LinkedInPostCache).filter_by(job_id=job_id, prompt_hash=prompt_hash).first()
+        if cached_post is None:
+            cached_post = LinkedInPostCache(job_id=job_id, prompt_hash=prompt_hash)
+            db.session.add(cached_post)
+        cached_post.job_version = job_version
+        cached_post.post_content = post_content
+        cached_post.created_at = cached_post.last_used_at = datetime.now()
+        db.session.flush()
+
+        overflow_count = db.session.query(LinkedInPostCache).count() - max_entries
+        if overflow_count > 0:
+            evicted_ids = [row.id for row in db.session.query(LinkedInPostCache.id).order_by(LinkedInPostCache.last_used_at).limit(overflow_count)]
+            db.session.query(LinkedInPostCache).filter(LinkedInPostCache.id.in_(evicted_ids)).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"(LinkedInPostService) Error writing the LinkedIn post cache: {e}")
+
+# Build the LinkedIn post prompt for the job
+def _build_linkedin_post_prompt(job: Jobs, company_name_input: str, job_description_summary_input: str, tone: str, length: str) -> tuple[str | None, str | None]:
+    '''
+    Returns (formatted_user_prompt, error_message)
+    '''
+    if not job:
+        return None, "No job details found for this conversation to generate a LinkedIn post."
+
+    if not job.jobrole:
+        return None, "Job title is missing, which is essential for a LinkedIn post."
+
+    job_title = job.jobrole or "Not specified"
+    company_name = company_name_input.strip() if company_name_input.strip() else "Our Company" # Default if not provided
+    description_summary = job_description_summary_input.strip() if job_description_summary_input.strip() else (job.description or "An exciting role.")
+
+    about_company_body = "Not specified"
+    responsibilities_body = "Key responsibilities for this role."
+    qualifications_body = "Relevant skills and experience."
+    
+    if job.sections:
+        for section in job.sections:
+            heading_lower = section.heading.lower()
+            if "about the company" in heading_lower or "company context" in heading_lower:
+                about_company_body = section.body or about_company_body
+            elif "responsibilities" in heading_lower:
+                responsibilities_body = section.body or responsibilities_body
+            elif "qualifications" in heading_lower or "requirements" in heading_lower:
+                qualifications_body = section.body or qualifications_body
+    
+    company_name_hashtag = company_name.replace(' ', '').replace('.', '').replace(',', '')
+    job_title_hashtag = job_title.replace(' ', '')
+
+    formatted_user_prompt = USER_PROMPT_LINKEDIN_POST_TEMPLATE.format(
+        job_title=job_title,
+        company_name=company_name,
+        job_description_summary=description_summary,
+        key_responsibilities=responsibilities_body,
+        key_qualifications=qualifications_body,
+        about_company=about_company_body,
+        tone=tone,
+        length=length,
+        company_name_hashtag=company_name_hashtag,
+        job_title_hashtag=job_title_hashtag
+    )
+    return formatted_user_prompt, None
+
+# Generate the LinkedIn post for the formatted prompt with the LLM
+def _generate_post_content(formatted_user_prompt: str) -> tuple[str | None, str | None]:
+    '''
+    Returns (post_content, error_message)
+    '''
+    llm_response_data = llm_interface.get_gemini_chat_response(
+        user_message_content=formatted_user_prompt, 
+        system_instruction=SYSTEM_PROMPT_LINKEDIN_POST,
+        task='linkedin_post'
+    )
+
+    if isinstance(llm_response_data, dict) and llm_response_data.get("error"):
+        return None, llm_response_data.get("error")
+    
+    try:
+        return llm_response_data.text, None
+    except (AttributeError, ValueError):
+        if hasattr(llm_response_data, 'prompt_feedback') and llm_response_data.prompt_feedback.block_reason:
+            return None, f"Content generation blocked: {llm_response_data.prompt_feedback.block_reason.name}"
+        return None, "Failed to extract text from AI response."
+
 # Service to generate a LinkedIn job post for the user 
 def generate_linkedin_post_from_conversation(
     conversation_id: int, 
     company_name_input: str, 
     job_description_summary_input: str, 
     tone: str, 
-    length: str
+    length: str,
+    regenerate: bool = False
 ) -> tuple[str | None, str | None]:
     """
     Fetches job details for the conversation and generates a LinkedIn post using LLM.
+    Posts are cached by the hash of the formatted prompt until the job changes, regenerate bypasses the cache.
     Returns (post_content, error_message)
     """
     try:
         job_data_object = job_sections_service.get_job_data_for_conversation(conversation_id)
-
-        if not job_data_object:
-            return None, "No job details found for this conversation to generate a LinkedIn post."
-
-        if not job_data_object.jobrole:
-            return None, "Job title is missing, which is essential for a LinkedIn post."
-
-        job_title = job_data_object.jobrole or "Not specified"
-        company_name = company_name_input.strip() if company_name_input.strip() else "Our Company" # Default if not provided
-        description_summary = job_description_summary_input.strip() if job_description_summary_input.strip() else (job_data_object.description or "An exciting role.")
-
-        about_company_body = "Not specified"
-        responsibilities_body = "Key responsibilities for this role."
-        qualifications_body = "Relevant skills and experience."
-        
-        if job_data_object.sections:
-            for section in job_data_object.sections:
-                heading_lower = section.heading.lower()
-                if "about the company" in heading_lower or "company context" in heading_lower:
-                    about_company_body = section.body or about_company_body
-                elif "responsibilities" in heading_lower:
-                    responsibilities_body = section.body or responsibilities_body
-                elif "qualifications" in heading_lower or "requirements" in heading_lower:
-                    qualifications_body = section.body or qualifications_body
+        formatted_user_prompt, error = _build_linkedin_post_prompt(job_data_object, company_name_input, job_description_summary_input, tone, length)
+        if error:
+            return None, error
         
-        company_name_hashtag = company_name.replace(' ', '').replace('.', '').replace(',', '')
-        job_title_hashtag = job_title.replace(' ', '')
-
-        formatted_user_prompt = USER_PROMPT_LINKEDIN_POST_TEMPLATE.format(
-            job_title=job_title,
-            company_name=company_name,
-            job_description_summary=description_summary,
-            key_responsibilities=responsibilities_body,
-            key_qualifications=qualifications_body,
-            about_company=about_company_body,
-            tone=tone,
-            length=length,
-            company_name_hashtag=company_name_hashtag,
-            job_title_hashtag=job_title_hashtag
-        )
-        
-        llm_response_data = llm_interface.get_gemini_chat_response(
-            user_message_content=formatted_user_prompt, 
-            system_instruction=SYSTEM_PROMPT_LINKEDIN_POST
-        )
+        prompt_hash = context_hash(llm_interface.get_task_profile('linkedin_post')['model_name'], SYSTEM_PROMPT_LINKEDIN_POST, formatted_user_prompt)
+        if not regenerate:
+            cached_post = _get_cached_post(prompt_hash, job_data_object.id, job_data_object.version)
+            if cached_post is not None:
+                return cached_post, None
 
-        if isinstance(llm_response_data, dict) and llm_response_data.get("error"):
-            return None, llm_response_data.get("error")
-        
-        try:
-            post_content = llm_response_data.text
-        except AttributeError:
-            if hasattr(llm_response_data, 'prompt_feedback') and llm_response_data.prompt_feedback.block_reason:
-                return None, f"Content generation blocked: {llm_response_data.prompt_feedback.block_reason.name}"
-            return None, "Failed to extract text from AI response."
+        post_content, error = _generate_post_content(formatted_user_prompt)
+        if error:
+            return None, error
 
+        _store_cached_post(prompt_hash, job_data_object.id, job_data_object.version, post_content)
         return post_content, None
 
     except Exception as e:
         print(f"(LinkedInPostService) Error generating LinkedIn post: {str(e)}")
         traceback.print_exc()
-        return None, f"An internal error occurred: {str(e)}" 
\ No newline at end of file
+        return None, f"An internal error occurred: {str(e)}"
+
+# Generates a LinkedIn post queued with the async flag of the generate route
+@task_queue.handler('linkedin_post')
+def _run_linkedin_post_task(params: dict, user_id: int, report_progress) -> dict:
+    '''
+    Returns the generated post as the task result
+    '''
+    report_progress(10, "Generating the LinkedIn post")
+    try:
+        with llm_interface.llm_admission():
+            post_content, error = generate_linkedin_post_from_conversation(**params)
+    except llm_interface.LLMBackpressureError as backpressure_error:
+        raise TaskFailedError(str(backpressure_error))
+    if error:
+        raise TaskFailedError(error)
+    return {'linkedin_post': post_content}
+
+# Service to generate LinkedIn posts for many (conversation, tone, length) specs, yielding each result as soon as it is ready
+def generate_linkedin_posts_batch(
+    specs: list[dict],
+    company_name_input: str,
+    job_description_summary_input: str,
+    user_id: int,
+    parallelism: int,
+    regenerate: bool = False
+) -> Iterator[dict]:
+    """
+    Loads the jobs of every spec in one query, serves cached posts straight away and fans the remaining LLM calls out
+    to at most parallelism green threads. Yields one result per spec in completion order, as
+    {'index', 'conversation_id', 'tone', 'length', 'linkedin_post', 'cached'} or {'index', 'conversation_id', 'tone', 'length', 'error'}
+    """
+    conversation_ids = {spec['conversation_id'] for spec in specs}
+    jobs_by_conversation_id = job_sections_service.get_jobs_for_conversations(conversation_ids, user_id=user_id)
+
+    prompted_items = []
+    for index, spec in enumerate(specs):
+        result = {'index': index, 'conversation_id': spec['conversation_id'], 'tone': spec['tone'], 'length': spec['length']}
+        job = jobs_by_conversation_id.get(spec['conversation_id'])
+        formatted_user_prompt, error = _build_linkedin_post_prompt(job, company_name_input, job_description_summary_input, spec['tone'], spec['length'])
+        if error:
+            yield {**result, 'error': error}
+            continue
+        prompt_hash = context_hash(llm_interface.get_task_profile('linkedin_post')['model_name'], SYSTEM_PROMPT_LINKEDIN_POST, formatted_user_prompt)
+        prompted_items.append((result, formatted_user_prompt, prompt_hash, job.id, job.version))
+
+    cached_posts = {} if regenerate else _get_cached_posts([(job_id, prompt_hash, job_version) for _, _, prompt_hash, job_id, job_version in prompted_items])
+    pending_items = []
+    for result, formatted_user_prompt, prompt_hash, job_id, job_version in prompted_items:
+        cached_post = cached_posts.get((job_id, prompt_hash, job_version))
+        if cached_post is not None:
+            yield {**result, 'linkedin_post': cached_post, 'cached': True}
+            continue
+        pending_items.append((result, formatted_user_prompt, prompt_hash, job_id, job_version))
+
+    if not pending_items:
+        return
+
+    app = current_app._get_current_object()
+    completed_results = eventlet.queue.LightQueue()
+
+    # Generates one post in its own application context, so each green thread has its own database session
+    def generate_item(result, formatted_user_prompt, prompt_hash, job_id, job_version):
+        with app.app_context():
+            try:
+                with llm_interface.llm_admission():
+                    post_content, error = _generate_post_content(formatted_user_prompt)
+                if error:
+                    completed_results.put({**result, 'error': error})
+                    return
+                _store_cached_post(prompt_hash, job_id, job_version, post_content)
+                completed_results.put({**result, 'linkedin_post': post_content, 'cached': False})
+            except llm_interface.LLMBackpressureError as backpressure_error:
+                completed_results.put({**result, 'error': str(backpressure_error), 'code': 'busy'})
+            except Exception as e:
+                print(f"(LinkedInPostService) Error generating LinkedIn post in batch: {str(e)}")
+                completed_results.put({**result, 'error': f"An internal error occurred: {str(e)}"})
+
+    # The items are spawned from their own green thread, because spawn_n waits while the pool is full and the results
+    # have to be yielded while the later items are still waiting for a slot
+    pool = eventlet.GreenPool(max(1, parallelism))
+
+    def spawn_items():
+        for item in pending_items:
+            pool.spawn_n(generate_item, *item)
+
+    eventlet.spawn_n(spawn_items)
+    for _ in pending_items:
+        yield completed_results.get()
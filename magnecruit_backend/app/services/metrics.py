@@ -0,0 +1,178 @@
+# magnecruit_backend\app\services\metrics.py
+
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the stage duration histogram buckets, from fast DB work to slow LLM calls
+STAGE_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Process-wide counters and histograms exposed in the Prometheus text format on /metrics
+class MetricsRegistry:
+    '''
+    Minimal in-process metrics registry. Updates are a dictionary lookup under a lock, cheap enough to leave on in production.
+    Collectors are called on render to report values owned by other modules, such as the history cache counters
+    '''
+    def __init__(self, namespace: str = 'magnecruit'):
+        self.namespace = namespace
+        self._descriptions: dict = {}
+        self._counters: dict = {}
+        self._histograms: dict = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+
+    # Declare the type and help text of a metric
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: tuple | None = None):
+        '''
+        Registers the metric so it is rendered with its HELP and TYPE lines
+        '''
+        self._descriptions[name] = {'type': metric_type, 'help': help_text, 'buckets': buckets}
+
+    # Increment a counter
+    def inc(self, name: str, value: float = 1, **labels):
+        '''
+        Adds the value to the counter with the given labels
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # Record an observation in a histogram
+    def observe(self, name: str, value: float, **labels):
+        '''
+        Adds the value to the histogram with the given labels
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self._descriptions[name]['buckets']
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = {'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+                self._histograms[key] = histogram
+            for index, upper_bound in enumerate(buckets):
+                if value <= upper_bound:
+                    histogram['counts'][index] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    # Register a function called on every render that returns gauge samples as (name, labels, value)
+    def register_collector(self, collector):
+        '''
+        Adds the collector to the registry
+        '''
+        self._collectors.append(collector)
+
+    # Render every metric in the Prometheus text exposition format
+    def render(self) -> str:
+        '''
+        Returns the metrics as a Prometheus text exposition
+        '''
+        samples: dict = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                buckets = self._descriptions[name]['buckets']
+                cumulative_count = 0
+                for upper_bound, count in zip(buckets, histogram['counts']):
+                    cumulative_count += count
+                    samples.setdefault(name, []).append((f"{name}_bucket", labels + (('le', repr(upper_bound)),), cumulative_count))
+                samples[name].append((f"{name}_bucket", labels + (('le', '+Inf'),), histogram['count']))
+                samples[name].append((f"{name}_sum", labels, histogram['sum']))
+                samples[name].append((f"{name}_count", labels, histogram['count']))
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    samples.setdefault(name, []).append((name, tuple(sorted(labels.items())), value))
+            except Exception as e:
+                print(f"(Metrics) Error running metrics collector {collector.__name__}: {e}")
+
+        lines = []
+        for name in sorted(samples):
+            description = self._descriptions.get(name)
+            full_name = f"{self.namespace}_{name}"
+            if description:
+                lines.append(f"# HELP {full_name} {description['help']}")
+                lines.append(f"# TYPE {full_name} {description['type']}")
+            for sample_name, labels, value in samples[name]:
+                label_text = ",".join(f'{key}="{_escape_label_value(label_value)}"' for key, label_value in labels)
+                lines.append(f"{self.namespace}_{sample_name}{{{label_text}}} {value}" if label_text else f"{self.namespace}_{sample_name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Nearest-rank percentile, shared by the hedging delay and the load benchmark
+def nearest_rank_percentile(values, pct: float) -> float:
+    '''
+    Returns the smallest value with at least pct percent of the values at or below it, 0.0 without values
+    '''
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+metrics_registry = MetricsRegistry()
+metrics_registry.describe('stage_duration_seconds', 'histogram', 'Duration of each stage of a chat turn.', buckets=STAGE_DURATION_BUCKETS)
+metrics_registry.describe('chat_turns_total', 'counter', 'Chat turns processed, by active view and outcome.')
+metrics_registry.describe('llm_requests_total', 'counter', 'LLM calls, by model.')
+metrics_registry.describe('llm_errors_total', 'counter', 'LLM calls that raised an error, by error type.')
+metrics_registry.describe('llm_blocked_prompts_total', 'counter', 'LLM calls whose prompt was blocked, by block reason.')
+metrics_registry.describe('llm_tokens_total', 'counter', 'Tokens sent to and received from the LLM, as reported by the API.')
+
+# Timing spans of the chat turn handled by the current green thread, if any
+_current_turn = threading.local()
+
+# Track the stages of a chat turn so slow turns can be broken down by stage
+@contextmanager
+def track_turn(active_view: str | None, slow_turn_seconds: float | None = None):
+    '''
+    Context manager that collects the stage durations of the turn and logs them as one JSON line when the turn is slower than slow_turn_seconds.
+    Yields the dictionary of turn details, where the caller can set the outcome
+    '''
+    turn = {'active_view': active_view or 'actions', 'outcome': 'success', 'stages': {}, 'details': {}}
+    previous_turn = getattr(_current_turn, 'turn', None)
+    _current_turn.turn = turn
+    started = time.perf_counter()
+    try:
+        yield turn
+    except Exception:
+        if turn['outcome'] == 'success':
+            turn['outcome'] = 'exception'
+        raise
+    finally:
+        _current_turn.turn = previous_turn
+        duration = time.perf_counter() - started
+        metrics_registry.inc('chat_turns_total', active_view=turn['active_view'], outcome=turn['outcome'])
+        if slow_turn_seconds is not None and duration >= slow_turn_seconds:
+            stages = {stage: round(stage_duration, 4) for stage, stage_duration in turn['stages'].items()}
+            print(f"(Metrics) Slow chat turn: {json.dumps({'duration': round(duration, 4), 'active_view': turn['active_view'], 'outcome': turn['outcome'], 'stages': stages, **turn['details']})}")
+
+# Attach a detail such as the prompt size to the current turn, logged along with its stages when the turn is slow
+def record_turn_detail(key: str, value):
+    '''
+    Sets the detail on the turn handled by the current green thread, if any
+    '''
+    turn = getattr(_current_turn, 'turn', None)
+    if turn is not None:
+        turn['details'][key] = value
+
+# Time a stage of the hot path, recorded in the stage histogram and in the current turn's spans
+@contextmanager
+def time_stage(stage: str):
+    '''
+    Context manager that records the duration of the stage
+    '''
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        metrics_registry.observe('stage_duration_seconds', duration, stage=stage)
+        turn = getattr(_current_turn, 'turn', None)
+        if turn is not None:
+            turn['stages'][stage] = turn['stages'].get(stage, 0.0) + duration
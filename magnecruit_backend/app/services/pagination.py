@@ -0,0 +1,46 @@
+# magnecruit_backend\app\services\pagination.py
+
+import json
+import base64
+from datetime import datetime, timezone
+
+# Normalize a timestamp to a naive UTC datetime so cursors compare the same way as the stored columns
+def _normalize_timestamp(value: datetime | str) -> datetime:
+    '''
+    Returns the timestamp as a naive datetime in UTC
+    '''
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Encode the (timestamp, id) keyset position of a row as an opaque cursor
+def encode_cursor(timestamp: datetime | str, row_id: int) -> str:
+    '''
+    Returns a url-safe cursor string for the given keyset position
+    '''
+    payload = json.dumps([_normalize_timestamp(timestamp).isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+# Decode a cursor back into its (timestamp, id) keyset position
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    '''
+    Returns the (timestamp, id) of the cursor, raises ValueError if the cursor is malformed
+    '''
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return _normalize_timestamp(timestamp), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+# Clamp the requested page size to the configured bounds
+def resolve_page_size(requested_limit, default_limit: int, max_limit: int) -> int:
+    '''
+    Returns the page size to use, falling back to the default for missing or invalid values
+    '''
+    try:
+        page_size = int(requested_limit)
+    except (TypeError, ValueError):
+        return default_limit
+    return max(1, min(page_size, max_limit))
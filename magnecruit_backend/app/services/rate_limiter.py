@@ -0,0 +1,205 @@
+# magnecruit_backend\app\services\rate_limiter.py
+
+import time
+import threading
+from flask import request, session, jsonify
+from .metrics import metrics_registry
+
+# Full buckets are dropped from the memory store once it holds this many, a dropped bucket is recreated full on next use
+MEMORY_STORE_SWEEP_SIZE = 10000
+
+class RateLimitExceededError(Exception):
+    '''
+    Raised when a request is over the budget of the user's or the global token bucket of its limit
+    '''
+    def __init__(self, message: str, scope: str, retry_after: float):
+        super().__init__(message)
+        self.scope = scope
+        self.retry_after = retry_after
+
+# Token bucket arithmetic shared by the stores: refill since the last update, then take the cost if there are enough tokens
+def _take_tokens(tokens: float, updated_at: float, capacity: float, refill_per_second: float, cost: float, now: float) -> tuple[float, bool, float]:
+    '''
+    Returns the tokens left, whether the cost was taken, and the seconds until it could be taken when it was not
+    '''
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / refill_per_second if refill_per_second > 0 else float('inf')
+
+# Token buckets held in the memory of this process, each worker process enforcing its own budget
+class MemoryRateLimitStore:
+    def __init__(self):
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float) -> tuple[bool, float]:
+        '''
+        Returns whether the cost was taken from the bucket and the seconds to wait otherwise
+        '''
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+            tokens, allowed, retry_after = _take_tokens(tokens, updated_at, capacity, refill_per_second, cost, now)
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            if len(self._buckets) > MEMORY_STORE_SWEEP_SIZE:
+                self._sweep(now)
+        return allowed, retry_after
+
+    def refund(self, key: str, capacity: float, cost: float):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at, full_at = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + cost), updated_at, full_at)
+
+    # Drop the buckets that have refilled completely, they are the same as a new bucket
+    def _sweep(self, now: float):
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+# Refill and take atomically in Redis, on the Redis clock so every worker sees the same buckets
+_REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_per_second)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / refill_per_second
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_per_second * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+_REDIS_REFUND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens')) or 0
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2]))))
+end
+return 1
+"""
+
+# Token buckets shared by every worker process through Redis
+class RedisRateLimitStore:
+    def __init__(self, url: str, key_prefix: str = 'magnecruit:rate_limit:'):
+        import redis
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url)
+        self._take_script = self._client.register_script(_REDIS_TAKE_SCRIPT)
+        self._refund_script = self._client.register_script(_REDIS_REFUND_SCRIPT)
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float) -> tuple[bool, float]:
+        allowed, retry_after = self._take_script(keys=[self.key_prefix + key], args=[capacity, refill_per_second, cost])
+        return bool(int(allowed)), float(retry_after)
+
+    def refund(self, key: str, capacity: float, cost: float):
+        self._refund_script(keys=[self.key_prefix + key], args=[capacity, cost])
+
+# Token-bucket rate limiter with a per-user and a global bucket for each named limit
+class RateLimiter:
+    '''
+    Each limit has a user bucket, keyed by session['user_id'] or the client address for anonymous requests, and a global bucket.
+    A request takes its cost from both, and is rejected with RateLimitExceededError when either is short of tokens.
+    A limit whose refill rate is 0 is not enforced for that scope. When the shared store fails, requests are let through
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.limits: dict = {}
+        self.store = MemoryRateLimitStore()
+
+    # Update the limiter settings from the application config
+    def configure(self, enabled: bool, backend: str, storage_url: str | None, limits: dict):
+        '''
+        Applies the limits, given as {limit: {scope: (burst, refill_per_minute)}}, and selects the bucket store
+        '''
+        self.enabled = enabled
+        self.limits = limits
+        if backend == 'redis':
+            if not storage_url:
+                raise ValueError("RATE_LIMIT_STORAGE_URL is required for the redis rate limit backend")
+            self.store = RedisRateLimitStore(storage_url)
+        else:
+            self.store = MemoryRateLimitStore()
+
+    # Take the cost of a request from the user's and the global bucket of the limit
+    def check(self, limit: str, user_key: str, cost: float = 1):
+        '''
+        Raises RateLimitExceededError when the request is over budget, the message telling the client when to retry
+        '''
+        if not self.enabled or limit not in self.limits:
+            return
+        taken = []
+        for scope, key in (('user', f"{limit}:{user_key}"), ('global', f"{limit}:global")):
+            burst, refill_per_minute = self.limits[limit].get(scope, (0, 0))
+            if refill_per_minute <= 0 or burst <= 0:
+                continue
+            # A request costlier than the burst could never pass, it is charged the whole bucket instead
+            bucket_cost = min(cost, burst)
+            try:
+                allowed, retry_after = self.store.take(key, burst, refill_per_minute / 60, bucket_cost)
+            except Exception as e:
+                print(f"(RateLimiter) Rate limit store error, letting the request through: {e}")
+                metrics_registry.inc('rate_limit_store_errors_total')
+                continue
+            if not allowed:
+                for taken_key, taken_burst, taken_cost in taken:
+                    self._refund(taken_key, taken_burst, taken_cost)
+                metrics_registry.inc('rate_limited_requests_total', limit=limit, scope=scope)
+                if scope == 'user':
+                    message = f"You are sending requests too quickly. Please try again in {max(1, round(retry_after))} seconds."
+                else:
+                    message = "The service is receiving too many requests right now. Please try again in a moment."
+                raise RateLimitExceededError(message, scope=scope, retry_after=retry_after)
+            taken.append((key, burst, bucket_cost))
+
+    def _refund(self, key: str, capacity: float, cost: float):
+        try:
+            self.store.refund(key, capacity, cost)
+        except Exception as e:
+            print(f"(RateLimiter) Rate limit store error on refund: {e}")
+
+rate_limiter = RateLimiter()
+
+# Key of the current request's user bucket, the client address for anonymous requests such as login
+def current_user_key() -> str:
+    user_id = session.get('user_id')
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+# Build the 429 response of a rejected HTTP request
+def rate_limited_response(rate_limit_error: RateLimitExceededError):
+    '''
+    Returns the JSON error with a Retry-After header
+    '''
+    response = jsonify({"error": str(rate_limit_error), "scope": rate_limit_error.scope, "retry_after": round(rate_limit_error.retry_after, 1)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, round(rate_limit_error.retry_after)))
+    return response
+
+# Apply the api limit to every blueprint request, registered with app.before_request
+def limit_api_request():
+    '''
+    Returns the 429 response when the request is over the api budget, None to let it through.
+    The metrics endpoint is left out so scrapes are never throttled, and CORS preflights so a cross-origin fetch costs one token
+    '''
+    if not request.blueprint or request.blueprint == 'metrics_bp' or request.method == 'OPTIONS':
+        return None
+    try:
+        rate_limiter.check('api', current_user_key())
+    except RateLimitExceededError as rate_limit_error:
+        return rate_limited_response(rate_limit_error)
+    return None
+
+metrics_registry.describe('rate_limited_requests_total', 'counter', 'Requests and events rejected by the rate limiter, by limit and scope.')
+metrics_registry.describe('rate_limit_store_errors_total', 'counter', 'Rate limit checks let through because the bucket store failed.')
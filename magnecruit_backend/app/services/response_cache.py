@@ -0,0 +1,188 @@
+# magnecruit_backend\app\services\response_cache.py
+
+import re
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from .metrics import metrics_registry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Normalize a user prompt so trivially different phrasings of the same question share a cache key
+def normalize_prompt(prompt: str) -> str:
+    '''
+    Returns the prompt lowercased, with punctuation dropped and whitespace collapsed
+    '''
+    prompt = re.sub(r"[^\w\s]", " ", prompt.lower())
+    return " ".join(prompt.split())
+
+# Hash the parts of the request that change the answer besides the prompt, such as the model and system instruction
+def context_hash(*parts: str | None) -> str:
+    '''
+    Returns a sha256 hex digest of the given parts
+    '''
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode('utf-8'))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+# Bounded cache of general chat replies to standalone questions, with an optional embedding similarity tier
+class ResponseCache:
+    '''
+    Caches LLM replies by (context hash, normalized prompt) with size and TTL based eviction.
+    When embeddings are enabled, a miss on the exact key falls back to the most similar cached prompt of the same context,
+    searched by brute force over the unit-normalized vectors held in memory
+    '''
+    def __init__(self, enabled: bool = False, max_entries: int = 2000, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.92, embeddings_enabled: bool = False):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embeddings_enabled = embeddings_enabled
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Update the cache settings from the application config
+    def configure(self, enabled: bool, max_entries: int, ttl_seconds: float, similarity_threshold: float, embeddings_enabled: bool):
+        '''
+        Applies the new settings and clears the cache
+        '''
+        with self._lock:
+            self.enabled = enabled
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self.similarity_threshold = similarity_threshold
+            self.embeddings_enabled = embeddings_enabled
+            self._entries.clear()
+
+    # Get the cached reply for the exact normalized prompt
+    def get(self, context_key: str, normalized_prompt: str) -> str | None:
+        '''
+        Returns the cached reply, or None on a miss. Misses are counted by the caller once every tier was tried
+        '''
+        with self._lock:
+            entry = self._fresh_entry((context_key, normalized_prompt))
+            if entry is None:
+                return None
+            self._entries.move_to_end((context_key, normalized_prompt))
+            self.exact_hits += 1
+            return entry['response']
+
+    # Get the cached reply of the most similar prompt of the same context
+    def get_similar(self, context_key: str, embedding: list[float]) -> str | None:
+        '''
+        Returns the reply of the closest cached prompt if its cosine similarity reaches the threshold, otherwise None
+        '''
+        query_vector = _unit_vector(embedding)
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for key, entry in list(self._entries.items()):
+                if key[0] != context_key or entry['vector'] is None:
+                    continue
+                if self._fresh_entry(key) is None:
+                    continue
+                score = _dot(query_vector, entry['vector'])
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._entries[best_key]['response']
+
+    # Count a lookup that missed every tier
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    # Store the reply for the normalized prompt, along with its embedding for the similarity tier
+    def set(self, context_key: str, normalized_prompt: str, response: str, embedding: list[float] | None = None):
+        '''
+        Caches the reply, evicting the least recently used entries over max_entries
+        '''
+        with self._lock:
+            self._entries[(context_key, normalized_prompt)] = {
+                'response': response,
+                'vector': _unit_vector(embedding) if embedding else None,
+                'cached_at': time.monotonic()
+            }
+            self._entries.move_to_end((context_key, normalized_prompt))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Drop every cached reply, for example after changing the prompts
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Get the cache counters along with the hit rate
+    def stats(self) -> dict:
+        '''
+        Returns the hit, miss and eviction counters, the hit rate and the current size of the cache
+        '''
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+    def _fresh_entry(self, key: tuple) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry['cached_at'] > self.ttl_seconds:
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        return entry
+
+def _unit_vector(embedding: list[float]):
+    if numpy is not None:
+        vector = numpy.asarray(embedding, dtype=numpy.float32)
+        norm = numpy.linalg.norm(vector)
+        return vector / norm if norm else vector
+    norm = math.sqrt(sum(value * value for value in embedding))
+    return [value / norm for value in embedding] if norm else list(embedding)
+
+def _dot(first, second) -> float:
+    if numpy is not None:
+        return float(numpy.dot(first, second))
+    return sum(a * b for a, b in zip(first, second))
+
+general_response_cache = ResponseCache()
+
+# Report the cache counters on /metrics
+def _response_cache_metrics() -> list:
+    stats = general_response_cache.stats()
+    return [
+        ('response_cache_hits_total', {'tier': 'exact'}, stats['exact_hits']),
+        ('response_cache_hits_total', {'tier': 'similar'}, stats['similar_hits']),
+        ('response_cache_misses_total', {}, stats['misses']),
+        ('response_cache_evictions_total', {}, stats['evictions']),
+        ('response_cache_hit_rate', {}, stats['hit_rate']),
+        ('response_cache_size', {}, stats['size'])
+    ]
+
+metrics_registry.describe('response_cache_hits_total', 'counter', 'General chat response cache hits, by tier.')
+metrics_registry.describe('response_cache_misses_total', 'counter', 'General chat response cache misses.')
+metrics_registry.describe('response_cache_evictions_total', 'counter', 'Replies evicted from the response cache by size or TTL.')
+metrics_registry.describe('response_cache_hit_rate', 'gauge', 'Share of response cache lookups served from the cache.')
+metrics_registry.describe('response_cache_size', 'gauge', 'Replies currently held in the response cache.')
+metrics_registry.register_collector(_response_cache_metrics)
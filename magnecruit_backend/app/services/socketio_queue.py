@@ -0,0 +1,55 @@
+# magnecruit_backend\app\services\socketio_queue.py
+
+import threading
+import eventlet.queue
+import socketio as python_socketio
+
+# Channels of the in-process message queue, shared by every Socket.IO server of the process that uses the same url and channel
+_local_channels: dict = {}
+_local_channels_lock = threading.Lock()
+
+# In-process stand-in for a message queue server, for tests and single-process runs that exercise the multi-worker code path
+class LocalQueueManager(python_socketio.PubSubManager):
+    '''
+    Client manager that relays emits and room changes between the Socket.IO servers of this process subscribed to the same
+    local:// url and channel, the way RedisManager relays them between worker processes through Redis
+    '''
+    name = 'local'
+
+    def __init__(self, url: str = 'local://', channel: str = 'flask-socketio', write_only: bool = False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.url = url
+        self._messages = eventlet.queue.LightQueue()
+
+    def initialize(self):
+        super().initialize()
+        if not self.write_only:
+            # initialize can run more than once per server, a second subscription would relay every message twice
+            with _local_channels_lock:
+                subscribers = _local_channels.setdefault((self.url, self.channel), [])
+                if self._messages not in subscribers:
+                    subscribers.append(self._messages)
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        with _local_channels_lock:
+            subscribers = list(_local_channels.get((self.url, self.channel), []))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._messages.get()
+
+# Build the Socket.IO server options that connect it to the message queue shared by every worker
+def message_queue_options(url: str | None, channel: str) -> dict:
+    '''
+    Returns the options for socketio.init_app: a LocalQueueManager for local:// urls, otherwise the url for Flask-SocketIO
+    to pick its own manager (Redis for redis://, Kafka for kafka://, ZeroMQ for zmq+tcp://, Kombu for amqp:// and the rest).
+    Returns no options without a url, in which case emits only reach the clients of this process
+    '''
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalQueueManager(url, channel=channel)}
+    return {'message_queue': url, 'channel': channel}
@@ -0,0 +1,372 @@
+# magnecruit_backend\app\services\task_queue.py
+
+import json
+import uuid
+import threading
+import traceback
+from datetime import datetime, timedelta
+from collections import OrderedDict
+import eventlet
+import eventlet.queue
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session
+from .. import db, socketio
+from ..models import Tasks
+from .metrics import metrics_registry
+
+class TaskQueueFullError(Exception):
+    '''
+    Raised when a task is rejected because the queue or the user's pending task limit is full
+    '''
+    def __init__(self, message: str, scope: str):
+        super().__init__(message)
+        self.scope = scope
+
+class TaskFailedError(Exception):
+    '''
+    Raised by a task handler to fail the task with a message for the client
+    '''
+
+# Task statuses that are still waiting for a worker to finish them
+UNFINISHED_TASK_STATUSES = ('queued', 'running')
+
+STALE_TASK_ERROR = "The task was interrupted because the server restarted. Please try again."
+
+# Serialize a task record in the format required by the frontend
+def serialize_task(task: dict) -> dict:
+    '''
+    Returns the task without its parameters, with the timestamps as ISO strings
+    '''
+    return {
+        'id': task['id'],
+        'kind': task['kind'],
+        'status': task['status'],
+        'progress': task['progress'],
+        'progress_message': task['progress_message'],
+        'result': task['result'],
+        'error': task['error'],
+        'created_at': task['created_at'].isoformat() if task['created_at'] else None,
+        'started_at': task['started_at'].isoformat() if task['started_at'] else None,
+        'finished_at': task['finished_at'].isoformat() if task['finished_at'] else None
+    }
+
+# Task records held in process memory, bounded to the newest max_tasks
+class MemoryTaskStore:
+    def __init__(self, max_tasks: int = 1000):
+        self.max_tasks = max_tasks
+        self._tasks: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, task: dict):
+        with self._lock:
+            self._tasks[task['id']] = dict(task)
+            while len(self._tasks) > self.max_tasks:
+                self._tasks.popitem(last=False)
+
+    def update(self, task_id: str, **fields) -> dict | None:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            task.update(fields)
+            return dict(task)
+
+    def get(self, task_id: str) -> dict | None:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def heartbeat(self, worker_id: str, heartbeat_at: datetime):
+        with self._lock:
+            for task in self._tasks.values():
+                if task['worker_id'] == worker_id and task['status'] in UNFINISHED_TASK_STATUSES:
+                    task['heartbeat_at'] = heartbeat_at
+
+    def fail_stale(self, stale_before: datetime, **fields) -> list[dict]:
+        with self._lock:
+            stale_tasks = [
+                task for task in self._tasks.values()
+                if task['status'] in UNFINISHED_TASK_STATUSES and (task['heartbeat_at'] or task['created_at']) < stale_before
+            ]
+            for task in stale_tasks:
+                task.update(fields)
+            return [dict(task) for task in stale_tasks]
+
+# Task records persisted in the tasks table, so results outlive the request and can be polled from any worker
+class DatabaseTaskStore:
+    '''
+    Uses its own short sessions so recording a status change never commits the task handler's unit of work
+    '''
+    def create(self, task: dict):
+        with Session(db.engine) as task_session:
+            task_session.add(Tasks(**{**task, 'params': json.dumps(task['params']), 'result': json.dumps(task['result'])}))
+            task_session.commit()
+
+    def update(self, task_id: str, **fields) -> dict | None:
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        with Session(db.engine) as task_session:
+            task_row = task_session.get(Tasks, task_id)
+            if task_row is None:
+                return None
+            for field, value in fields.items():
+                setattr(task_row, field, value)
+            task_session.commit()
+            return self._to_dict(task_row)
+
+    def get(self, task_id: str) -> dict | None:
+        with Session(db.engine) as task_session:
+            task_row = task_session.get(Tasks, task_id)
+            return self._to_dict(task_row) if task_row else None
+
+    def heartbeat(self, worker_id: str, heartbeat_at: datetime):
+        with Session(db.engine) as task_session:
+            task_session.query(Tasks).filter(
+                Tasks.worker_id == worker_id,
+                Tasks.status.in_(UNFINISHED_TASK_STATUSES)
+            ).update({Tasks.heartbeat_at: heartbeat_at}, synchronize_session=False)
+            task_session.commit()
+
+    def fail_stale(self, stale_before: datetime, **fields) -> list[dict]:
+        with Session(db.engine) as task_session:
+            stale_rows = task_session.query(Tasks).filter(
+                Tasks.status.in_(UNFINISHED_TASK_STATUSES),
+                func.coalesce(Tasks.heartbeat_at, Tasks.created_at) < stale_before
+            ).all()
+            for task_row in stale_rows:
+                for field, value in fields.items():
+                    setattr(task_row, field, value)
+            task_session.commit()
+            return [self._to_dict(task_row) for task_row in stale_rows]
+
+    def _to_dict(self, task_row: Tasks) -> dict:
+        return {
+            'id': task_row.id,
+            'user_id': task_row.user_id,
+            'kind': task_row.kind,
+            'status': task_row.status,
+            'progress': task_row.progress,
+            'progress_message': task_row.progress_message,
+            'params': json.loads(task_row.params) if task_row.params else None,
+            'result': json.loads(task_row.result) if task_row.result else None,
+            'error': task_row.error,
+            'created_at': task_row.created_at,
+            'started_at': task_row.started_at,
+            'finished_at': task_row.finished_at,
+            'worker_id': task_row.worker_id,
+            'heartbeat_at': task_row.heartbeat_at
+        }
+
+# In-process queue of long-running generation work, run by a bounded pool of green threads
+class TaskQueue:
+    '''
+    Handlers are registered per task kind with the handler decorator and called as handler(params, user_id, report_progress)
+    inside an application context. Their return value is persisted as the task result, a TaskFailedError fails the task
+    with its message. Every status change and progress report is pushed to the user's room as a task_updated event.
+    The queue lives in the worker process, so the worker refreshes the heartbeat of its unfinished tasks, and a task
+    whose heartbeat is older than stale_after_seconds is failed, as its worker has stopped
+    '''
+    def __init__(self):
+        self.concurrency = 4
+        self.max_pending = 100
+        self.max_pending_per_user = 5
+        self.heartbeat_seconds = 30
+        self.worker_id = str(uuid.uuid4())
+        self.store = MemoryTaskStore()
+        self._handlers: dict = {}
+        self._pending = eventlet.queue.LightQueue()
+        self._pending_by_user: dict = {}
+        self._pending_lock = threading.Lock()
+        self._app = None
+        self._pool = None
+        self._dispatcher = None
+        self._heartbeat = None
+
+    @property
+    def stale_after_seconds(self) -> float:
+        return self.heartbeat_seconds * 3
+
+    # Update the queue settings from the application config
+    def configure(self, app, concurrency: int, max_pending: int, max_pending_per_user: int, backend: str = 'database', heartbeat_seconds: float = 30):
+        '''
+        Binds the queue to the application, selects the task store and fails the tasks left unfinished by stopped workers
+        '''
+        self._app = app
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.heartbeat_seconds = heartbeat_seconds
+        self.store = DatabaseTaskStore() if backend == 'database' else MemoryTaskStore()
+        if backend == 'database':
+            try:
+                with app.app_context():
+                    # The tables are not created yet on the first start, before the migrations have run
+                    if inspect(db.engine).has_table(Tasks.__tablename__):
+                        self.fail_stale_tasks()
+            except Exception as e:
+                # A database behind the migrations must not stop the app, or flask db upgrade, from starting
+                print(f"(TaskQueue) Error failing the tasks of stopped workers: {e}")
+
+    # Fail the unfinished tasks whose worker has stopped refreshing their heartbeat
+    def fail_stale_tasks(self) -> int:
+        '''
+        Returns the number of failed tasks, and pushes the failure to the room of each task's user
+        '''
+        stale_tasks = self.store.fail_stale(
+            datetime.now() - timedelta(seconds=self.stale_after_seconds),
+            status='failed',
+            error=STALE_TASK_ERROR,
+            finished_at=datetime.now()
+        )
+        for task in stale_tasks:
+            metrics_registry.inc('tasks_total', kind=task['kind'], status='failed')
+            socketio.emit('task_updated', serialize_task(task), to=f"user_{task['user_id']}")
+        return len(stale_tasks)
+
+    # Register the handler of a task kind
+    def handler(self, kind: str):
+        '''
+        Decorator that registers the function as the handler of the task kind
+        '''
+        def register(handler_fn):
+            self._handlers[kind] = handler_fn
+            return handler_fn
+        return register
+
+    # Queue a task for the user and return its record immediately
+    def submit(self, user_id: int, kind: str, params: dict) -> dict:
+        '''
+        Returns the serialized task, raises TaskQueueFullError when the queue or the user's pending limit is full
+        '''
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown task kind: {kind}")
+        with self._pending_lock:
+            if sum(self._pending_by_user.values()) >= self.max_pending:
+                metrics_registry.inc('tasks_rejected_total', scope='global')
+                raise TaskQueueFullError("Too many tasks are queued right now. Please try again in a moment.", scope='global')
+            if self._pending_by_user.get(user_id, 0) >= self.max_pending_per_user:
+                metrics_registry.inc('tasks_rejected_total', scope='user')
+                raise TaskQueueFullError("Please wait for your previous tasks to finish before starting another one.", scope='user')
+            self._pending_by_user[user_id] = self._pending_by_user.get(user_id, 0) + 1
+
+        task = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'kind': kind,
+            'status': 'queued',
+            'progress': 0,
+            'progress_message': None,
+            'params': params,
+            'result': None,
+            'error': None,
+            'created_at': datetime.now(),
+            'started_at': None,
+            'finished_at': None,
+            'worker_id': self.worker_id,
+            'heartbeat_at': datetime.now()
+        }
+        try:
+            self.store.create(task)
+        except Exception:
+            self._release_user_slot(user_id)
+            raise
+        metrics_registry.inc('tasks_total', kind=kind, status='queued')
+        self._ensure_dispatcher()
+        self._pending.put(task['id'])
+        return serialize_task(task)
+
+    # Get the task of the user, for status polling
+    def get(self, task_id: str, user_id: int | None = None) -> dict | None:
+        '''
+        Returns the serialized task, or None if it does not exist or belongs to another user
+        '''
+        task = self.store.get(task_id)
+        if task is None or (user_id is not None and task['user_id'] != user_id):
+            return None
+        # The worker of the task has stopped, so the client polling it would otherwise wait forever
+        if task['status'] in UNFINISHED_TASK_STATUSES and (task['heartbeat_at'] or task['created_at']) < datetime.now() - timedelta(seconds=self.stale_after_seconds):
+            task = self.store.update(task_id, status='failed', error=STALE_TASK_ERROR, finished_at=datetime.now()) or task
+            metrics_registry.inc('tasks_total', kind=task['kind'], status='failed')
+        return serialize_task(task)
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None:
+            self._pool = eventlet.GreenPool(max(1, self.concurrency))
+            self._dispatcher = eventlet.spawn(self._dispatch)
+            self._heartbeat = eventlet.spawn(self._refresh_heartbeats)
+
+    def _refresh_heartbeats(self):
+        while True:
+            eventlet.sleep(self.heartbeat_seconds)
+            with self._pending_lock:
+                has_pending_tasks = bool(self._pending_by_user)
+            if not has_pending_tasks:
+                continue
+            try:
+                with self._app.app_context():
+                    self.store.heartbeat(self.worker_id, datetime.now())
+            except Exception as e:
+                print(f"(TaskQueue) Error refreshing the task heartbeats: {e}")
+
+    def _dispatch(self):
+        while True:
+            task_id = self._pending.get()
+            # Blocks while every worker is busy, which bounds the number of tasks running at once
+            self._pool.spawn_n(self._run_task, task_id)
+
+    def _run_task(self, task_id: str):
+        with self._app.app_context():
+            task = self.store.get(task_id)
+            if task is None:
+                return
+            user_room = f"user_{task['user_id']}"
+
+            def report_progress(progress: int, message: str | None = None):
+                progress_task = {**task, 'status': 'running', 'progress': progress, 'progress_message': message}
+                socketio.emit('task_updated', serialize_task(progress_task), to=user_room)
+
+            try:
+                task = self.store.update(task_id, status='running', started_at=datetime.now(), heartbeat_at=datetime.now()) or task
+                socketio.emit('task_updated', serialize_task(task), to=user_room)
+                result = self._handlers[task['kind']](task['params'], task['user_id'], report_progress)
+                final_fields = {'status': 'succeeded', 'progress': 100, 'result': result}
+            except TaskFailedError as e:
+                final_fields = {'status': 'failed', 'error': str(e)}
+            except Exception as e:
+                print(f"(TaskQueue) Error running task {task_id} ({task['kind']}): {e}")
+                traceback.print_exc()
+                db.session.rollback()
+                final_fields = {'status': 'failed', 'error': "An internal error occurred while running the task."}
+            finally:
+                self._release_user_slot(task['user_id'])
+
+            final_fields['finished_at'] = datetime.now()
+            try:
+                task = self.store.update(task_id, **final_fields) or {**task, **final_fields}
+            except Exception as e:
+                # The client still gets the outcome from the event below, only polling misses it
+                print(f"(TaskQueue) Error saving the outcome of task {task_id}: {e}")
+                db.session.rollback()
+                task = {**task, **final_fields}
+            metrics_registry.inc('tasks_total', kind=task['kind'], status=task['status'])
+            socketio.emit('task_updated', serialize_task(task), to=user_room)
+
+    def _release_user_slot(self, user_id: int):
+        with self._pending_lock:
+            remaining_tasks = self._pending_by_user.get(user_id, 1) - 1
+            if remaining_tasks > 0:
+                self._pending_by_user[user_id] = remaining_tasks
+            else:
+                self._pending_by_user.pop(user_id, None)
+
+task_queue = TaskQueue()
+
+# Report the queued and running tasks on /metrics
+def _task_queue_metrics() -> list:
+    with task_queue._pending_lock:
+        return [('tasks_pending', {}, sum(task_queue._pending_by_user.values()))]
+
+metrics_registry.describe('tasks_total', 'counter', 'Background tasks, by kind and status reached.')
+metrics_registry.describe('tasks_rejected_total', 'counter', 'Background tasks rejected because the queue was full, by scope.')
+metrics_registry.describe('tasks_pending', 'gauge', 'Background tasks queued or running.')
+metrics_registry.register_collector(_task_queue_metrics)
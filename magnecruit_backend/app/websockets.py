@@ -2,11 +2,28 @@
 
 import traceback
 from . import socketio, db
-from flask import request, session
+from flask import request, session, current_app
 from .services import chat_service
-from .models import Messages, Conversations
+from .services.pagination import resolve_page_size
+from .services.metrics import track_turn, time_stage
+from .services.task_queue import task_queue, TaskQueueFullError, TaskFailedError
+from .services.rate_limiter import rate_limiter, RateLimitExceededError, current_user_key
+from .agent import llm_interface
+from .models import Conversations
 from flask_socketio import emit, join_room, leave_room
 
+# Updates the rolling summary of the conversation after the reply has been delivered to the user
+def _refresh_conversation_summary(app, conversation_id):
+    '''
+    Runs the conversation summary refresh in its own application context
+    '''
+    with app.app_context():
+        chat_service.refresh_conversation_summary(conversation_id)
+
+# Tell the client its event was rejected by the rate limiter, and when it can send again
+def emit_rate_limited_error(rate_limit_error):
+    emit('error', {'msg': str(rate_limit_error), 'code': 'rate_limited', 'scope': rate_limit_error.scope, 'retryAfter': round(rate_limit_error.retry_after, 1)}, room=request.sid)
+
 # Handles the connection of the user to the websocket
 @socketio.on('connect')
 def handle_connect(auth):
@@ -45,7 +62,7 @@ def handle_disconnect():
 @socketio.on('request_conversation_messages')
 def handle_request_conversation_messages(data):
     '''
-    Returns the conversation messages for the given conversation id
+    Returns the newest page of the conversation messages for the given conversation id, or the page before the given cursor
     '''
     user_id = session.get('user_id')
     conversation_id = data.get('conversationId')
@@ -54,6 +71,12 @@ def handle_request_conversation_messages(data):
     if not conversation_id or not user_id:
         emit('error', {'msg': 'Invalid request for conversation messages.'}, room=request.sid)
         return
+
+    try:
+        rate_limiter.check('api', current_user_key())
+    except RateLimitExceededError as rate_limit_error:
+        emit_rate_limited_error(rate_limit_error)
+        return
     
     try:
         conversation = db.session.query(Conversations).filter_by(id=conversation_id, user_id=user_id).first()
@@ -62,28 +85,136 @@ def handle_request_conversation_messages(data):
             emit('error', {'msg': 'Conversation not found or access denied.'}, room=request.sid)
             return
 
-        messages = db.session.query(Messages).filter_by(conversation_id=conversation_id).order_by(Messages.timestamp).all()        
-        messages_data = []
-        
-        for msg in messages:
-            messages_data.append({
-                'id': msg.id,
-                'sender': msg.sender,
-                'content': msg.content,
-                'timestamp': msg.timestamp.isoformat(),
-                'conversation_id': msg.conversation_id 
-            })
+        page_size = resolve_page_size(
+            data.get('limit'),
+            current_app.config.get('MESSAGES_PAGE_SIZE', 50),
+            current_app.config.get('MAX_PAGE_SIZE', 200)
+        )
+        before_cursor = data.get('beforeCursor')
+        messages_data, next_cursor = chat_service.get_conversation_messages(conversation_id, page_size, before_cursor=before_cursor)
 
-        emit('conversation_messages', {'conversationId': conversation_id, 'messages': messages_data}, room=user_room)
+        emit('conversation_messages', {
+            'conversationId': conversation_id,
+            'messages': messages_data,
+            'nextCursor': next_cursor,
+            'isOlderPage': bool(before_cursor)
+        }, room=user_room)
+    except ValueError as ve:
+        emit('error', {'msg': str(ve)}, room=request.sid)
     except Exception as e:
         traceback.print_exc()
         emit('error', {'msg': 'Failed to fetch conversation messages.'}, room=request.sid)
 
+# Run a chat turn and push its events to the user's room, shared by the websocket handler and the queued chat_message task
+def _run_chat_turn(user_id: int, conversation_id: int | None, message_content: str, active_view: str,
+                   client_job_version: int | None, error_room: str | None) -> dict:
+    '''
+    Returns the result of chat_service.process_incoming_message, raises LLMBackpressureError when no LLM slot is available.
+    Errors are emitted to error_room when it is given
+    '''
+    user_room = f'user_{user_id}'
+    stream_ai_responses = current_app.config.get('STREAM_AI_RESPONSES', False)
+    streamed_conversation_ids = set()
+
+    # Forwards each chunk of the AI reply to the user's room as soon as it is generated
+    def emit_ai_response_chunk(stream_conversation_id, text_chunk):
+        streamed_conversation_ids.add(stream_conversation_id)
+        socketio.emit('ai_response_chunk', {'conversation_id': stream_conversation_id, 'sender': 'ai', 'content': text_chunk}, to=user_room)
+        socketio.sleep(0)
+
+    # Forwards each chunk of a section rewritten for modify_job_sections, the saved job still follows in job_updated
+    def emit_job_section_chunk(stream_conversation_id, section, text_chunk):
+        socketio.emit('job_section_chunk', {
+            'conversation_id': stream_conversation_id,
+            'section_number': section['section_number'],
+            'heading': section['heading'],
+            'content': text_chunk
+        }, to=user_room)
+        socketio.sleep(0)
+
+    with track_turn(active_view, current_app.config.get('SLOW_TURN_LOG_SECONDS')) as turn:
+        try:
+            # Queued turns only take a global slot, the task queue already bounds the user's concurrent work
+            with llm_interface.llm_admission(user_id if error_room else None):
+                result = chat_service.process_incoming_message(
+                    user_id=user_id,
+                    current_conversation_id=conversation_id,
+                    message_content=message_content,
+                    active_view=active_view,
+                    on_ai_text_chunk=emit_ai_response_chunk if stream_ai_responses else None,
+                    client_job_version=client_job_version,
+                    on_job_section_chunk=emit_job_section_chunk if stream_ai_responses else None
+                )
+        except llm_interface.LLMBackpressureError:
+            turn['outcome'] = 'rejected'
+            raise
+
+        with time_stage('emit'):
+            if result["success"]:
+                if result.get("new_conversation_data"):
+                    new_convo_payload = result["new_conversation_data"]
+                    socketio.emit('conversation_created', new_convo_payload, to=user_room)
+
+                if result.get("new_ai_message_data"):
+                    ai_msg_payload = result["new_ai_message_data"]
+                    if stream_ai_responses:
+                        socketio.emit('ai_response_done', {'conversation_id': ai_msg_payload['conversation_id'], 'message': ai_msg_payload}, to=user_room)
+                    else:
+                        socketio.emit('ai_response', ai_msg_payload, to=user_room)
+
+                if result.get("updated_job_sections_data"):
+                    job_sections_payload = result["updated_job_sections_data"]
+                    updated_keys = result.get("updated_field_keys")
+                    if updated_keys is not None:
+                        job_sections_payload['updated_field_keys'] = updated_keys
+
+                    socketio.emit('job_updated', job_sections_payload, to=user_room)
+
+                if result.get("new_ai_message_data"):
+                    socketio.start_background_task(
+                        _refresh_conversation_summary, current_app._get_current_object(), result["new_ai_message_data"]['conversation_id']
+                    )
+
+            else:
+                turn['outcome'] = 'error'
+                # Let the client drop any partially streamed reply that will never be saved
+                for stream_conversation_id in streamed_conversation_ids:
+                    socketio.emit('ai_response_done', {'conversation_id': stream_conversation_id, 'message': None}, to=user_room)
+                if error_room:
+                    error_msg = result.get("error_message", "An unknown error occurred.")
+                    socketio.emit('error', {'msg': error_msg}, to=error_room)
+    return result
+
+# Runs a chat turn queued with the queued flag of send_user_message
+@task_queue.handler('chat_message')
+def _run_queued_chat_message(params: dict, user_id: int, report_progress) -> dict:
+    '''
+    Returns the conversation id and the saved AI message of the turn as the task result
+    '''
+    report_progress(10, "Generating the reply")
+    try:
+        result = _run_chat_turn(
+            user_id, params.get('conversationId'), params['content'], params.get('activeView', 'actions'),
+            params.get('jobVersion'), error_room=None
+        )
+    except llm_interface.LLMBackpressureError as backpressure_error:
+        raise TaskFailedError(str(backpressure_error))
+    if not result["success"]:
+        raise TaskFailedError(result.get("error_message", "An unknown error occurred."))
+    ai_message = result.get("new_ai_message_data")
+    new_conversation = result.get("new_conversation_data")
+    return {
+        'conversation_id': ai_message['conversation_id'] if ai_message else (new_conversation or {}).get('conversationId'),
+        'ai_message': ai_message,
+        'updated_field_keys': result.get("updated_field_keys")
+    }
+
 # Handles the sending of the user's message to the websocket
 @socketio.on('send_user_message')
 def handle_user_message(data):
     '''
-    Returns the response from the LLM for the user's message
+    Returns the response from the LLM for the user's message. With the queued flag the turn runs on the task queue
+    and the handler only acknowledges it with a task_queued event
     '''
     user_id = session.get('user_id')
     if not user_id:
@@ -96,33 +227,28 @@ def handle_user_message(data):
     if not message_content or not isinstance(message_content, str) or not message_content.strip():
         emit('error', {'msg': 'Invalid message content.'}, room=request.sid)
         return
-    
-    user_room = f'user_{user_id}'
-
-    result = chat_service.process_incoming_message(
-        user_id=user_id,
-        current_conversation_id=conversation_id,
-        message_content=message_content,
-        active_view=active_view 
-    )
 
-    if result["success"]:
-        if result.get("new_conversation_data"):
-            new_convo_payload = result["new_conversation_data"]
-            emit('conversation_created', new_convo_payload, room=user_room)
-
-        if result.get("new_ai_message_data"):
-            ai_msg_payload = result["new_ai_message_data"]
-            emit('ai_response', ai_msg_payload, room=user_room)
-
-        if result.get("updated_job_sections_data"):
-            job_sections_payload = result["updated_job_sections_data"]
-            updated_keys = result.get("updated_field_keys")
-            if updated_keys is not None:
-                job_sections_payload['updated_field_keys'] = updated_keys
+    try:
+        rate_limiter.check('llm', current_user_key())
+    except RateLimitExceededError as rate_limit_error:
+        emit_rate_limited_error(rate_limit_error)
+        return
 
-            emit('job_updated', job_sections_payload, room=user_room)
+    if data.get('queued'):
+        try:
+            task = task_queue.submit(user_id, 'chat_message', {
+                'content': message_content,
+                'conversationId': conversation_id,
+                'activeView': active_view,
+                'jobVersion': data.get('jobVersion')
+            })
+        except TaskQueueFullError as queue_full_error:
+            emit('error', {'msg': str(queue_full_error), 'code': 'busy', 'scope': queue_full_error.scope}, room=request.sid)
+            return
+        emit('task_queued', task, room=request.sid)
+        return
 
-    else:
-        error_msg = result.get("error_message", "An unknown error occurred.")
-        emit('error', {'msg': error_msg}, room=request.sid)
\ No newline at end of file
+    try:
+        _run_chat_turn(user_id, conversation_id, message_content, active_view, data.get('jobVersion'), error_room=request.sid)
+    except llm_interface.LLMBackpressureError as backpressure_error:
+        emit('error', {'msg': str(backpressure_error), 'code': 'busy', 'scope': backpressure_error.scope}, room=request.sid)
@@ -0,0 +1,162 @@
+# magnecruit_backend\benchmarks\load_benchmark.py
+
+'''
+In-process load benchmark for the chat websocket, run against the fake LLM backend:
+
+    python -m benchmarks.load_benchmark --clients 20 --turns 5
+
+Reports the p50/p95/p99 latency of send_user_message, the throughput in messages per second and
+the number of database queries per turn. SQLite holds a write lock for the whole turn, so use
+--database-url with a PostgreSQL database when benchmarking more than one client.
+'''
+
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+# Must be set before the llm_interface module is imported
+os.environ['LLM_BACKEND'] = 'fake'
+# The simulated clients send faster than the per-user budget allows, which would report rate limited turns as errors
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+GENERAL_CHAT_MESSAGES = (
+    "How should I structure a phone screen for a backend engineer?",
+    "What are good questions to ask about remote work preferences?",
+    "Summarize what we discussed so far.",
+)
+JOB_SECTIONS_MESSAGES = (
+    "Generate a job description for a senior software engineer in Austin.",
+    "Make the responsibilities more focused on mentoring.",
+    "Save it to the workspace.",
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load benchmark for the Magnecruit chat websocket using the fake LLM backend")
+    parser.add_argument('--clients', type=int, default=10, help="Number of concurrent websocket clients, one user each")
+    parser.add_argument('--turns', type=int, default=5, help="Number of messages sent by each client")
+    parser.add_argument('--job-sections-ratio', type=float, default=0.5, help="Share of the turns sent from the job sections view")
+    parser.add_argument('--latency-ms', type=float, default=300, help="Fake LLM time to first token")
+    parser.add_argument('--chunk-latency-ms', type=float, default=40, help="Fake LLM delay between streamed chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of fake LLM calls that raise a transient error")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="Share of fake LLM calls that take --slow-latency-ms to respond")
+    parser.add_argument('--slow-latency-ms', type=float, default=5000, help="Fake LLM time to first token of the slow calls")
+    parser.add_argument('--block-rate', type=float, default=0.0, help="Share of fake LLM calls that return a blocked prompt")
+    parser.add_argument('--database-url', default=None, help="Database to run against, defaults to a temporary SQLite file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='magnecruit-bench-'), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+
+    import greenlet
+    from sqlalchemy import event
+    from app import create_app, db, socketio
+    from app.models import Users
+    from app.agent.fake_llm import configure_fake_llm
+    from app.services.metrics import nearest_rank_percentile
+
+    configure_fake_llm(
+        latency_ms=args.latency_ms,
+        chunk_latency_ms=args.chunk_latency_ms,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_latency_ms=args.slow_latency_ms,
+        block_rate=args.block_rate
+    )
+
+    app = create_app()
+    queries_by_greenlet = {}
+
+    with app.app_context():
+        db.create_all()
+        run_id = int(time.time())
+        users = []
+        for index in range(args.clients):
+            user = Users(
+                username=f"bench_{run_id}_{index}",
+                email=f"bench_{run_id}_{index}@example.com",
+                created_at=datetime.now(timezone.utc)
+            )
+            users.append(user)
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+        # Count the statements issued by each client's greenthread
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            current = greenlet.getcurrent()
+            if current in queries_by_greenlet:
+                queries_by_greenlet[current] += 1
+
+    if database_url.startswith('sqlite') and args.clients > 1:
+        print("Warning: SQLite serializes concurrent turns, use --database-url with PostgreSQL for concurrency numbers", file=sys.stderr)
+
+    turn_results = []
+
+    def run_client(client_index: int, user_id: int):
+        client = socketio.test_client(app, auth={'userId': user_id, 'username': f"bench_{client_index}"})
+        client.get_received()
+        conversation_id = None
+        current = greenlet.getcurrent()
+        turn_picker = random.Random(client_index)
+        for turn in range(args.turns):
+            use_job_sections = turn_picker.random() < args.job_sections_ratio
+            messages = JOB_SECTIONS_MESSAGES if use_job_sections else GENERAL_CHAT_MESSAGES
+            payload = {
+                'content': messages[turn % len(messages)],
+                'conversationId': conversation_id,
+                'activeView': 'job-sections' if use_job_sections else 'actions'
+            }
+            queries_by_greenlet[current] = 0
+            started = time.perf_counter()
+            client.emit('send_user_message', payload)
+            elapsed = time.perf_counter() - started
+            received = client.get_received()
+            errors = [packet for packet in received if packet['name'] == 'error']
+            for packet in received:
+                if packet['name'] == 'conversation_created':
+                    conversation_id = packet['args'][0]['conversationId']
+            turn_results.append({
+                'latency': elapsed,
+                'queries': queries_by_greenlet.pop(current),
+                'ok': not errors,
+                'job_sections': use_job_sections
+            })
+            eventlet.sleep(0)
+        client.disconnect()
+
+    started = time.perf_counter()
+    pool = eventlet.GreenPool(max(1, args.clients))
+    for client_index, user_id in enumerate(user_ids):
+        pool.spawn(run_client, client_index, user_id)
+    pool.waitall()
+    wall_time = time.perf_counter() - started
+
+    latencies = [result['latency'] * 1000 for result in turn_results]
+    queries = [result['queries'] for result in turn_results]
+    failures = sum(1 for result in turn_results if not result['ok'])
+    print(f"Database:            {database_url.split('@')[-1]}")
+    print(f"Clients x turns:     {args.clients} x {args.turns} ({len(turn_results)} messages, {failures} errors)")
+    print(f"Wall time:           {wall_time:.2f}s")
+    print(f"Throughput:          {len(turn_results) / wall_time if wall_time else 0:.2f} messages/s")
+    print(f"Latency p50/p95/p99: {nearest_rank_percentile(latencies, 50):.0f} / {nearest_rank_percentile(latencies, 95):.0f} / {nearest_rank_percentile(latencies, 99):.0f} ms")
+    for label, is_job_sections in (('general chat', False), ('job sections', True)):
+        kind_queries = [result['queries'] for result in turn_results if result['job_sections'] == is_job_sections]
+        if kind_queries:
+            print(f"DB queries per turn ({label}): avg {sum(kind_queries) / len(kind_queries):.1f}, max {max(kind_queries)}")
+    if queries:
+        print(f"DB queries per turn: avg {sum(queries) / len(queries):.1f}, max {max(queries)}")
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,64 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'haha-you-cannot-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool shared by the green threads of a worker, sized for concurrent turns rather than OS threads
+    SQLALCHEMY_POOL_SIZE = int(os.environ.get('SQLALCHEMY_POOL_SIZE') or 10)
+    SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get('SQLALCHEMY_MAX_OVERFLOW') or 10)
+    SQLALCHEMY_POOL_TIMEOUT = int(os.environ.get('SQLALCHEMY_POOL_TIMEOUT') or 10)
+    SQLALCHEMY_POOL_PRE_PING = (os.environ.get('SQLALCHEMY_POOL_PRE_PING') or 'true').lower() == 'true'
+    SQLALCHEMY_POOL_RECYCLE = int(os.environ.get('SQLALCHEMY_POOL_RECYCLE') or 1800)
+    SQLALCHEMY_STATEMENT_TIMEOUT_MS = int(os.environ.get('SQLALCHEMY_STATEMENT_TIMEOUT_MS') or 30000)
     ALLOWED_ORIGINS = os.environ.get('ALLOWED_ORIGINS') or 'http://localhost:5173'
+    STREAM_AI_RESPONSES = (os.environ.get('STREAM_AI_RESPONSES') or 'true').lower() == 'true'
+    # One of 'template' (no extra LLM call), 'function_response' (model follow-up to the function call) or 'llm' (separate LLM call)
+    JOB_SECTIONS_CONFIRMATION_MODE = os.environ.get('JOB_SECTIONS_CONFIRMATION_MODE') or 'template'
+    HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET') or 6000)
+    HISTORY_WINDOW_MESSAGES = int(os.environ.get('HISTORY_WINDOW_MESSAGES') or 20)
+    HISTORY_SUMMARY_BATCH_MESSAGES = int(os.environ.get('HISTORY_SUMMARY_BATCH_MESSAGES') or 6)
+    # Estimated token ceiling of a job-sections prompt, and the history messages it keeps once the job state holds the rest
+    JOB_SECTIONS_PROMPT_TOKEN_CEILING = int(os.environ.get('JOB_SECTIONS_PROMPT_TOKEN_CEILING') or 12000)
+    JOB_SECTIONS_HISTORY_MESSAGES_WITH_JOB = int(os.environ.get('JOB_SECTIONS_HISTORY_MESSAGES_WITH_JOB') or 6)
+    HISTORY_CACHE_MAX_CONVERSATIONS = int(os.environ.get('HISTORY_CACHE_MAX_CONVERSATIONS') or 1000)
+    HISTORY_CACHE_TTL_SECONDS = int(os.environ.get('HISTORY_CACHE_TTL_SECONDS') or 300)
+    HISTORY_CACHE_MAX_MESSAGES = int(os.environ.get('HISTORY_CACHE_MAX_MESSAGES') or 200)
+    CONVERSATIONS_PAGE_SIZE = int(os.environ.get('CONVERSATIONS_PAGE_SIZE') or 50)
+    MESSAGES_PAGE_SIZE = int(os.environ.get('MESSAGES_PAGE_SIZE') or 50)
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE') or 200)
+    # Opt-in cache of general chat replies to standalone questions, with an optional embedding similarity tier
+    RESPONSE_CACHE_ENABLED = (os.environ.get('RESPONSE_CACHE_ENABLED') or 'false').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 2000)
+    RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS') or 3600)
+    RESPONSE_CACHE_EMBEDDINGS_ENABLED = (os.environ.get('RESPONSE_CACHE_EMBEDDINGS_ENABLED') or 'false').lower() == 'true'
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get('RESPONSE_CACHE_SIMILARITY_THRESHOLD') or 0.92)
+    LINKEDIN_POST_CACHE_MAX_ENTRIES = int(os.environ.get('LINKEDIN_POST_CACHE_MAX_ENTRIES') or 1000)
+    LINKEDIN_BATCH_MAX_ITEMS = int(os.environ.get('LINKEDIN_BATCH_MAX_ITEMS') or 100)
+    LINKEDIN_BATCH_PARALLELISM = int(os.environ.get('LINKEDIN_BATCH_PARALLELISM') or 5)
+    # In-process task queue for queued chat turns and LinkedIn posts, task records kept in the 'database' or in 'memory'
+    TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND') or 'database'
+    TASK_QUEUE_CONCURRENCY = int(os.environ.get('TASK_QUEUE_CONCURRENCY') or 4)
+    TASK_QUEUE_MAX_PENDING = int(os.environ.get('TASK_QUEUE_MAX_PENDING') or 100)
+    TASK_QUEUE_MAX_PENDING_PER_USER = int(os.environ.get('TASK_QUEUE_MAX_PENDING_PER_USER') or 5)
+    TASK_QUEUE_HEARTBEAT_SECONDS = float(os.environ.get('TASK_QUEUE_HEARTBEAT_SECONDS') or 30)
+    # Message queue shared by the worker processes, e.g. redis://localhost:6379/0, or local:// for the in-process stand-in
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL') or 'flask-socketio'
+    # Token-bucket rate limits per user and global, as a burst and a refill per minute, 0 leaves that bucket out.
+    # 'llm' covers the requests that call the LLM, 'api' every blueprint request and the other socket events
+    RATE_LIMIT_ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or 'true').lower() == 'true'
+    # 'memory' for buckets per worker process, 'redis' for buckets shared through RATE_LIMIT_STORAGE_URL
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL')
+    RATE_LIMIT_LLM_USER_BURST = int(os.environ.get('RATE_LIMIT_LLM_USER_BURST') or 5)
+    RATE_LIMIT_LLM_USER_PER_MINUTE = float(os.environ.get('RATE_LIMIT_LLM_USER_PER_MINUTE') or 20)
+    RATE_LIMIT_LLM_GLOBAL_BURST = int(os.environ.get('RATE_LIMIT_LLM_GLOBAL_BURST') or 200)
+    RATE_LIMIT_LLM_GLOBAL_PER_MINUTE = float(os.environ.get('RATE_LIMIT_LLM_GLOBAL_PER_MINUTE') or 1000)
+    RATE_LIMIT_API_USER_BURST = int(os.environ.get('RATE_LIMIT_API_USER_BURST') or 60)
+    RATE_LIMIT_API_USER_PER_MINUTE = float(os.environ.get('RATE_LIMIT_API_USER_PER_MINUTE') or 300)
+    RATE_LIMIT_API_GLOBAL_BURST = int(os.environ.get('RATE_LIMIT_API_GLOBAL_BURST') or 0)
+    RATE_LIMIT_API_GLOBAL_PER_MINUTE = float(os.environ.get('RATE_LIMIT_API_GLOBAL_PER_MINUTE') or 0)
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() == 'true'
+    # Chat turns slower than this are logged with the duration of each stage
+    SLOW_TURN_LOG_SECONDS = float(os.environ.get('SLOW_TURN_LOG_SECONDS') or 5)
 
 class DevelopmentConfig(Config):
     DEBUG = True
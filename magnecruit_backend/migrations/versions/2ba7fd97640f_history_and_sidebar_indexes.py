@@ -0,0 +1,46 @@
+"""history and sidebar indexes
+
+Indexes matching the filter and order of the conversation history, sidebar and job section queries.
+
+Revision ID: 2ba7fd97640f
+Revises: da5564bc6f53
+Create Date: 2026-10-18 08:58:22.987071
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2ba7fd97640f'
+down_revision = 'da5564bc6f53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.create_index('ix_conversations_user_id_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_conversation_id_timestamp_id', ['conversation_id', 'timestamp', 'id'], unique=False)
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_jobs_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('job_sections', schema=None) as batch_op:
+        batch_op.create_index('ix_job_sections_job_id_section_number', ['job_id', 'section_number'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_sections', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_sections_job_id_section_number')
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_user_id'))
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_conversation_id_timestamp_id')
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversations_user_id_created_at_id')
@@ -0,0 +1,30 @@
+"""task heartbeats
+
+The worker running a task and the last heartbeat it refreshed, to fail the tasks lost with a stopped worker.
+
+Revision ID: 6bfeb64d9cbc
+Revises: 713a021afda7
+Create Date: 2026-10-18 14:12:37.402517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6bfeb64d9cbc'
+down_revision = '713a021afda7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('worker_id')
@@ -0,0 +1,57 @@
+"""linkedin post cache unique per job
+
+Cached posts are unique per (job_id, prompt_hash) instead of per prompt_hash. The unnamed unique constraint on
+prompt_hash has a database-specific name, so the table is recreated instead of altered. The cached posts are dropped and
+generated again on their next request.
+
+Revision ID: 70b73800dcdd
+Revises: 91710fc05a21
+Create Date: 2026-10-18 09:02:31.057796
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '70b73800dcdd'
+down_revision = '91710fc05a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_table('linkedin_post_cache')
+    op.create_table('linkedin_post_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('job_version', sa.Integer(), nullable=False),
+        sa.Column('post_content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'prompt_hash', name='uq_linkedin_post_cache_job_id_prompt_hash')
+    )
+    with op.batch_alter_table('linkedin_post_cache', schema=None) as batch_op:
+        batch_op.create_index('ix_linkedin_post_cache_last_used_at', ['last_used_at'], unique=False)
+
+
+def downgrade():
+    op.drop_table('linkedin_post_cache')
+    op.create_table('linkedin_post_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('job_version', sa.Integer(), nullable=False),
+        sa.Column('post_content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prompt_hash')
+    )
+    with op.batch_alter_table('linkedin_post_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_linkedin_post_cache_job_id'), ['job_id'], unique=False)
+        batch_op.create_index('ix_linkedin_post_cache_last_used_at', ['last_used_at'], unique=False)
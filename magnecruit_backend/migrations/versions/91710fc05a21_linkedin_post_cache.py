@@ -0,0 +1,44 @@
+"""linkedin post cache
+
+Generated LinkedIn posts cached by prompt hash, valid while the job stays at the cached version.
+
+Revision ID: 91710fc05a21
+Revises: a9f400f7a10f
+Create Date: 2026-10-18 09:01:04.838233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '91710fc05a21'
+down_revision = 'a9f400f7a10f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('linkedin_post_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('job_version', sa.Integer(), nullable=False),
+        sa.Column('post_content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prompt_hash')
+    )
+    with op.batch_alter_table('linkedin_post_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_linkedin_post_cache_job_id'), ['job_id'], unique=False)
+        batch_op.create_index('ix_linkedin_post_cache_last_used_at', ['last_used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('linkedin_post_cache', schema=None) as batch_op:
+        batch_op.drop_index('ix_linkedin_post_cache_last_used_at')
+        batch_op.drop_index(batch_op.f('ix_linkedin_post_cache_job_id'))
+
+    op.drop_table('linkedin_post_cache')
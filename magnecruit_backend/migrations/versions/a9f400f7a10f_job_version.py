@@ -0,0 +1,28 @@
+"""job version
+
+Version of each job, bumped by every saved change, so job_updated can be sent as a delta.
+
+Revision ID: a9f400f7a10f
+Revises: 2ba7fd97640f
+Create Date: 2026-10-18 09:00:09.382778
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9f400f7a10f'
+down_revision = '2ba7fd97640f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,32 @@
+"""conversation summary
+
+Rolling summary of the messages that left the history window.
+
+Revision ID: da5564bc6f53
+Revises: d66dae70c897
+Create Date: 2026-10-18 08:56:49.488031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'da5564bc6f53'
+down_revision = 'd66dae70c897'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summarized_until_message_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_column('summarized_until_message_id')
+        batch_op.drop_column('summary')
@@ -1,4 +1,21 @@
 # magnecruit_backend\run.py
+#
+# Development server: python run.py
+#
+# Production, one eventlet worker per process with the processes sharing a message queue so an emit to a user's room
+# reaches the worker holding the user's socket, whichever worker made it:
+#
+#   SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 gunicorn --worker-class eventlet -w 1 --bind 127.0.0.1:5001 run:app
+#   SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 gunicorn --worker-class eventlet -w 1 --bind 127.0.0.1:5002 run:app
+#
+# behind a load balancer with sticky sessions (e.g. nginx ip_hash), which the Socket.IO long-polling transport requires.
+# With the frontend limited to the websocket transport (VITE_REACT_APP_SOCKET_TRANSPORTS=websocket) sessions need not be
+# sticky and a single gunicorn can run several workers: gunicorn --worker-class eventlet -w 4 --bind 0.0.0.0:5001 run:app
+
+import eventlet
+# Patch the standard library before anything else is imported, as the gunicorn eventlet worker does, so database and
+# message queue sockets yield to other green threads instead of blocking the worker
+eventlet.monkey_patch()
 
 import os
 from app import create_app, db, socketio
@@ -7,7 +24,8 @@ from app.models import (
     Conversations,
     Messages,
     Jobs,
-    JobSections
+    JobSections,
+    LinkedInPostCache
 )
 
 app = create_app(os.getenv('FLASK_CONFIG') or 'default')
@@ -23,7 +41,8 @@ def make_shell_context():
                 Conversation=Conversations,
                 Message=Messages,
                 Jobs=Jobs,
-                JobSections=JobSections)
+                JobSections=JobSections,
+                LinkedInPostCache=LinkedInPostCache)
 
 if __name__ == '__main__':
     socketio.run(app, debug=app.config.get('DEBUG', False))
\ No newline at end of file
@@ -0,0 +1,59 @@
+# magnecruit_backend\tests\conftest.py
+
+import os
+
+# The settings are read when config is imported, so the test environment is set before the app is imported
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['LLM_BACKEND'] = 'fake'
+# The tests share one app, and the user ids repeat as the tables are recreated, so the buckets would carry over between tests
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+import pytest
+from datetime import datetime, timezone
+from app import create_app, db
+from app.models import Users, Conversations
+from app.agent.fake_llm import FAKE_LLM_SETTINGS, configure_fake_llm
+
+@pytest.fixture(scope='session')
+def app():
+    '''
+    Returns the application, created once for the test session on an in-memory SQLite database
+    '''
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture(autouse=True)
+def fake_llm_settings():
+    '''
+    Runs the fake LLM without latency during the test, and restores its settings after it
+    '''
+    saved_settings = dict(FAKE_LLM_SETTINGS)
+    configure_fake_llm(latency_ms=0, chunk_latency_ms=0)
+    yield FAKE_LLM_SETTINGS
+    FAKE_LLM_SETTINGS.update(saved_settings)
+
+@pytest.fixture
+def db_session(app):
+    '''
+    Returns the database session inside an application context, with the tables created for the test and dropped after it
+    '''
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(db_session):
+    user = Users(username='recruiter', email='recruiter@example.com', created_at=datetime.now(timezone.utc))
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def conversation(db_session, user):
+    conversation = Conversations(user_id=user.id, title='Chef', created_at=datetime.now(timezone.utc))
+    db_session.add(conversation)
+    db_session.commit()
+    return conversation
@@ -0,0 +1,29 @@
+# magnecruit_backend\tests\test_confirmation_messages.py
+
+from app.agent.prompts import CONFIRMATION_FALLBACK_MESSAGE
+from app.services.job_sections_service import _build_template_confirmation_message
+
+def test_generate_is_confirmed_as_a_full_draft():
+    message = _build_template_confirmation_message(['target_role', 'responsibilities'], 'Chef', ['generate_job_sections'])
+
+    assert message.startswith("Done! I've drafted the job description for Chef")
+
+def test_modifying_many_sections_lists_them():
+    message = _build_template_confirmation_message(
+        ['responsibilities', 'benefits', 'company_context'], 'Chef', ['modify_job_sections'] * 3
+    )
+
+    assert message == "Got it, I've updated the About the Company section, Responsibilities and Benefits and Offers in the workspace."
+
+def test_update_lists_the_updated_fields():
+    message = _build_template_confirmation_message(['target_role', 'benefits'], 'Chef', ['update_job_sections'])
+
+    assert message == "Got it, I've updated the job title and Benefits and Offers in the workspace."
+
+def test_section_with_its_own_heading_is_named_by_heading():
+    message = _build_template_confirmation_message(['Team Culture'], 'Chef', ['modify_job_sections'])
+
+    assert message == "Got it, I've updated the Team Culture section in the workspace."
+
+def test_nothing_updated_falls_back():
+    assert _build_template_confirmation_message([], 'Chef', ['update_job_sections']) == CONFIRMATION_FALLBACK_MESSAGE
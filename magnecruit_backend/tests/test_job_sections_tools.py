@@ -0,0 +1,129 @@
+# magnecruit_backend\tests\test_job_sections_tools.py
+
+import eventlet
+import pytest
+from datetime import datetime
+from app.models import Jobs, JobSections
+from app.agent.fake_llm import FAKE_JOB_BENEFITS_UPDATE_ARGS, FakeGenerativeModel
+from app.agent import llm_interface
+from app.services import job_sections_service
+from app.services.job_sections_service import process_chat_for_job_sections
+
+BENEFITS_BODY = "\n".join(f"- {benefit}" for benefit in FAKE_JOB_BENEFITS_UPDATE_ARGS['job_benefits'])
+
+def _create_job(db_session, user, conversation, headings: list) -> Jobs:
+    job = Jobs(conversation_id=conversation.id, user_id=user.id, jobrole='Head Chef', description='Bistro kitchen', created_at=datetime.now())
+    job.sections = [
+        JobSections(section_number=number, heading=heading, body=f"Original {heading.lower()}")
+        for number, heading in enumerate(headings, start=1)
+    ]
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+@pytest.fixture
+def slow_first_rewrite(monkeypatch):
+    '''
+    Delays the rewrite of the Responsibilities section, the first call of the fake model's edit response, so it finishes last
+    '''
+    rewrite_job_section = job_sections_service._rewrite_job_section
+
+    def delayed_rewrite(job_snapshot, section, modification_instruction, on_section_chunk=None):
+        if section['heading'] == 'Responsibilities':
+            eventlet.sleep(0.05)
+        return rewrite_job_section(job_snapshot, section, modification_instruction, on_section_chunk)
+    monkeypatch.setattr(job_sections_service, '_rewrite_job_section', delayed_rewrite)
+
+def _section_bodies(job: Jobs) -> dict:
+    return {section.heading: section.body for section in sorted(job.sections, key=lambda s: s.section_number)}
+
+# The fake model answers a 'modify' message with modify_job_sections for Responsibilities and Required Qualifications,
+# then update_job_sections for the benefits, in one response
+def test_function_calls_of_one_response_are_applied_in_call_order(db_session, user, conversation, slow_first_rewrite):
+    job = _create_job(db_session, user, conversation, ['Responsibilities', 'Required Qualifications', 'Benefits and Offers'])
+
+    text, updated_job, error, updated_field_keys, job_changes = process_chat_for_job_sections(
+        user.id, conversation.id, "Please modify the wording", []
+    )
+    db_session.commit()
+
+    assert error is None
+    assert updated_field_keys == ['responsibilities', 'required_qualifications', 'benefits']
+    assert sorted(job_changes['updated_section_ids']) == sorted(section.id for section in job.sections)
+    assert updated_job.version == 2
+    section_bodies = _section_bodies(updated_job)
+    assert section_bodies['Responsibilities'] != "Original responsibilities"
+    assert section_bodies['Required Qualifications'] != "Original required qualifications"
+    assert section_bodies['Benefits and Offers'] == BENEFITS_BODY
+    assert text == "Got it, I've updated the Responsibilities, Required Qualifications and Benefits and Offers in the workspace."
+
+def test_failed_function_call_does_not_drop_the_others(db_session, user, conversation, slow_first_rewrite):
+    _create_job(db_session, user, conversation, ['Responsibilities', 'Benefits and Offers'])
+
+    text, updated_job, error, updated_field_keys, _ = process_chat_for_job_sections(
+        user.id, conversation.id, "Please modify the wording", []
+    )
+    db_session.commit()
+
+    assert error is None
+    assert updated_field_keys == ['responsibilities', 'benefits']
+    section_bodies = _section_bodies(updated_job)
+    assert section_bodies['Responsibilities'] != "Original responsibilities"
+    assert section_bodies['Benefits and Offers'] == BENEFITS_BODY
+    assert 'Required Qualifications' not in section_bodies
+    assert text == (
+        "Got it, I've updated the Responsibilities and Benefits and Offers in the workspace. "
+        "There is no 'Required Qualifications' section in the job description to modify."
+    )
+
+def test_every_failed_call_is_reported_in_call_order(db_session):
+    outcomes = job_sections_service._prepare_job_changes([
+        ('modify_job_sections', {'target_section_heading': 'Responsibilities', 'modification_instruction': 'Shorter'}),
+        ('modify_job_sections', {'target_section_heading': 'Team Culture', 'modification_instruction': 'Shorter'})
+    ], job_sections_service._snapshot_job(None))
+
+    assert [str(outcome) for outcome in outcomes] == [
+        "There is no 'Responsibilities' section in the job description to modify.",
+        "There is no 'Team Culture' section in the job description to modify."
+    ]
+
+@pytest.fixture
+def llm_prompts(monkeypatch):
+    '''
+    Returns the (model_name, contents) of every call to the fake model during the test
+    '''
+    prompts = []
+    generate_content = FakeGenerativeModel.generate_content
+
+    def recorded_generate_content(model, contents, **kwargs):
+        prompts.append((model.model_name, contents))
+        return generate_content(model, contents, **kwargs)
+    monkeypatch.setattr(FakeGenerativeModel, 'generate_content', recorded_generate_content)
+    return prompts
+
+def test_modify_sends_only_the_target_section_to_the_llm(db_session, user, conversation, llm_prompts):
+    job = _create_job(db_session, user, conversation, ['About the Company', 'Responsibilities', 'Benefits and Offers'])
+    section_ids = {section.heading: section.id for section in job.sections}
+    job_snapshot = job_sections_service._snapshot_job(job)
+
+    job_changes = job_sections_service._prepare_job_changes([
+        ('modify_job_sections', {'target_section_heading': 'responsibilities', 'modification_instruction': 'Make it shorter'})
+    ], job_snapshot)
+    updated_job, updated_field_keys, _ = job_sections_service._save_job_changes(user.id, conversation.id, job, job_snapshot, job_changes)
+    db_session.commit()
+
+    assert len(llm_prompts) == 1
+    model_name, prompt = llm_prompts[0]
+    assert model_name == llm_interface.get_task_profile('section_rewrite')['model_name']
+    assert "Original responsibilities" in prompt
+    assert "Make it shorter" in prompt
+    assert "Head Chef" in prompt
+    assert "Original about the company" not in prompt
+    assert "Original benefits and offers" not in prompt
+
+    assert updated_field_keys == ['responsibilities']
+    section_bodies = _section_bodies(updated_job)
+    assert section_bodies['Responsibilities'] not in ("", "Original responsibilities")
+    assert section_bodies['About the Company'] == "Original about the company"
+    assert section_bodies['Benefits and Offers'] == "Original benefits and offers"
+    assert {section.heading: section.id for section in updated_job.sections} == section_ids
@@ -0,0 +1,84 @@
+# magnecruit_backend\tests\test_job_sections_upsert.py
+
+import pytest
+from datetime import datetime
+from app.models import Jobs, JobSections
+from app.services.job_sections_service import upsert_job_sections
+
+@pytest.fixture
+def job(db_session, user, conversation):
+    job = Jobs(conversation_id=conversation.id, user_id=user.id, jobrole='Chef', description='Head chef', created_at=datetime.now())
+    job.sections = [
+        JobSections(section_number=1, heading='About the Company', body='A restaurant.'),
+        JobSections(section_number=2, heading='Responsibilities', body='Cook.'),
+        JobSections(section_number=3, heading='Benefits', body='Meals.'),
+    ]
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+def _section_rows(db_session, job_id: int) -> list:
+    return [
+        (section.id, section.section_number, section.heading, section.body)
+        for section in db_session.query(JobSections).filter_by(job_id=job_id).order_by(JobSections.section_number)
+    ]
+
+def test_unchanged_sections_are_left_alone(db_session, job):
+    rows_before = _section_rows(db_session, job.id)
+    changes = upsert_job_sections(job, [
+        {'section_number': number, 'heading': heading, 'body': body} for _, number, heading, body in rows_before
+    ])
+
+    assert changes == {'added_section_ids': [], 'updated_section_ids': [], 'removed_section_ids': []}
+    assert _section_rows(db_session, job.id) == rows_before
+
+def test_sections_are_matched_by_heading_and_keep_their_ids(db_session, job):
+    ids_by_heading = {heading: section_id for section_id, _, heading, _ in _section_rows(db_session, job.id)}
+    changes = upsert_job_sections(job, [
+        {'section_number': 1, 'heading': 'Responsibilities', 'body': 'Cook and plan menus.'},
+        {'section_number': 2, 'heading': 'about the company ', 'body': 'A restaurant.'},
+        {'section_number': 3, 'heading': 'Benefits', 'body': 'Meals.'},
+    ])
+    db_session.commit()
+
+    assert changes['added_section_ids'] == [] and changes['removed_section_ids'] == []
+    assert sorted(changes['updated_section_ids']) == sorted([ids_by_heading['Responsibilities'], ids_by_heading['About the Company']])
+    assert _section_rows(db_session, job.id) == [
+        (ids_by_heading['Responsibilities'], 1, 'Responsibilities', 'Cook and plan menus.'),
+        (ids_by_heading['About the Company'], 2, 'about the company ', 'A restaurant.'),
+        (ids_by_heading['Benefits'], 3, 'Benefits', 'Meals.'),
+    ]
+
+def test_renamed_section_is_matched_by_section_number(db_session, job):
+    benefits_id = _section_rows(db_session, job.id)[2][0]
+    changes = upsert_job_sections(job, [
+        {'section_number': 1, 'heading': 'About the Company', 'body': 'A restaurant.'},
+        {'section_number': 2, 'heading': 'Responsibilities', 'body': 'Cook.'},
+        {'section_number': 3, 'heading': 'Benefits and Offers', 'body': 'Meals and a pension.'},
+    ])
+
+    assert changes == {'added_section_ids': [], 'updated_section_ids': [benefits_id], 'removed_section_ids': []}
+
+def test_sections_are_added_and_removed(db_session, job):
+    rows_before = _section_rows(db_session, job.id)
+    changes = upsert_job_sections(job, [
+        {'section_number': 1, 'heading': 'About the Company', 'body': 'A restaurant.'},
+        {'section_number': 2, 'heading': 'Responsibilities', 'body': 'Cook.'},
+        {'section_number': 4, 'heading': 'Required Qualifications', 'body': 'Five years in a kitchen.'},
+        {'section_number': 5, 'heading': 'Additional Information', 'body': 'Evenings.'},
+    ])
+    db_session.commit()
+
+    assert changes['removed_section_ids'] == [rows_before[2][0]]
+    assert changes['updated_section_ids'] == []
+    rows_after = _section_rows(db_session, job.id)
+    assert rows_after[:2] == rows_before[:2]
+    assert changes['added_section_ids'] == sorted(row[0] for row in rows_after[2:])
+    assert [row[2] for row in rows_after[2:]] == ['Required Qualifications', 'Additional Information']
+
+def test_changes_are_flushed_but_not_committed(db_session, job):
+    rows_before = _section_rows(db_session, job.id)
+    upsert_job_sections(job, [{'section_number': 1, 'heading': 'About the Company', 'body': 'A bistro.'}])
+    db_session.rollback()
+
+    assert _section_rows(db_session, job.id) == rows_before
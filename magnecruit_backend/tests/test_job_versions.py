@@ -0,0 +1,75 @@
+# magnecruit_backend\tests\test_job_versions.py
+
+from app.models import Jobs
+from app.services.job_sections_service import _save_job_changes, _snapshot_job, build_job_update_payload
+
+def _generate_change(role: str, responsibilities: str) -> dict:
+    return {
+        'fields': {'jobrole': role},
+        'sections': [{'section_number': 1, 'heading': 'Responsibilities', 'body': responsibilities}],
+        'replace_sections': True,
+        'updated_field_keys': ['target_role', 'responsibilities']
+    }
+
+def _save(db_session, user, conversation, job_change: dict):
+    job = db_session.query(Jobs).filter_by(conversation_id=conversation.id).first()
+    job, _, job_changes = _save_job_changes(user.id, conversation.id, job, _snapshot_job(job), [job_change])
+    db_session.commit()
+    return job, job_changes
+
+def test_new_job_starts_at_version_one(db_session, user, conversation):
+    job, job_changes = _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+
+    assert job.version == 1
+    assert job_changes['base_version'] == 0
+
+def test_version_is_bumped_once_per_saved_change(db_session, user, conversation):
+    _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+    job, job_changes = _save(db_session, user, conversation, _generate_change('Head Chef', 'Cook and plan menus.'))
+
+    assert job.version == 2
+    assert job_changes['base_version'] == 1
+    assert job_changes['changed_fields'] == ['jobrole']
+    assert len(job_changes['updated_section_ids']) == 1
+
+def test_version_is_kept_when_nothing_changed(db_session, user, conversation):
+    _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+    job, job_changes = _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+
+    assert job.version == 1
+    assert not job_changes['changed_fields'] and not any(job_changes[key] for key in ('added_section_ids', 'updated_section_ids', 'removed_section_ids'))
+
+def test_client_at_base_version_gets_a_delta(db_session, user, conversation):
+    _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+    job, job_changes = _save(db_session, user, conversation, _generate_change('Chef', 'Cook and plan menus.'))
+
+    payload = build_job_update_payload(job, job_changes, client_job_version=1)
+
+    assert payload['type'] == 'delta'
+    assert (payload['base_version'], payload['version']) == (1, 2)
+    assert payload['changed_fields'] == {}
+    assert [section['body'] for section in payload['upserted_sections']] == ['Cook and plan menus.']
+    assert payload['removed_section_ids'] == []
+
+def test_stale_or_unknown_client_gets_a_snapshot(db_session, user, conversation):
+    _save(db_session, user, conversation, _generate_change('Chef', 'Cook.'))
+    job, job_changes = _save(db_session, user, conversation, _generate_change('Chef', 'Cook and plan menus.'))
+
+    for client_job_version in (None, 0, 2):
+        payload = build_job_update_payload(job, job_changes, client_job_version)
+        assert payload['type'] == 'snapshot'
+        assert payload['version'] == 2
+        assert [section['body'] for section in payload['sections']] == ['Cook and plan menus.']
+
+def test_save_route_bumps_the_version_only_on_change(app, db_session, user, conversation):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    job_data = {'conversation_id': conversation.id, 'user_id': user.id, 'jobrole': 'Chef', 'description': 'Head chef',
+                'sections': [{'section_number': 1, 'heading': 'Responsibilities', 'body': 'Cook.'}]}
+
+    created = client.post('/api/job-sections/save', json=job_data).get_json()
+    unchanged = client.post('/api/job-sections/save', json={**job_data, 'id': created['id']}).get_json()
+    changed = client.post('/api/job-sections/save', json={**job_data, 'id': created['id'], 'description': 'Sous chef'}).get_json()
+
+    assert (created['version'], unchanged['version'], changed['version']) == (1, 1, 2)
@@ -0,0 +1,110 @@
+# magnecruit_backend\tests\test_linkedin_batch.py
+
+import json
+import eventlet
+import pytest
+from datetime import datetime, timezone
+from flask import stream_with_context
+from werkzeug.test import EnvironBuilder
+from app.models import Users, Conversations, Jobs, JobSections
+from app.services import linkedin_post_service
+from app.agent import llm_interface
+from app.routes import linkedin_post_routes
+
+def _create_job(db_session, username: str) -> Conversations:
+    user = Users(username=username, email=f"{username}@example.com", created_at=datetime.now(timezone.utc))
+    db_session.add(user)
+    db_session.flush()
+    conversation = Conversations(user_id=user.id, title='Chef', created_at=datetime.now(timezone.utc))
+    db_session.add(conversation)
+    db_session.flush()
+    job = Jobs(conversation_id=conversation.id, user_id=user.id, jobrole='Chef', description='Head chef', created_at=datetime.now())
+    job.sections = [JobSections(section_number=1, heading='Responsibilities', body='Cook.')]
+    db_session.add(job)
+    db_session.commit()
+    return conversation
+
+@pytest.fixture
+def own_conversation(db_session):
+    return _create_job(db_session, 'owner')
+
+@pytest.fixture
+def other_conversation(db_session):
+    return _create_job(db_session, 'other')
+
+def _post_batch(client, conversation_ids: list):
+    return client.post('/api/linkedin-post/generate-batch', json={
+        'items': [{'conversation_id': conversation_id} for conversation_id in conversation_ids],
+        'company_name': 'Bistro'
+    })
+
+def test_anonymous_batch_is_rejected(app, own_conversation):
+    response = _post_batch(app.test_client(), [own_conversation.id])
+
+    assert response.status_code == 401
+
+def test_batch_only_reads_the_jobs_of_the_session_user(app, own_conversation, other_conversation):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = own_conversation.user_id
+
+    response = _post_batch(client, [own_conversation.id, other_conversation.id])
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    results = {line['conversation_id']: line for line in lines if 'conversation_id' in line}
+
+    assert response.status_code == 200
+    assert results[own_conversation.id].get('linkedin_post')
+    assert 'linkedin_post' not in results[other_conversation.id]
+    assert 'error' in results[other_conversation.id]
+    assert lines[-1] == {'done': True, 'succeeded': 1, 'failed': 1}
+
+def test_batch_releases_the_llm_slot_when_the_stream_is_never_read(app, own_conversation, monkeypatch):
+    # Holds on to the body generator, so the slot cannot be released by the garbage collection of the generator
+    streamed_generators = []
+    monkeypatch.setattr(linkedin_post_routes, 'stream_with_context', lambda gen: streamed_generators.append(gen) or stream_with_context(gen))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = own_conversation.user_id
+    environ = EnvironBuilder(
+        path='/api/linkedin-post/generate-batch',
+        method='POST',
+        json={'items': [{'conversation_id': own_conversation.id}], 'company_name': 'Bistro'},
+        headers={'Cookie': f"{app.config['SESSION_COOKIE_NAME']}={client.get_cookie(app.config['SESSION_COOKIE_NAME']).value}"}
+    ).get_environ()
+
+    # The server closes the body without iterating it, as it does when the client is gone before the body is sent
+    body = app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    assert llm_interface._llm_calls_in_flight_by_user.get(own_conversation.user_id) == 1
+    body.close()
+
+    assert own_conversation.user_id not in llm_interface._llm_calls_in_flight_by_user
+
+def test_batch_yields_fast_items_while_slow_items_are_running(own_conversation, monkeypatch):
+    slow_items_released = eventlet.event.Event()
+
+    # The slow items wait until the test releases them, the fast items return straight away
+    def generate_post_content(formatted_user_prompt):
+        if 'slow' in formatted_user_prompt:
+            slow_items_released.wait()
+        else:
+            eventlet.sleep(0)
+        return 'Post', None
+    monkeypatch.setattr(linkedin_post_service, '_generate_post_content', generate_post_content)
+
+    tones = ['slow', 'fast', 'slow', 'fast']
+    results = linkedin_post_service.generate_linkedin_posts_batch(
+        [{'conversation_id': own_conversation.id, 'tone': tone, 'length': 'short'} for tone in tones],
+        company_name_input='Bistro',
+        job_description_summary_input='',
+        user_id=own_conversation.user_id,
+        parallelism=2
+    )
+    # With two slots both taken by slow items, the last fast item can only start once a slow item has finished
+    with eventlet.Timeout(2):
+        first_result = next(results)
+    slow_items_released.send()
+    remaining_results = list(results)
+
+    assert first_result['tone'] == 'fast'
+    assert sorted(result['index'] for result in [first_result, *remaining_results]) == [0, 1, 2, 3]
+    assert all(result['linkedin_post'] == 'Post' for result in [first_result, *remaining_results])
@@ -0,0 +1,187 @@
+# magnecruit_backend\tests\test_llm_resilience.py
+
+import time
+import eventlet
+import pytest
+from google.api_core import exceptions as google_exceptions
+from app.agent import llm_resilience
+from app.agent.llm_resilience import (
+    CircuitBreaker, LLMUnavailableError, LLMDeadlineExceededError, call_with_resilience, get_circuit_breaker, hedge_delay
+)
+
+@pytest.fixture(autouse=True)
+def resilience_settings(monkeypatch):
+    '''
+    Retries without backoff and starts every test with no breaker and no latency history
+    '''
+    monkeypatch.setattr(llm_resilience, 'LLM_RETRY_BASE_DELAY_SECONDS', 0)
+    monkeypatch.setattr(llm_resilience, 'LLM_MAX_RETRIES', 2)
+    monkeypatch.setattr(llm_resilience, 'LLM_BREAKER_FAILURE_THRESHOLD', 3)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_ENABLED', False)
+    llm_resilience.reset_circuit_breakers()
+    llm_resilience._attempt_latencies.clear()
+    yield
+    llm_resilience.reset_circuit_breakers()
+    llm_resilience._attempt_latencies.clear()
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''
+    Returns a settable clock that replaces time.monotonic for the circuit breaker
+    '''
+    now = [1000.0]
+    monkeypatch.setattr(llm_resilience.time, 'monotonic', lambda: now[0])
+    return now
+
+def failing_calls(errors: list, result='ok'):
+    '''
+    Returns a function that raises the given errors on its first calls and then returns the result, and the list of its calls
+    '''
+    calls = []
+
+    def fn():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('model', failure_threshold=2, reset_seconds=30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker('model', failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_breaker_lets_one_probe_through(clock):
+    breaker = CircuitBreaker('model', failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.before_call()
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker('model', failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 30
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 29
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+def test_abandoned_probe_is_released(clock):
+    breaker = CircuitBreaker('model', failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.before_call()
+    breaker.abandon_call()
+
+    breaker.before_call()
+
+def test_transient_errors_are_retried():
+    fn, calls = failing_calls([google_exceptions.ServiceUnavailable('down'), google_exceptions.TooManyRequests('busy')])
+
+    assert call_with_resilience(fn, 'retry-model', 'general_chat') == 'ok'
+    assert len(calls) == 3
+    assert get_circuit_breaker('retry-model').state == CircuitBreaker.CLOSED
+
+def test_retries_are_bounded_and_count_as_one_breaker_failure():
+    fn, calls = failing_calls([google_exceptions.ServiceUnavailable('down')] * 5)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        call_with_resilience(fn, 'down-model', 'general_chat')
+    assert len(calls) == 3
+    assert get_circuit_breaker('down-model')._consecutive_failures == 1
+
+def test_breaker_fails_fast_once_open():
+    for _ in range(3):
+        fn, _ = failing_calls([google_exceptions.ServiceUnavailable('down')] * 3)
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            call_with_resilience(fn, 'flaky-model', 'general_chat')
+
+    fn, calls = failing_calls([])
+    with pytest.raises(LLMUnavailableError):
+        call_with_resilience(fn, 'flaky-model', 'general_chat')
+    assert calls == []
+
+def test_non_retryable_errors_are_raised_at_once_and_keep_the_breaker_closed():
+    fn, calls = failing_calls([google_exceptions.InvalidArgument('bad request')])
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        call_with_resilience(fn, 'strict-model', 'general_chat')
+    assert len(calls) == 1
+    assert get_circuit_breaker('strict-model')._consecutive_failures == 0
+
+def test_stream_is_not_retried_once_retry_is_no_longer_allowed():
+    fn, calls = failing_calls([ConnectionError('reset')])
+
+    with pytest.raises(ConnectionError):
+        call_with_resilience(fn, 'stream-model', 'general_chat', streamed=True, retry_allowed=lambda: False)
+    assert len(calls) == 1
+
+def test_slow_call_fails_its_deadline():
+    def slow():
+        eventlet.sleep(1)
+
+    started = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceededError):
+        call_with_resilience(slow, 'slow-model', 'general_chat', deadline_seconds=0.1)
+    assert time.perf_counter() - started < 0.5
+
+def test_slow_attempt_is_hedged(monkeypatch):
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_ENABLED', True)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_SAMPLES', 5)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_DELAY_SECONDS', 0.01)
+    for _ in range(5):
+        llm_resilience._record_attempt_latency('general_chat', 0.02)
+    attempts = []
+
+    def first_attempt_slow():
+        attempts.append(len(attempts))
+        eventlet.sleep(1 if len(attempts) == 1 else 0)
+        return f"attempt {len(attempts)}"
+
+    started = time.perf_counter()
+    assert call_with_resilience(first_attempt_slow, 'hedge-model', 'general_chat') == 'attempt 2'
+    assert time.perf_counter() - started < 0.5
+
+def test_hedge_delay_needs_enough_samples(monkeypatch):
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_SAMPLES', 4)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_PERCENTILE', 75)
+    monkeypatch.setattr(llm_resilience, 'LLM_HEDGE_MIN_DELAY_SECONDS', 0)
+    for seconds in (0.1, 0.2, 0.3):
+        llm_resilience._record_attempt_latency('summary', seconds)
+    assert hedge_delay('summary') is None
+
+    llm_resilience._record_attempt_latency('summary', 0.4)
+    assert hedge_delay('summary') == 0.3
+
+def test_streamed_calls_are_left_out_of_the_hedge_latency():
+    call_with_resilience(lambda: 'streamed', 'latency-model', 'general_chat', streamed=True)
+    assert 'general_chat' not in llm_resilience._attempt_latencies
+
+    call_with_resilience(lambda: 'not streamed', 'latency-model', 'general_chat')
+    assert len(llm_resilience._attempt_latencies['general_chat']) == 1
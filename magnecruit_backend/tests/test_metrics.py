@@ -0,0 +1,16 @@
+# magnecruit_backend\tests\test_metrics.py
+
+from app.services.metrics import nearest_rank_percentile
+
+def test_nearest_rank_percentile_picks_the_ceiling_rank():
+    values = list(range(10, 0, -1))
+
+    assert nearest_rank_percentile(values, 50) == 5
+    assert nearest_rank_percentile(values, 95) == 10
+    assert nearest_rank_percentile(list(range(1, 21)), 95) == 19
+    assert nearest_rank_percentile(list(range(1, 21)), 96) == 20
+
+def test_nearest_rank_percentile_bounds():
+    assert nearest_rank_percentile([3, 1, 2], 0) == 1
+    assert nearest_rank_percentile([3, 1, 2], 100) == 3
+    assert nearest_rank_percentile([], 50) == 0.0
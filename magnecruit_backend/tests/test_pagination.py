@@ -0,0 +1,59 @@
+# magnecruit_backend\tests\test_pagination.py
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.models import Messages
+from app.services import chat_service
+from app.services.history_cache import conversation_history_cache
+from app.services.pagination import encode_cursor, decode_cursor, resolve_page_size
+
+def test_cursor_round_trips_naive_timestamp():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+def test_cursor_normalizes_aware_timestamp_to_naive_utc():
+    timestamp = datetime(2024, 5, 1, 14, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert decode_cursor(encode_cursor(timestamp, 7)) == (datetime(2024, 5, 1, 12, 30), 7)
+
+def test_cursor_accepts_iso_string_timestamp():
+    assert decode_cursor(encode_cursor('2024-05-01T12:30:00+00:00', 3)) == (datetime(2024, 5, 1, 12, 30), 3)
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(datetime(2024, 5, 1, 12, 30), 123456789)
+    assert all(character.isalnum() or character in '-_=' for character in cursor)
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', 'W10=', 'WyJub3QgYSBkYXRlIiwgMV0='])
+def test_decode_cursor_rejects_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize('requested, expected', [
+    (None, 50),
+    ('abc', 50),
+    ('20', 20),
+    (0, 1),
+    (-5, 1),
+    (1000, 200),
+])
+def test_resolve_page_size_clamps_to_bounds(requested, expected):
+    assert resolve_page_size(requested, default_limit=50, max_limit=200) == expected
+
+def test_message_pages_walk_history_once_with_timestamp_ties(db_session, conversation):
+    timestamp = datetime(2024, 5, 1, 12, 0)
+    db_session.add_all([
+        Messages(conversation_id=conversation.id, sender='user', content=f"Message {i}", timestamp=timestamp + timedelta(seconds=i // 2))
+        for i in range(7)
+    ])
+    db_session.commit()
+    conversation_history_cache.invalidate(conversation.id)
+
+    pages = []
+    page, next_cursor = chat_service.get_conversation_messages(conversation.id, page_size=3)
+    pages.append(page)
+    while next_cursor:
+        page, next_cursor = chat_service.get_conversation_messages(conversation.id, page_size=3, before_cursor=next_cursor)
+        pages.append(page)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    contents = [message['content'] for page in reversed(pages) for message in page]
+    assert contents == [f"Message {i}" for i in range(7)]
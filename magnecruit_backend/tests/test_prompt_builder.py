@@ -0,0 +1,85 @@
+# magnecruit_backend\tests\test_prompt_builder.py
+
+import json
+import pytest
+from app.models import Jobs, JobSections
+from app.agent import llm_interface
+from app.agent.prompts import CONVERSATION_SUMMARY_CONTEXT_TEMPLATE, CONVERSATION_SUMMARY_ACKNOWLEDGEMENT, JOB_SECTIONS_HISTORY_OMITTED_NOTE
+from app.agent.prompt_builder import PromptBudgetExceededError, build_job_sections_contents, serialize_job_state
+
+SYSTEM_INSTRUCTION = "You write job descriptions."
+
+@pytest.fixture
+def job():
+    job = Jobs(jobrole='Head Chef', description='')
+    job.sections = [
+        JobSections(section_number=2, heading='Requirements', body='Five years running a professional kitchen team'),
+        JobSections(section_number=1, heading='Responsibilities', body='Plan the seasonal menu with the owners\nTrain the line cooks every week')
+    ]
+    return job
+
+def message(role: str, text: str) -> dict:
+    return {'role': role, 'parts': [text]}
+
+def test_job_state_is_compact_json_without_empty_fields(job):
+    job_state_json = serialize_job_state(job)
+
+    assert job_state_json == json.dumps(json.loads(job_state_json), separators=(',', ':'), ensure_ascii=False)
+    assert json.loads(job_state_json) == {
+        'jobrole': 'Head Chef',
+        'sections': [
+            {'section_number': 1, 'heading': 'Responsibilities', 'body': 'Plan the seasonal menu with the owners\nTrain the line cooks every week'},
+            {'section_number': 2, 'heading': 'Requirements', 'body': 'Five years running a professional kitchen team'}
+        ]
+    }
+    assert serialize_job_state(None) == "null"
+
+def test_prompt_under_budget_drops_history_the_job_state_covers(job):
+    history = [
+        message('user', CONVERSATION_SUMMARY_CONTEXT_TEMPLATE.format(summary="The user is hiring a head chef.")),
+        message('model', CONVERSATION_SUMMARY_ACKNOWLEDGEMENT),
+        message('user', "We need a head chef for our bistro downtown, can you help?"),
+        message('model', "- Plan the seasonal menu with the owners\n- Train the line cooks every week"),
+        message('user', "Make the requirements stricter please"),
+        message('model', "Sure, here is the stricter version of the requirements")
+    ]
+
+    contents, prompt_stats = build_job_sections_contents(job, "Add a benefits section", history, SYSTEM_INSTRUCTION, token_ceiling=10000, history_messages_with_job=2)
+
+    assert contents[:2] == history[:2]
+    assert contents[2:4] == history[4:6]
+    assert prompt_stats['history_messages_dropped'] == {'covered': 1, 'window': 1, 'budget': 0}
+    user_turn = contents[-1]['parts'][0]
+    assert user_turn.startswith(JOB_SECTIONS_HISTORY_OMITTED_NOTE)
+    assert serialize_job_state(job) in user_turn
+    assert "Add a benefits section" in user_turn
+    assert not any(line.startswith((' ', '\t')) for line in user_turn.splitlines())
+    assert prompt_stats['total'] <= 10000
+
+def test_prompt_without_job_keeps_the_whole_history():
+    history = [message('user', "We need a head chef for our bistro downtown"), message('model', "Happy to help with the head chef role")]
+
+    contents, prompt_stats = build_job_sections_contents(None, "Draft it", history, SYSTEM_INSTRUCTION, token_ceiling=10000, history_messages_with_job=0)
+
+    assert contents[:2] == history
+    assert not contents[-1]['parts'][0].startswith(JOB_SECTIONS_HISTORY_OMITTED_NOTE)
+    assert prompt_stats['history_messages_dropped'] == {'covered': 0, 'window': 0, 'budget': 0}
+
+def test_prompt_over_budget_drops_the_oldest_history_first(job):
+    history = [message('user' if index % 2 == 0 else 'model', f"Message {index} " + "about the kitchen " * 20) for index in range(6)]
+    _, unbounded_stats = build_job_sections_contents(job, "Shorten it", history, SYSTEM_INSTRUCTION, token_ceiling=100000, history_messages_with_job=10)
+    message_tokens = llm_interface.estimate_tokens(history[0]['parts'][0])
+    # Room for the prompt without history, its omitted-history note and three of the messages
+    token_ceiling = unbounded_stats['total'] - 3 * message_tokens + llm_interface.estimate_tokens(JOB_SECTIONS_HISTORY_OMITTED_NOTE) + 2
+
+    contents, prompt_stats = build_job_sections_contents(job, "Shorten it", history, SYSTEM_INSTRUCTION, token_ceiling=token_ceiling, history_messages_with_job=10)
+
+    # The newest three messages fit, the oldest of them is a model turn and is dropped so the contents start with a user turn
+    assert contents[:-1] == history[4:]
+    assert prompt_stats['history_messages_dropped'] == {'covered': 0, 'window': 0, 'budget': 4}
+    assert prompt_stats['total'] <= token_ceiling
+    assert contents[-1]['parts'][0].startswith(JOB_SECTIONS_HISTORY_OMITTED_NOTE)
+
+def test_prompt_over_budget_without_history_is_rejected(job):
+    with pytest.raises(PromptBudgetExceededError):
+        build_job_sections_contents(job, "Shorten it", [], SYSTEM_INSTRUCTION, token_ceiling=50, history_messages_with_job=10)
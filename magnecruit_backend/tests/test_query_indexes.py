@@ -0,0 +1,72 @@
+# magnecruit_backend\tests\test_query_indexes.py
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from app import db
+from app.models import Conversations, Messages
+from app.services import chat_service
+from app.services.history_cache import conversation_history_cache
+
+# Record the SELECT statements run on the engine, with their parameters, while the block runs
+@contextmanager
+def captured_selects():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+# Get the EXPLAIN QUERY PLAN details of the captured statements that read the table
+def query_plans(statements, table: str) -> list[str]:
+    plans = []
+    for statement, parameters in statements:
+        if f"FROM {table}" not in statement:
+            continue
+        rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plans.append(' | '.join(row[-1] for row in rows))
+    return plans
+
+def assert_uses_index(plans: list[str], index_name: str):
+    assert plans, "no query was captured"
+    for plan in plans:
+        assert index_name in plan, plan
+        assert 'USE TEMP B-TREE' not in plan, plan
+
+def test_conversation_list_uses_user_created_at_index(app, db_session, user):
+    now = datetime.now(timezone.utc)
+    db_session.add_all([Conversations(user_id=user.id, title=f"Chat {i}", created_at=now + timedelta(seconds=i)) for i in range(5)])
+    db_session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    with captured_selects() as statements:
+        first_page = client.get('/api/chat/conversations?limit=2')
+        client.get(f"/api/chat/conversations?limit=2&cursor={first_page.get_json()['next_cursor']}")
+
+    assert first_page.status_code == 200
+    assert_uses_index(query_plans(statements, 'conversations'), 'ix_conversations_user_id_created_at_id')
+
+def test_message_history_uses_conversation_timestamp_index(app, db_session, conversation):
+    now = datetime.now(timezone.utc)
+    db_session.add_all([
+        Messages(conversation_id=conversation.id, sender='user' if i % 2 == 0 else 'ai', content=f"Message {i}", timestamp=now + timedelta(seconds=i))
+        for i in range(6)
+    ])
+    db_session.commit()
+
+    conversation_history_cache.invalidate(conversation.id)
+    with captured_selects() as statements:
+        _, next_cursor = chat_service.get_conversation_messages(conversation.id, page_size=2)
+        chat_service.get_conversation_messages(conversation.id, page_size=2, before_cursor=next_cursor)
+        conversation_history_cache.invalidate(conversation.id)
+        chat_service.fetch_and_format_history(conversation.id, db_session)
+
+    assert_uses_index(query_plans(statements, 'messages'), 'ix_messages_conversation_id_timestamp_id')
@@ -0,0 +1,130 @@
+# magnecruit_backend\tests\test_rate_limiter.py
+
+import pytest
+from app import socketio
+from app.services import rate_limiter as rate_limiter_module
+from app.services.rate_limiter import MemoryRateLimitStore, RateLimiter, RateLimitExceededError, _take_tokens, rate_limiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''
+    Returns a settable clock that replaces time.monotonic for the memory store
+    '''
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, 'monotonic', lambda: now[0])
+    return now
+
+def make_limiter(user=(2, 60), global_=(0, 0)) -> RateLimiter:
+    limiter = RateLimiter()
+    limiter.configure(enabled=True, backend='memory', storage_url=None, limits={'llm': {'user': user, 'global': global_}})
+    return limiter
+
+@pytest.fixture
+def app_rate_limits():
+    '''
+    Enables small limits on the app's rate limiter for the test, and disables it again after
+    '''
+    rate_limiter.configure(enabled=True, backend='memory', storage_url=None, limits={
+        'llm': {'user': (1, 1), 'global': (0, 0)},
+        'api': {'user': (2, 1), 'global': (0, 0)}
+    })
+    yield rate_limiter
+    rate_limiter.configure(enabled=False, backend='memory', storage_url=None, limits={})
+
+def test_take_tokens_refills_up_to_capacity():
+    assert _take_tokens(tokens=0, updated_at=0, capacity=5, refill_per_second=1, cost=1, now=2) == (1, True, 0.0)
+    assert _take_tokens(tokens=4, updated_at=0, capacity=5, refill_per_second=1, cost=1, now=100) == (4, True, 0.0)
+
+def test_take_tokens_reports_wait_when_short():
+    tokens, allowed, retry_after = _take_tokens(tokens=0.5, updated_at=0, capacity=5, refill_per_second=0.5, cost=2, now=0)
+    assert (tokens, allowed, retry_after) == (0.5, False, 3.0)
+
+def test_memory_store_refills_over_time(clock):
+    store = MemoryRateLimitStore()
+    assert store.take('key', capacity=1, refill_per_second=0.5, cost=1) == (True, 0.0)
+    assert store.take('key', capacity=1, refill_per_second=0.5, cost=1) == (False, 2.0)
+
+    clock[0] += 2
+    assert store.take('key', capacity=1, refill_per_second=0.5, cost=1) == (True, 0.0)
+
+def test_user_over_burst_is_rejected_with_retry_after(clock):
+    limiter = make_limiter(user=(2, 60))
+    limiter.check('llm', 'user:1')
+    limiter.check('llm', 'user:1')
+
+    with pytest.raises(RateLimitExceededError) as excinfo:
+        limiter.check('llm', 'user:1')
+    assert excinfo.value.scope == 'user'
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+    limiter.check('llm', 'user:2')
+
+def test_global_rejection_refunds_the_user_bucket(clock):
+    limiter = make_limiter(user=(2, 60), global_=(1, 60))
+    limiter.check('llm', 'user:1')
+
+    with pytest.raises(RateLimitExceededError) as excinfo:
+        limiter.check('llm', 'user:2')
+    assert excinfo.value.scope == 'global'
+
+    clock[0] += 1
+    limiter.check('llm', 'user:2')
+    clock[0] += 1
+    limiter.check('llm', 'user:2')
+
+def test_cost_above_burst_takes_the_whole_bucket(clock):
+    limiter = make_limiter(user=(3, 60))
+    limiter.check('llm', 'user:1', cost=10)
+
+    with pytest.raises(RateLimitExceededError):
+        limiter.check('llm', 'user:1')
+
+def test_disabled_limiter_and_unset_buckets_are_not_enforced(clock):
+    limiter = make_limiter(user=(0, 0))
+    for _ in range(10):
+        limiter.check('llm', 'user:1')
+        limiter.check('api', 'user:1')
+
+    limiter = make_limiter(user=(1, 60))
+    limiter.enabled = False
+    for _ in range(10):
+        limiter.check('llm', 'user:1')
+
+def test_store_errors_let_requests_through():
+    class FailingStore:
+        def take(self, key, capacity, refill_per_second, cost):
+            raise ConnectionError('store down')
+
+    limiter = make_limiter(user=(1, 60))
+    limiter.store = FailingStore()
+    for _ in range(3):
+        limiter.check('llm', 'user:1')
+
+def test_http_request_over_budget_gets_429_and_preflights_are_free(app, db_session, user, app_rate_limits):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+
+    for _ in range(3):
+        assert client.options('/api/chat/conversations').status_code != 429
+    assert client.get('/api/chat/conversations').status_code == 200
+    assert client.get('/api/chat/conversations').status_code == 200
+    response = client.get('/api/chat/conversations')
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['scope'] == 'user'
+
+def test_socket_message_over_budget_gets_rate_limited_error(app, db_session, user, app_rate_limits):
+    client = socketio.test_client(app, auth={'userId': user.id, 'username': user.username})
+    client.get_received()
+
+    client.emit('send_user_message', {'content': 'hello', 'activeView': 'actions'})
+    assert not [event for event in client.get_received() if event['name'] == 'error']
+    client.emit('send_user_message', {'content': 'hello again', 'activeView': 'actions'})
+    errors = [event['args'][0] for event in client.get_received() if event['name'] == 'error']
+    client.disconnect()
+
+    assert len(errors) == 1
+    assert errors[0]['code'] == 'rate_limited'
+    assert errors[0]['scope'] == 'user'
+    assert errors[0]['retryAfter'] > 0
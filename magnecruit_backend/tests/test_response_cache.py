@@ -0,0 +1,78 @@
+# magnecruit_backend\tests\test_response_cache.py
+
+import pytest
+from app.services import response_cache
+from app.services.response_cache import ResponseCache, normalize_prompt, context_hash
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''
+    Returns a settable clock that replaces time.monotonic in the response cache
+    '''
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_normalize_prompt_ignores_case_punctuation_and_spacing():
+    assert normalize_prompt("  What's a good   interview question?! ") == normalize_prompt("what s a good interview question")
+
+def test_context_hash_separates_parts():
+    assert context_hash('model', 'instruction') == context_hash('model', 'instruction')
+    assert context_hash('model', 'instruction') != context_hash('modelinstruction', '')
+    assert context_hash('model', None) == context_hash('model', '')
+
+def test_exact_hit_requires_same_context():
+    cache = ResponseCache(enabled=True)
+    cache.set('context-a', 'what is a recruiter', 'A recruiter finds candidates.')
+
+    assert cache.get('context-a', 'what is a recruiter') == 'A recruiter finds candidates.'
+    assert cache.get('context-b', 'what is a recruiter') is None
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(enabled=True, ttl_seconds=60)
+    cache.set('context', 'prompt', 'reply')
+
+    clock[0] += 59
+    assert cache.get('context', 'prompt') == 'reply'
+    clock[0] += 2
+    assert cache.get('context', 'prompt') is None
+    assert cache.stats()['evictions'] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(enabled=True, max_entries=2)
+    cache.set('context', 'first', 'reply 1')
+    cache.set('context', 'second', 'reply 2')
+    cache.get('context', 'first')
+    cache.set('context', 'third', 'reply 3')
+
+    assert cache.get('context', 'second') is None
+    assert cache.get('context', 'first') == 'reply 1'
+    assert cache.get('context', 'third') == 'reply 3'
+
+def test_similar_prompt_is_served_above_threshold():
+    cache = ResponseCache(enabled=True, similarity_threshold=0.9, embeddings_enabled=True)
+    cache.set('context', 'how do i write a job post', 'Start with the role.', embedding=[1.0, 0.0, 0.0])
+    cache.set('context', 'what is a recruiter', 'A recruiter finds candidates.', embedding=[0.0, 1.0, 0.0])
+
+    assert cache.get_similar('context', [0.95, 0.1, 0.0]) == 'Start with the role.'
+    assert cache.get_similar('context', [0.7, 0.7, 0.0]) is None
+    assert cache.get_similar('other-context', [1.0, 0.0, 0.0]) is None
+
+def test_expired_entries_are_not_served_as_similar(clock):
+    cache = ResponseCache(enabled=True, ttl_seconds=60, embeddings_enabled=True)
+    cache.set('context', 'prompt', 'reply', embedding=[1.0, 0.0])
+
+    clock[0] += 61
+    assert cache.get_similar('context', [1.0, 0.0]) is None
+
+def test_stats_report_hit_rate():
+    cache = ResponseCache(enabled=True, embeddings_enabled=True)
+    cache.set('context', 'prompt', 'reply', embedding=[1.0, 0.0])
+    cache.get('context', 'prompt')
+    cache.get_similar('context', [1.0, 0.0])
+    cache.record_miss()
+    cache.record_miss()
+
+    stats = cache.stats()
+    assert (stats['exact_hits'], stats['similar_hits'], stats['misses']) == (1, 1, 2)
+    assert stats['hit_rate'] == 0.5
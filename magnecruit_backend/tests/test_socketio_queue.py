@@ -0,0 +1,69 @@
+# magnecruit_backend\tests\test_socketio_queue.py
+
+import eventlet
+import pytest
+import flask_socketio.test_client
+from flask import Flask
+from flask_socketio import SocketIO
+from app import socketio
+from app.websockets import handle_connect
+from app.services.socketio_queue import LocalQueueManager, message_queue_options, _local_channels
+
+QUEUE_URL = 'local://test-workers'
+
+@pytest.fixture
+def app_publishes_to_queue(monkeypatch):
+    '''
+    Makes the app's Socket.IO server publish its emits to the local queue, like a worker configured with SOCKETIO_MESSAGE_QUEUE
+    '''
+    manager = LocalQueueManager(QUEUE_URL, write_only=True)
+    manager.set_server(socketio.server)
+    monkeypatch.setattr(socketio.server, 'manager', manager)
+    return manager
+
+@pytest.fixture
+def second_worker(monkeypatch):
+    '''
+    Returns a second Socket.IO server subscribed to the same local queue, with the app's connect handler, and unsubscribes it after the test
+    '''
+    # The test client refuses message queues, as it cannot take the packets relayed by another process. The local queue
+    # relays them in this process, so the check is skipped
+    monkeypatch.setattr(flask_socketio.test_client, 'PubSubManager', type('NoPubSubManager', (), {}))
+    worker_app = Flask('second_worker')
+    worker_app.config['SECRET_KEY'] = 'test'
+    worker_socketio = SocketIO(worker_app, **message_queue_options(QUEUE_URL, 'flask-socketio'))
+    worker_socketio.on_event('connect', handle_connect)
+    yield worker_app, worker_socketio
+    _local_channels.pop((QUEUE_URL, 'flask-socketio'), None)
+
+def test_message_queue_options_select_the_manager():
+    assert message_queue_options(None, 'flask-socketio') == {}
+    assert message_queue_options('redis://localhost:6379/0', 'jobs') == {'message_queue': 'redis://localhost:6379/0', 'channel': 'jobs'}
+    assert isinstance(message_queue_options('local://', 'jobs')['client_manager'], LocalQueueManager)
+
+def test_emit_from_http_route_reaches_client_of_another_worker(app, db_session, user, conversation, app_publishes_to_queue, second_worker):
+    worker_app, worker_socketio = second_worker
+    worker_client = worker_socketio.test_client(worker_app, auth={'userId': user.id, 'username': user.username})
+    other_user_client = worker_socketio.test_client(worker_app, auth={'userId': user.id + 1, 'username': 'other'})
+    worker_client.get_received()
+    other_user_client.get_received()
+
+    response = app.test_client().post('/api/job-sections/save', json={
+        'conversation_id': conversation.id,
+        'user_id': user.id,
+        'jobrole': 'Sous Chef'
+    })
+    # The second worker relays the message from its listener green thread
+    with eventlet.Timeout(2):
+        received = []
+        while not received:
+            eventlet.sleep(0.01)
+            received = worker_client.get_received()
+
+    assert response.status_code == 201
+    assert received == [{
+        'name': 'chat_title_updated_event',
+        'args': [{'conversation_id': conversation.id, 'new_title': 'Sous Chef'}],
+        'namespace': '/'
+    }]
+    assert other_user_client.get_received() == []
@@ -0,0 +1,157 @@
+# magnecruit_backend\tests\test_task_queue.py
+
+import eventlet
+import pytest
+from datetime import datetime, timedelta, timezone
+from app import socketio
+from app.models import Users, Conversations, Jobs, JobSections, Tasks
+from app.services.task_queue import task_queue, TaskQueueFullError, TaskFailedError, STALE_TASK_ERROR
+
+@pytest.fixture
+def emitted_events(monkeypatch):
+    '''
+    Returns the (event, data, room) of every socketio.emit made during the test
+    '''
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, data=None, to=None, **kwargs: events.append((event, data, to)))
+    return events
+
+@pytest.fixture
+def handlers(monkeypatch):
+    '''
+    Returns a function that registers a task handler for the test only
+    '''
+    def register(kind: str, handler_fn):
+        monkeypatch.setitem(task_queue._handlers, kind, handler_fn)
+    return register
+
+@pytest.fixture
+def blocked_tasks(handlers):
+    '''
+    Registers a 'blocked' task kind that runs until the test ends, and releases it after the test
+    '''
+    release = eventlet.event.Event()
+    handlers('blocked', lambda params, user_id, report_progress: release.wait())
+    yield release
+    release.send({})
+    with eventlet.Timeout(2):
+        while task_queue._pending_by_user:
+            eventlet.sleep(0.01)
+
+def wait_for_task(task_id: str) -> dict:
+    '''
+    Returns the task once it has finished, letting the queue's green threads run meanwhile
+    '''
+    with eventlet.Timeout(2):
+        while True:
+            task = task_queue.get(task_id)
+            if task['status'] not in ('queued', 'running'):
+                return task
+            eventlet.sleep(0.01)
+
+def test_submitted_task_runs_and_persists_its_result(db_session, user, handlers, emitted_events):
+    def echo(params, user_id, report_progress):
+        report_progress(50, "Halfway")
+        return {'echo': params['text'], 'user_id': user_id}
+    handlers('echo', echo)
+
+    queued_task = task_queue.submit(user.id, 'echo', {'text': 'hello'})
+    task = wait_for_task(queued_task['id'])
+
+    assert queued_task['status'] == 'queued'
+    assert task['status'] == 'succeeded'
+    assert task['result'] == {'echo': 'hello', 'user_id': user.id}
+    assert db_session.get(Tasks, queued_task['id']).status == 'succeeded'
+    updates = [(data['status'], data['progress'], data['progress_message']) for event, data, room in emitted_events if event == 'task_updated']
+    assert updates == [('running', 0, None), ('running', 50, "Halfway"), ('succeeded', 100, None)]
+    assert {room for event, data, room in emitted_events} == {f"user_{user.id}"}
+
+def test_failed_task_keeps_the_handler_message(db_session, user, handlers):
+    def fail(params, user_id, report_progress):
+        raise TaskFailedError("No job details found")
+    handlers('fail', fail)
+
+    task = wait_for_task(task_queue.submit(user.id, 'fail', {})['id'])
+
+    assert task['status'] == 'failed'
+    assert task['error'] == "No job details found"
+
+def test_user_pending_limit_rejects_only_that_user(db_session, user, blocked_tasks, monkeypatch):
+    monkeypatch.setattr(task_queue, 'max_pending_per_user', 1)
+    other_user = Users(username='other', email='other@example.com', created_at=datetime.now(timezone.utc))
+    db_session.add(other_user)
+    db_session.commit()
+
+    task_queue.submit(user.id, 'blocked', {})
+    with pytest.raises(TaskQueueFullError) as queue_full:
+        task_queue.submit(user.id, 'blocked', {})
+    task_queue.submit(other_user.id, 'blocked', {})
+
+    assert queue_full.value.scope == 'user'
+
+def test_global_pending_limit_rejects_every_user(db_session, user, blocked_tasks, monkeypatch):
+    monkeypatch.setattr(task_queue, 'max_pending', 2)
+
+    task_queue.submit(user.id, 'blocked', {})
+    task_queue.submit(user.id, 'blocked', {})
+    with pytest.raises(TaskQueueFullError) as queue_full:
+        task_queue.submit(user.id, 'blocked', {})
+
+    assert queue_full.value.scope == 'global'
+
+def _add_task(db_session, user, task_id: str, status: str, heartbeat_age_seconds: float) -> Tasks:
+    heartbeat_at = datetime.now() - timedelta(seconds=heartbeat_age_seconds)
+    task_row = Tasks(id=task_id, user_id=user.id, kind='linkedin_post', status=status, progress=10, created_at=heartbeat_at, heartbeat_at=heartbeat_at)
+    db_session.add(task_row)
+    db_session.commit()
+    return task_row
+
+def test_tasks_of_stopped_workers_are_failed_at_startup(db_session, user, emitted_events):
+    _add_task(db_session, user, 'lost-queued', 'queued', task_queue.stale_after_seconds + 60)
+    _add_task(db_session, user, 'lost-running', 'running', task_queue.stale_after_seconds + 60)
+    _add_task(db_session, user, 'alive', 'running', 1)
+    _add_task(db_session, user, 'finished', 'succeeded', task_queue.stale_after_seconds + 60)
+
+    assert task_queue.fail_stale_tasks() == 2
+
+    db_session.expire_all()
+    statuses = {task_row.id: (task_row.status, task_row.error) for task_row in db_session.query(Tasks)}
+    assert statuses == {
+        'lost-queued': ('failed', STALE_TASK_ERROR),
+        'lost-running': ('failed', STALE_TASK_ERROR),
+        'alive': ('running', None),
+        'finished': ('succeeded', None)
+    }
+    assert sorted(data['id'] for event, data, room in emitted_events if event == 'task_updated') == ['lost-queued', 'lost-running']
+
+def test_polling_a_task_of_a_stopped_worker_fails_it(db_session, user):
+    _add_task(db_session, user, 'lost', 'running', task_queue.stale_after_seconds + 1)
+
+    task = task_queue.get('lost', user_id=user.id)
+
+    assert (task['status'], task['error']) == ('failed', STALE_TASK_ERROR)
+
+def test_async_linkedin_post_is_queued_and_polled(app, db_session, user, conversation):
+    job = Jobs(conversation_id=conversation.id, user_id=user.id, jobrole='Chef', description='Head chef', created_at=datetime.now())
+    job.sections = [JobSections(section_number=1, heading='Responsibilities', body='Cook.')]
+    db_session.add(job)
+    db_session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+
+    response = client.post('/api/linkedin-post/generate', json={'conversation_id': conversation.id, 'company_name': 'Bistro', 'async': True})
+    task_id = response.get_json()['task']['id']
+    wait_for_task(task_id)
+    poll_response = client.get(f'/api/tasks/{task_id}')
+
+    assert response.status_code == 202
+    assert response.get_json()['task']['status'] == 'queued'
+    assert poll_response.status_code == 200
+    assert poll_response.get_json()['task']['status'] == 'succeeded'
+    assert poll_response.get_json()['task']['result']['linkedin_post']
+
+def test_async_linkedin_post_requires_a_session(app, conversation):
+    response = app.test_client().post('/api/linkedin-post/generate', json={'conversation_id': conversation.id, 'company_name': 'Bistro', 'async': True})
+
+    assert response.status_code == 401
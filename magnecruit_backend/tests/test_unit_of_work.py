@@ -0,0 +1,63 @@
+# magnecruit_backend\tests\test_unit_of_work.py
+
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+from app.models import Conversations, Messages, Jobs, JobSections
+from app.services import chat_service, job_sections_service
+
+# Count the transactions committed on the engine while the block runs
+@contextmanager
+def counted_commits():
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(db.engine, 'commit', on_commit)
+    try:
+        yield commits
+    finally:
+        event.remove(db.engine, 'commit', on_commit)
+
+def test_job_sections_turn_is_committed_once(db_session, user):
+    with counted_commits() as commits:
+        result = chat_service.process_incoming_message(user.id, None, 'generate the job description', 'job-sections')
+
+    assert result['success'], result
+    assert len(commits) == 1
+    conversation_id = result['new_conversation_data']['conversationId']
+    assert [message.sender for message in db_session.query(Messages).filter_by(conversation_id=conversation_id).order_by(Messages.id)] == ['user', 'ai']
+    job = db_session.query(Jobs).filter_by(conversation_id=conversation_id).one()
+    assert job.version == 1
+    assert db_session.query(JobSections).filter_by(job_id=job.id).count() == len(result['updated_job_sections_data']['sections'])
+
+def test_failed_job_save_leaves_the_turn_uncommitted(db_session, user, conversation, monkeypatch):
+    def failing_upsert(job, desired_sections):
+        raise RuntimeError('section save failed')
+
+    monkeypatch.setattr(job_sections_service, 'upsert_job_sections', failing_upsert)
+    result = chat_service.process_incoming_message(user.id, conversation.id, 'generate the job description', 'job-sections')
+    db_session.expire_all()
+
+    assert not result['success']
+    assert db_session.query(Jobs).filter_by(conversation_id=conversation.id).count() == 0
+    assert db_session.query(Messages).filter_by(conversation_id=conversation.id, sender='ai').count() == 0
+
+def test_save_route_commits_job_sections_and_title_once(app, db_session, user, conversation):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+
+    with counted_commits() as commits:
+        response = client.post('/api/job-sections/save', json={
+            'conversation_id': conversation.id, 'user_id': user.id, 'jobrole': 'Sous Chef', 'description': 'Kitchen lead',
+            'sections': [{'section_number': 1, 'heading': 'Responsibilities', 'body': 'Cook.'}]
+        })
+
+    assert response.status_code == 201
+    assert len(commits) == 1
+    db_session.expire_all()
+    assert db_session.get(Conversations, conversation.id).title == 'Sous Chef'
+    assert db_session.query(JobSections).join(Jobs).filter(Jobs.conversation_id == conversation.id).count() == 1
@@ -3,12 +3,31 @@
 import React, { useEffect, useState } from "react";
 import { useDispatch, useSelector } from "react-redux";
 import { socket } from "./socket";
-import { Conversations, Users, Messages, JobsUpdatePayload } from "./lib/types";
+import {
+    Conversations,
+    ConversationsPage,
+    Users,
+    Messages,
+    JobsUpdatePayload,
+    JobsDeltaPayload,
+    AiResponseChunkPayload,
+    AiResponseDonePayload,
+    JobSectionChunkPayload,
+} from "./lib/types";
 import { AppDispatch, RootState } from "./store/store";
-import { setAiGeneratedJobSections, clearUpdatedFieldHighlights } from "./store/workspaceSlice";
+import {
+    setAiGeneratedJobSections,
+    applyJobDelta,
+    appendJobSectionChunk,
+    clearUpdatedFieldHighlights,
+} from "./store/workspaceSlice";
 import {
     setMessages,
     addMessages,
+    prependMessages,
+    setOlderMessagesCursor,
+    appendAiResponseChunk,
+    completeAiResponse,
     clearMessages,
     setSelectedConversation,
 } from "./store/chatSlice";
@@ -23,8 +42,12 @@ const API_BASE_URL = import.meta.env.VITE_REACT_APP_API_BASE_URL;
 const App: React.FC = () => {
     const dispatch = useDispatch<AppDispatch>();
     const activeWorkspaceView = useSelector((state: RootState) => state.workspace.activeView);
-    const { selectedConversationId } = useSelector((state: RootState) => state.chat);
+    const aiGeneratedJob = useSelector((state: RootState) => state.workspace.aiGeneratedJob);
+    const { selectedConversationId, olderMessagesCursor } = useSelector(
+        (state: RootState) => state.chat
+    );
     const [conversations, setConversations] = useState<Conversations[]>([]);
+    const [conversationsCursor, setConversationsCursor] = useState<string | null>(null);
     const [currentUser, setCurrentUser] = useState<Users | null>(null);
     const [isLoginModalOpen, setIsLoginModalOpen] = useState(false);
     const [isLoadingSession, setIsLoadingSession] = useState(true);
@@ -66,8 +89,9 @@ const App: React.FC = () => {
                     credentials: "include",
                 });
                 if (response.ok) {
-                    const data: Conversations[] = await response.json();
-                    setConversations(data);
+                    const data: ConversationsPage = await response.json();
+                    setConversations(data.conversations);
+                    setConversationsCursor(data.next_cursor);
                 } else if (response.status === 401) {
                     setCurrentUser(null);
                     setConversations([]);
@@ -158,9 +182,32 @@ const App: React.FC = () => {
             });
         }
 
-        function handleJobsUpdate(data: JobsUpdatePayload) {
+        // Fetches the full job when a delta does not apply to the locally held version
+        async function fetchJobSnapshot(conversationId: number) {
+            try {
+                const response = await fetch(`${API_BASE_URL}/api/job-sections/get/${conversationId}`, {
+                    credentials: "include",
+                });
+                if (response.ok) {
+                    const data: JobsUpdatePayload = await response.json();
+                    dispatch(setAiGeneratedJobSections(data));
+                }
+            } catch (error) {
+                console.error("Error fetching job snapshot:", error);
+            }
+        }
+
+        function handleJobsUpdate(data: JobsUpdatePayload | JobsDeltaPayload) {
             if (data.conversation_id === selectedConversationId) {
-                dispatch(setAiGeneratedJobSections(data));
+                if (data.type === "delta") {
+                    if (aiGeneratedJob?.id === data.id && aiGeneratedJob.version === data.base_version) {
+                        dispatch(applyJobDelta(data));
+                    } else {
+                        fetchJobSnapshot(data.conversation_id);
+                    }
+                } else {
+                    dispatch(setAiGeneratedJobSections(data));
+                }
                 setTimeout(() => {
                     dispatch(clearUpdatedFieldHighlights());
                 }, 3000);
@@ -171,16 +218,29 @@ const App: React.FC = () => {
             }
         }
 
+        function handleJobSectionChunk(data: JobSectionChunkPayload) {
+            if (data.conversation_id === selectedConversationId) {
+                dispatch(appendJobSectionChunk(data));
+            }
+        }
+
         function handleConversationMessages(data: {
             conversationId: number;
             messages: Messages[];
+            nextCursor: string | null;
+            isOlderPage: boolean;
         }) {
             if (data.conversationId === selectedConversationId) {
                 console.log(
                     "(App Handler) Received conversation messages, dispatching setMessages:",
                     data.messages.length
                 );
-                dispatch(setMessages(data.messages));
+                if (data.isOlderPage) {
+                    dispatch(prependMessages(data.messages));
+                } else {
+                    dispatch(setMessages(data.messages));
+                }
+                dispatch(setOlderMessagesCursor(data.nextCursor));
                 setIsLoadingMessages(false);
             } else {
                 console.log(
@@ -199,6 +259,23 @@ const App: React.FC = () => {
             }
         }
 
+        // Streamed chunks of a new chat arrive before its conversation_created event
+        function handleAiResponseChunk(data: AiResponseChunkPayload) {
+            if (selectedConversationId === null || data.conversation_id === selectedConversationId) {
+                dispatch(appendAiResponseChunk(data));
+            }
+        }
+
+        function handleAiResponseDone(data: AiResponseDonePayload) {
+            if (selectedConversationId === null || data.conversation_id === selectedConversationId) {
+                dispatch(completeAiResponse(data));
+            } else {
+                console.log(
+                    `App: Ignoring ai_response_done for conversation ${data.conversation_id} (current is ${selectedConversationId})`
+                );
+            }
+        }
+
         if (currentUser && !socket.connected) {
             socket.auth = {
                 userId: currentUser.id,
@@ -216,8 +293,11 @@ const App: React.FC = () => {
         socket.on("connect_error", handleConnectError);
         socket.on("conversation_created", onConversationCreated);
         socket.on("job_updated", handleJobsUpdate);
+        socket.on("job_section_chunk", handleJobSectionChunk);
         socket.on("conversation_messages", handleConversationMessages);
         socket.on("ai_response", handleAiResponse);
+        socket.on("ai_response_chunk", handleAiResponseChunk);
+        socket.on("ai_response_done", handleAiResponseDone);
         socket.on("chat_title_updated_event", handleChatTitleChange);
 
         return () => {
@@ -226,11 +306,14 @@ const App: React.FC = () => {
             socket.off("connect_error", handleConnectError);
             socket.off("conversation_created", onConversationCreated);
             socket.off("job_updated", handleJobsUpdate);
+            socket.off("job_section_chunk", handleJobSectionChunk);
             socket.off("conversation_messages", handleConversationMessages);
             socket.off("ai_response", handleAiResponse);
+            socket.off("ai_response_chunk", handleAiResponseChunk);
+            socket.off("ai_response_done", handleAiResponseDone);
             socket.off("chat_title_updated_event", handleChatTitleChange);
         };
-    }, [currentUser, selectedConversationId, dispatch]);
+    }, [currentUser, selectedConversationId, aiGeneratedJob, dispatch]);
 
     // Handlers for the Conversation Selector
     const handleConversationSelect = (id: number | null) => {
@@ -242,6 +325,35 @@ const App: React.FC = () => {
         setIsLoadingMessages(id !== null);
     };
 
+    // Handlers for the Load More Conversations Button
+    const handleLoadMoreConversations = async () => {
+        if (!currentUser || !conversationsCursor) return;
+        try {
+            const response = await fetch(
+                `${API_BASE_URL}/api/chat/conversations?cursor=${encodeURIComponent(conversationsCursor)}`,
+                { credentials: "include" }
+            );
+            if (response.ok) {
+                const data: ConversationsPage = await response.json();
+                setConversations((prev) => [...prev, ...data.conversations]);
+                setConversationsCursor(data.next_cursor);
+            } else {
+                console.error("Failed to fetch more conversations, status:", response.status);
+            }
+        } catch (error) {
+            console.error("Error fetching more conversations:", error);
+        }
+    };
+
+    // Handlers for the Load Older Messages Button
+    const handleLoadOlderMessages = () => {
+        if (selectedConversationId === null || !olderMessagesCursor || !socket.connected) return;
+        socket.emit("request_conversation_messages", {
+            conversationId: selectedConversationId,
+            beforeCursor: olderMessagesCursor,
+        });
+    };
+
     // Handlers for the New Chat Button
     const handleNewChat = () => {
         if (!currentUser) {
@@ -287,6 +399,7 @@ const App: React.FC = () => {
         }
         setCurrentUser(null);
         setConversations([]);
+        setConversationsCursor(null);
         dispatch(setSelectedConversation(null));
         dispatch(clearMessages());
         if (socket.connected) {
@@ -318,6 +431,10 @@ const App: React.FC = () => {
                 content: content,
                 conversationId: currentConvoId,
                 activeView: activeWorkspaceView,
+                jobVersion:
+                    aiGeneratedJob && aiGeneratedJob.conversation_id === currentConvoId
+                        ? aiGeneratedJob.version
+                        : undefined,
             });
         } else {
             alert("Connection error: Could not send message.");
@@ -333,10 +450,16 @@ const App: React.FC = () => {
             {/* Main Layout */}
             <MainLayout
                 chatPanel={
-                    <Chatbar isLoading={isLoadingMessages} onSendMessage={handleSendMessage} />
+                    <Chatbar
+                        isLoading={isLoadingMessages}
+                        onSendMessage={handleSendMessage}
+                        onLoadOlderMessages={handleLoadOlderMessages}
+                    />
                 }
                 workspacePanel={<Workspace />}
                 conversations={conversations}
+                hasMoreConversations={conversationsCursor !== null}
+                onLoadMoreConversations={handleLoadMoreConversations}
                 selectedConversationId={selectedConversationId}
                 currentUser={currentUser}
                 onConversationSelect={handleConversationSelect}
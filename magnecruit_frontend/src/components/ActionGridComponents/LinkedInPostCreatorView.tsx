@@ -70,7 +70,7 @@ const LinkedInPostCreatorView: React.FC<LinkedInPostCreatorViewProps> = () => {
         fetchJobDetails();
     }, [selectedConversationId]);
 
-    const generateLinkedInPost = async () => {
+    const generateLinkedInPost = async (regenerate: boolean = false) => {
         const titleForPost = jobDetails?.jobrole || jobTitle;
 
         if (!selectedConversationId) {
@@ -98,6 +98,7 @@ const LinkedInPostCreatorView: React.FC<LinkedInPostCreatorViewProps> = () => {
                 job_description_summary: jobDescription,
                 tone: tone,
                 length: length,
+                regenerate: regenerate,
             });
 
             setGeneratedPost(response.data.linkedin_post);
@@ -285,7 +286,7 @@ const LinkedInPostCreatorView: React.FC<LinkedInPostCreatorViewProps> = () => {
             {/* Action Section */}
             <div className="p-4 border-t border-gray-200 flex gap-3 justify-end">
                 <button
-                    onClick={generateLinkedInPost}
+                    onClick={() => generateLinkedInPost(Boolean(generatedPost))}
                     disabled={
                         !selectedConversationId ||
                         (!jobDetails && !jobTitle.trim()) ||
@@ -298,6 +299,8 @@ const LinkedInPostCreatorView: React.FC<LinkedInPostCreatorViewProps> = () => {
                             <RefreshCw size={16} className="mr-2 animate-spin" />
                             Generating...
                         </>
+                    ) : generatedPost ? (
+                        "Regenerate Post"
                     ) : (
                         "Generate Post"
                     )}
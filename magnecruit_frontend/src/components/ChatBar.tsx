@@ -10,12 +10,14 @@ import ReactMarkdown from "react-markdown";
 interface ChatBarProps {
     isLoading: boolean;
     onSendMessage: (content: string) => void;
+    onLoadOlderMessages: () => void;
 }
 
 // Chat bar component
-const ChatBar: React.FC<ChatBarProps> = ({ isLoading, onSendMessage }) => {
+const ChatBar: React.FC<ChatBarProps> = ({ isLoading, onSendMessage, onLoadOlderMessages }) => {
     const conversationId = useSelector((state: RootState) => state.chat.selectedConversationId);
     const messages = useSelector((state: RootState) => state.chat.messages);
+    const olderMessagesCursor = useSelector((state: RootState) => state.chat.olderMessagesCursor);
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const [inputText, setInputText] = useState("");
 
@@ -64,6 +66,16 @@ const ChatBar: React.FC<ChatBarProps> = ({ isLoading, onSendMessage }) => {
                     <p className="text-center text-gray-400">Send a message to start chatting...</p>
                 ) : (
                     <div className="w-full space-y-4">
+                        {olderMessagesCursor && (
+                            <div className="flex justify-center">
+                                <button
+                                    onClick={onLoadOlderMessages}
+                                    className="text-xs text-blue-500 hover:underline cursor-pointer"
+                                >
+                                    Load older messages
+                                </button>
+                            </div>
+                        )}
                         {messages.map((message) => (
                             <div
                                 key={message.id}
@@ -17,6 +17,8 @@ import Avatar from "./Avatar";
 // Interface for the sidebar props
 interface SidebarProps {
     conversations: Conversations[];
+    hasMoreConversations: boolean;
+    onLoadMoreConversations: () => void;
     selectedConversationId: number | null;
     currentUser: Users | null;
     onConversationSelect: (id: number | null) => void;
@@ -38,6 +40,8 @@ interface NavItem {
 // Sidebar component
 const Sidebar: React.FC<SidebarProps> = ({
     conversations,
+    hasMoreConversations,
+    onLoadMoreConversations,
     selectedConversationId,
     currentUser,
     onConversationSelect,
@@ -150,6 +154,16 @@ const Sidebar: React.FC<SidebarProps> = ({
                                     </div>
                                 </li>
                             ))}
+                            {hasMoreConversations && (
+                                <li>
+                                    <button
+                                        onClick={onLoadMoreConversations}
+                                        className="text-gray-500 hover:text-gray-900 hover:bg-gray-100 rounded-md p-2 text-xs font-medium w-full text-left cursor-pointer"
+                                    >
+                                        Load more
+                                    </button>
+                                </li>
+                            )}
                         </ul>
                     </li>
 
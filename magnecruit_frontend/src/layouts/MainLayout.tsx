@@ -9,6 +9,8 @@ interface MainLayoutProps {
     chatPanel: ReactNode;
     workspacePanel: ReactNode;
     conversations: Conversations[];
+    hasMoreConversations: boolean;
+    onLoadMoreConversations: () => void;
     selectedConversationId: number | null;
     currentUser: Users | null;
     onConversationSelect: (id: number | null) => void;
@@ -22,6 +24,8 @@ const MainLayout: React.FC<MainLayoutProps> = ({
     chatPanel,
     workspacePanel,
     conversations,
+    hasMoreConversations,
+    onLoadMoreConversations,
     selectedConversationId,
     currentUser,
     onConversationSelect,
@@ -35,6 +39,8 @@ const MainLayout: React.FC<MainLayoutProps> = ({
             <div className="w-64 flex-shrink-0 h-full">
                 <Sidebar
                     conversations={conversations}
+                    hasMoreConversations={hasMoreConversations}
+                    onLoadMoreConversations={onLoadMoreConversations}
                     selectedConversationId={selectedConversationId}
                     currentUser={currentUser}
                     onConversationSelect={onConversationSelect}
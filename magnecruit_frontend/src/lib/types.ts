@@ -12,6 +12,11 @@ export interface Conversations {
     created_at: string;
 }
 
+export interface ConversationsPage {
+    conversations: Conversations[];
+    next_cursor: string | null;
+}
+
 export interface Messages {
     id: string | number;
     sender: "user" | "ai" | "system";
@@ -20,6 +25,24 @@ export interface Messages {
     conversation_id?: number;
   }
   
+export interface AiResponseChunkPayload {
+    conversation_id: number;
+    sender: "ai";
+    content: string;
+}
+
+export interface AiResponseDonePayload {
+    conversation_id: number;
+    message: Messages | null;
+}
+
+export interface JobSectionChunkPayload {
+    conversation_id: number;
+    section_number: number;
+    heading: string;
+    content: string;
+}
+
 export interface Jobs {
     id?: number;
     conversation_id?: number;
@@ -27,6 +50,7 @@ export interface Jobs {
     jobrole: string; 
     description: string;
     sections: JobSections[];
+    version?: number;
     created_at?: string;
     updated_field_keys?: string[];
 }
@@ -39,5 +63,18 @@ export interface JobSections {
 }
 
 export interface JobsUpdatePayload extends Jobs {
+    type?: "snapshot";
+    updated_field_keys?: string[];
+  }
+
+export interface JobsDeltaPayload {
+    type: "delta";
+    id: number;
+    conversation_id: number;
+    base_version: number;
+    version: number;
+    changed_fields: Partial<Pick<Jobs, "jobrole" | "description">>;
+    upserted_sections: JobSections[];
+    removed_section_ids: (number | string)[];
     updated_field_keys?: string[];
-  }
\ No newline at end of file
+}
\ No newline at end of file
@@ -3,9 +3,12 @@
 import io from 'socket.io-client';
 
 const SOCKET_URL = import.meta.env.VITE_REACT_APP_SOCKET_URL;
+// Comma-separated transports, set to 'websocket' when the backend runs several workers without sticky sessions
+const SOCKET_TRANSPORTS = import.meta.env.VITE_REACT_APP_SOCKET_TRANSPORTS;
 
 export const socket = io(SOCKET_URL, {
     autoConnect: false,
+    ...(SOCKET_TRANSPORTS ? { transports: SOCKET_TRANSPORTS.split(',') } : {}),
 });
 
 socket.on('connect', () => { console.log('Socket connected:', socket.id); });
@@ -1,18 +1,20 @@
 // magnecruit_frontend\src\store\chatSlice.ts
 
 import { createSlice, PayloadAction } from '@reduxjs/toolkit';
-import { Messages } from '../lib/types';
+import { Messages, AiResponseChunkPayload, AiResponseDonePayload } from '../lib/types';
 
 // Interface for the Chat State
 interface ChatState {
   messages: Messages[];
   selectedConversationId: number | null;
+  olderMessagesCursor: string | null;
 }
 
 // Initial State for the Chat
 const initialState: ChatState = {
     messages: [],
     selectedConversationId: null,
+    olderMessagesCursor: null,
 };
 
 const chatSlice = createSlice({
@@ -22,12 +24,46 @@ const chatSlice = createSlice({
     setMessages(state, action: PayloadAction<Messages[]>) {
       state.messages = action.payload;
     },
+    prependMessages(state, action: PayloadAction<Messages[]>) {
+      state.messages = [...action.payload, ...state.messages];
+    },
+    setOlderMessagesCursor(state, action: PayloadAction<string | null>) {
+      state.olderMessagesCursor = action.payload;
+    },
     clearMessages(state){
         state.messages = [];
+        state.olderMessagesCursor = null;
     },
     addMessages(state, action: PayloadAction<Messages>){
       state.messages.push(action.payload);
     },
+    appendAiResponseChunk(state, action: PayloadAction<AiResponseChunkPayload>) {
+      const streamingId = `stream-${action.payload.conversation_id}`;
+      const streamingMessage = state.messages.find((msg) => msg.id === streamingId);
+      if (streamingMessage) {
+        streamingMessage.content += action.payload.content;
+      } else {
+        state.messages.push({
+          id: streamingId,
+          sender: 'ai',
+          content: action.payload.content,
+          conversation_id: action.payload.conversation_id,
+        });
+      }
+    },
+    completeAiResponse(state, action: PayloadAction<AiResponseDonePayload>) {
+      const streamingId = `stream-${action.payload.conversation_id}`;
+      const streamingIndex = state.messages.findIndex((msg) => msg.id === streamingId);
+      if (action.payload.message) {
+        if (streamingIndex >= 0) {
+          state.messages[streamingIndex] = action.payload.message;
+        } else {
+          state.messages.push(action.payload.message);
+        }
+      } else if (streamingIndex >= 0) {
+        state.messages.splice(streamingIndex, 1);
+      }
+    },
     setSelectedConversation(state, action: PayloadAction<number | null>) {
         state.selectedConversationId = action.payload;
         if (state.selectedConversationId !== action.payload) {
@@ -37,5 +73,14 @@ const chatSlice = createSlice({
   },
 });
 
-export const { setMessages, addMessages, clearMessages, setSelectedConversation } = chatSlice.actions;
+export const {
+  setMessages,
+  addMessages,
+  prependMessages,
+  setOlderMessagesCursor,
+  appendAiResponseChunk,
+  completeAiResponse,
+  clearMessages,
+  setSelectedConversation,
+} = chatSlice.actions;
 export default chatSlice.reducer; 
\ No newline at end of file
@@ -1,7 +1,7 @@
 // magnecruit_frontend\src\store\workspaceSlice.ts
 
 import { createSlice, PayloadAction } from '@reduxjs/toolkit';
-import { Jobs, JobsUpdatePayload } from '../lib/types';
+import { Jobs, JobsUpdatePayload, JobsDeltaPayload, JobSectionChunkPayload } from '../lib/types';
 
 export type WorkspaceView = | "actions" | "job-sections" | "linkedin-post-creation" | "interview-scheduling" | "candidate-management" | "follow-up" | "submit-expense";
 
@@ -11,6 +11,7 @@ interface WorkspaceState {
   aiGeneratedJob: Jobs | null;
   updatedFields: string[] | null;
   lastUpdateTime: number | null;
+  streamingSectionNumbers: number[];
 }
 
 // Interface for the initial state of the Workspace
@@ -19,6 +20,7 @@ const initialState: WorkspaceState = {
   aiGeneratedJob: null,
   updatedFields: null,
   lastUpdateTime: null,
+  streamingSectionNumbers: [],
 };
 
 // Create the Workspace Slice
@@ -40,6 +42,43 @@ const workspaceSlice = createSlice({
         state.updatedFields = null;
         state.lastUpdateTime = null;
       }
+      state.streamingSectionNumbers = [];
+    },
+    applyJobDelta(state, action: PayloadAction<JobsDeltaPayload>) {
+      const delta = action.payload;
+      const job = state.aiGeneratedJob;
+      if (!job || job.id !== delta.id || job.version !== delta.base_version) {
+        return;
+      }
+      Object.assign(job, delta.changed_fields);
+      const upsertedIds = new Set(delta.upserted_sections.map((section) => section.id));
+      const removedIds = new Set(delta.removed_section_ids);
+      job.sections = [
+        ...job.sections.filter((section) => !upsertedIds.has(section.id) && !removedIds.has(section.id)),
+        ...delta.upserted_sections,
+      ].sort((a, b) => a.section_number - b.section_number);
+      job.version = delta.version;
+      state.updatedFields = delta.updated_field_keys || null;
+      state.lastUpdateTime = Date.now();
+      state.streamingSectionNumbers = [];
+    },
+    // The first chunk of a rewritten section replaces its body, the saved section then arrives in job_updated
+    appendJobSectionChunk(state, action: PayloadAction<JobSectionChunkPayload>) {
+      const chunk = action.payload;
+      const job = state.aiGeneratedJob;
+      if (!job || job.conversation_id !== chunk.conversation_id) {
+        return;
+      }
+      const section = job.sections.find((s) => s.section_number === chunk.section_number);
+      if (!section) {
+        return;
+      }
+      if (state.streamingSectionNumbers.includes(chunk.section_number)) {
+        section.body += chunk.content;
+      } else {
+        section.body = chunk.content;
+        state.streamingSectionNumbers.push(chunk.section_number);
+      }
     },
     clearUpdatedFieldHighlights(state) {
       state.updatedFields = null;
@@ -47,5 +86,5 @@ const workspaceSlice = createSlice({
   },
 });
 
-export const { setActiveView, setAiGeneratedJobSections, clearUpdatedFieldHighlights } = workspaceSlice.actions;
+export const { setActiveView, setAiGeneratedJobSections, applyJobDelta, appendJobSectionChunk, clearUpdatedFieldHighlights } = workspaceSlice.actions;
 export default workspaceSlice.reducer; 
\ No newline at end of file